@@ -343,8 +343,23 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
         # Statistics tracking
         request_count = 0
         
+        # Segments are read into one reusable buffer and copied into a reassembly
+        # buffer of the announced packet size, which is only grown if a later
+        # packet is larger
+        recv_buffer = bytearray(MAX_UDP_SEGMENT)
+        recv_view = memoryview(recv_buffer)
+        received_packet = bytearray(bytes_per_request)
+        
+        # Triggers are paced against an absolute schedule so that the time spent
+        # receiving each response doesn't add to the interval
+        interval_sec = interval_ms / 1000.0
+        next_trigger = time.perf_counter()
+        
         while request_count < num_requests and running:
-            # Send trigger packet to request data
+            # Send trigger packet to request data. Only one trigger is ever
+            # outstanding: a pipelined trigger would have its response queued
+            # behind the previous one, adding queueing delay to the measured
+            # DL latency and duration
             cloud_data_socket.sendto(b'TRIG', cloud_server_address)
             print(f"Sent trigger packet for request {request_count+1}/{num_requests}")
             
@@ -395,15 +410,17 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 print(f"Current sync RTT: {sync_rtt*1000:.2f} ms")
                 
                 # Now receive the payload data in segments
-                received_packet = bytearray()
+                if len(received_packet) < packet_size:
+                    received_packet = bytearray(packet_size)
+                received_bytes = 0
                 segments_received = 0
                 
                 # Start time for measuring packet reception duration
                 packet_start_time = time.time()
                 
-                while segments_received < total_segments and running and len(received_packet) < packet_size:
+                while segments_received < total_segments and running and received_bytes < packet_size:
                     try:
-                        segment, addr = cloud_data_socket.recvfrom(MAX_UDP_SEGMENT)
+                        nbytes, addr = cloud_data_socket.recvfrom_into(recv_buffer)
                         
                         # Verify segment is from expected server
                         if addr != server_addr:
@@ -411,11 +428,11 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                             continue
                             
                         # Extract request ID from segment (first 4 bytes)
-                        if len(segment) < 4:
-                            print(f"Segment too small, missing request ID: {len(segment)} bytes")
+                        if nbytes < 4:
+                            print(f"Segment too small, missing request ID: {nbytes} bytes")
                             continue
                             
-                        segment_request_id = struct.unpack('!I', segment[:4])[0]
+                        segment_request_id = struct.unpack_from('!I', recv_buffer)[0]
                         
                         # Verify segment belongs to current request
                         if segment_request_id != request_id:
@@ -423,7 +440,10 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                             continue
                             
                         # Add segment data (excluding request ID) to received packet
-                        received_packet.extend(segment[4:])
+                        segment_end = received_bytes + nbytes - 4
+                        if segment_end <= packet_size:
+                            received_packet[received_bytes:segment_end] = recv_view[4:nbytes]
+                        received_bytes = segment_end
                         segments_received += 1
                         
                         if segments_received % 10 == 0 or segments_received == total_segments:
@@ -437,7 +457,7 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 
                 # If we received all segments
                 if segments_received == total_segments:
-                    if len(received_packet) == packet_size:
+                    if received_bytes == packet_size:
                         # Increment measurement counter
                         measurement_count += 1
                         
@@ -461,7 +481,7 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                         print(f"Saved measurement #{measurement_count} to file")
                         print("-" * 50)
                     else:
-                        print(f"Packet size mismatch for request ID {request_id}: received {len(received_packet)} bytes, expected {packet_size} bytes")
+                        print(f"Packet size mismatch for request ID {request_id}: received {received_bytes} bytes, expected {packet_size} bytes")
                         flush_udp_buffer(cloud_data_socket)  # Flush on error
                 else:
                     print(f"Incomplete packet for request ID {request_id}: received {segments_received}/{total_segments} segments")
@@ -472,10 +492,16 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 flush_udp_buffer(cloud_data_socket)  # Flush on timeout
                 continue
             
-            # Sleep for the specified interval before sending the next trigger
+            # Sleep until the next trigger is due
             if request_count < num_requests:
-                interval_sec = interval_ms / 1000.0
-                time.sleep(interval_sec)
+                next_trigger += interval_sec
+                delay = next_trigger - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Running late (e.g. a slow response); restart the schedule
+                    # from now instead of sending a burst of catch-up triggers
+                    next_trigger = time.perf_counter()
         
         # Print summary
         if request_count > 0:
@@ -7,45 +7,50 @@ import threading
 # Configuration
 SERVER_IP = '0.0.0.0'           # Listen on all interfaces
 TIME_SYNC_PORT = 5000           # Port for timestamp service (TCP)
+REQUEST_BUFFER_SIZE = 2048      # Largest time sync request read at once
+TIMESTAMP = struct.Struct('d')  # Server time at the start of each response
 
 def handle_client(client_socket, client_address):
     """Handle communication with a connected client using TCP"""
     try:
         print(f"New client connection from {client_address}")
         
+        # Requests are received into one reused buffer; the timestamp is packed into
+        # its own small buffer and gathered with the echoed padding by sendmsg
+        buffer = bytearray(REQUEST_BUFFER_SIZE)
+        view = memoryview(buffer)
+        timestamp_buffer = bytearray(TIMESTAMP.size)
+        timestamp_only = [timestamp_buffer]
+        
         while True:
             # Receive request from client
-            data = client_socket.recv(2048)
-            if not data:
+            data_size = client_socket.recv_into(buffer)
+            if not data_size:
                 # Connection closed by client
                 break
                 
             # Get current timestamp
             current_time = time.time()
+            TIMESTAMP.pack_into(timestamp_buffer, 0, current_time)
             
-            # Get size of received data
-            data_size = len(data)
-            
-            # Create response of the same size
-            # First 8 bytes contain the timestamp
-            timestamp_bytes = struct.pack('d', current_time)
-            
-            # Fill the rest with padding to match the original data size
-            # Always ensure we send at least 8 bytes for the complete timestamp
-            if data_size < 8:
-                # If received data is smaller than 8 bytes, still send full timestamp
-                response = timestamp_bytes
+            # Create response of the same size: the timestamp followed by the rest
+            # of the request as padding. Always ensure we send at least 8 bytes
+            # for the complete timestamp
+            response_size = max(data_size, TIMESTAMP.size)
+            if data_size > TIMESTAMP.size:
+                buffers = [timestamp_buffer, view[TIMESTAMP.size:data_size]]
             else:
-                # If larger, send timestamp + padding
-                padding_size = data_size - 8
-                # Use received data for padding if available, otherwise use null bytes
-                padding = data[8:] if len(data) > 8 else b'\x00' * padding_size
-                response = timestamp_bytes + padding
+                buffers = timestamp_only
             
             # Send response back to the client
-            client_socket.sendall(response)
+            sent = client_socket.sendmsg(buffers)
+            if sent < response_size:
+                # Rare short write: finish from the request buffer, which now
+                # holds the response with the timestamp in place
+                TIMESTAMP.pack_into(buffer, 0, current_time)
+                client_socket.sendall(view[sent:response_size])
             
-            print(f"Timestamp sent to {client_address}: {current_time:.6f}, response size: {len(response)} bytes")
+            print(f"Timestamp sent to {client_address}: {current_time:.6f}, response size: {response_size} bytes")
     
     except ConnectionResetError:
         print(f"Connection reset by {client_address}")
@@ -3,6 +3,7 @@ import socket
 import time
 import struct
 import threading
+import queue
 import os
 import random
 
@@ -13,6 +14,42 @@ PHONE_SERVER_PORT = 5002    # Port for phone client connections (UDP)
 PING_PONG_PORT = 5001       # Port for UDP ping-pong measurements
 MAX_UDP_SEGMENT = 1300      # Maximum UDP segment size
 UDP_BUFFER_SIZE = 4194304   # Buffer size for UDP socket (4MB)
+# Phone response header: request ID, wall-clock send time in integer nanoseconds,
+# packet size, total segments
+RESPONSE_HEADER = struct.Struct('!IQII')
+PC_REQUEST_SIZE = 2048      # Largest PC timestamp request read at once
+TIMESTAMP = struct.Struct('d')  # Server time at the start of each PC response
+CLIENT_WORKERS = 64         # Connections served at once; later ones wait in client_queue
+CLIENT_THREAD_STACK = 512 * 1024  # Stack size for server threads (default is 8MB)
+
+# Accepted TCP connections waiting for a client worker: (handler, socket, address)
+client_queue = queue.SimpleQueue()
+# Free PC request buffers, reused across connections instead of allocated per recv
+recv_buffers = queue.SimpleQueue()
+
+def acquire_recv_buffer():
+    """Take a free PC request buffer, allocating one if none is free"""
+    try:
+        return recv_buffers.get_nowait()
+    except queue.Empty:
+        return bytearray(PC_REQUEST_SIZE)
+
+def release_recv_buffer(buffer):
+    """Return a PC request buffer for reuse by a later connection"""
+    recv_buffers.put(buffer)
+
+def client_worker():
+    """Serve accepted connections from client_queue, one at a time"""
+    while True:
+        handler, client_socket, client_address = client_queue.get()
+        handler(client_socket, client_address)
+
+def start_client_workers():
+    """Start the fixed pool of client worker threads"""
+    for i in range(CLIENT_WORKERS):
+        worker = threading.Thread(target=client_worker, name=f"client-worker-{i}")
+        worker.daemon = True
+        worker.start()
 
 def handle_ping_pong_client(client_socket, client_address):
     """
@@ -88,13 +125,8 @@ def listen_for_ping_pong_clients():
             # Accept new connection
             client_socket, client_address = ping_pong_server_socket.accept()
             
-            # Start a new thread to handle this client
-            client_thread = threading.Thread(
-                target=handle_ping_pong_client,
-                args=(client_socket, client_address)
-            )
-            client_thread.daemon = True
-            client_thread.start()
+            # Hand the connection to a client worker thread
+            client_queue.put((handle_ping_pong_client, client_socket, client_address))
     
     except KeyboardInterrupt:
         print("Ping-pong server shutting down...")
@@ -103,47 +135,40 @@ def listen_for_ping_pong_clients():
 
 def handle_pc_client(client_socket, client_address):
     """Handle communication with a connected PC client using TCP"""
+    # Requests are received into a pooled buffer and answered from it in place
+    buffer = acquire_recv_buffer()
+    view = memoryview(buffer)
     try:
         print(f"New PC connection from {client_address}")
         
         while True:
             # Receive request
-            data = client_socket.recv(2048)
-            if not data:
+            data_size = client_socket.recv_into(buffer)
+            if not data_size:
                 # Connection closed by client
                 break
                 
             # Get current timestamp
             current_time = time.time()
             
-            # Get size of received data
-            data_size = len(data)
-            
-            # Create response of the same size
-            # First 8 bytes contain the timestamp
-            timestamp_bytes = struct.pack('d', current_time)
-            
-            # Fill the rest with padding to match the original data size
+            # Create response of the same size: the first 8 bytes of the request
+            # are overwritten with the timestamp and the rest is echoed as padding.
             # Always ensure we send at least 8 bytes for the complete timestamp
-            if data_size < 8:
-                # If received data is smaller than 8 bytes, still send full timestamp
-                response = timestamp_bytes
-            else:
-                # If larger, send timestamp + padding
-                padding_size = data_size - 8
-                padding = data[8:] if len(data) > 8 else b'\x00' * padding_size
-                response = timestamp_bytes + padding
+            TIMESTAMP.pack_into(buffer, 0, current_time)
+            response_size = max(data_size, TIMESTAMP.size)
             
             # Send response back to the client
-            client_socket.sendall(response)
+            client_socket.sendall(view[:response_size])
             
-            print(f"Timestamp sent to {client_address}, response size: {len(response)} bytes")
+            print(f"Timestamp sent to {client_address}, response size: {response_size} bytes")
     
     except ConnectionResetError:
         print(f"Connection reset by {client_address}")
     except Exception as e:
         print(f"Error handling PC client {client_address}: {e}")
     finally:
+        view.release()
+        release_recv_buffer(buffer)
         # Close the connection
         client_socket.close()
         print(f"Connection closed with PC client {client_address}")
@@ -171,8 +196,8 @@ def send_data_to_phone_udp(server_socket, client_address, num_requests, interval
                     print(f"Received invalid trigger packet: {trigger}")
                     continue
                     
-                # Get current timestamp
-                current_time = time.time()
+                # Get current timestamp (wall clock, compared against the synced client clock)
+                current_time_ns = time.time_ns()
                 
                 # Create payload of specified size with zeros
                 payload = b''
@@ -183,11 +208,11 @@ def send_data_to_phone_udp(server_socket, client_address, num_requests, interval
                 request_id = requests_sent + 1
                 
                 # Create header with request ID, timestamp, packet size, and total segments
-                # Format: !IdII = 4-byte int (request ID) + 8-byte double + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
+                # Format: !IQII = 4-byte int (request ID) + 8-byte unsigned ns timestamp + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
                 # Calculate total segments based on actual segment size (MAX_UDP_SEGMENT - 4 for request ID)
                 segment_payload_size = MAX_UDP_SEGMENT - 4
                 total_segments = (bytes_per_request + segment_payload_size - 1) // segment_payload_size if bytes_per_request > 0 else 0
-                header = struct.pack('!IdII', request_id, current_time, bytes_per_request, total_segments)
+                header = RESPONSE_HEADER.pack(request_id, current_time_ns, bytes_per_request, total_segments)
                 
                 # Send header
                 server_socket.sendto(header, client_address)
@@ -262,13 +287,8 @@ def listen_for_pc_clients():
             # Accept new connection
             client_socket, client_address = pc_server_socket.accept()
             
-            # Start a new thread to handle this client
-            client_thread = threading.Thread(
-                target=handle_pc_client,
-                args=(client_socket, client_address)
-            )
-            client_thread.daemon = True
-            client_thread.start()
+            # Hand the connection to a client worker thread
+            client_queue.put((handle_pc_client, client_socket, client_address))
     
     except KeyboardInterrupt:
         print("PC server shutting down...")
@@ -358,6 +378,10 @@ def handle_ping_pong_udp():
             ping_pong_socket.close()
 
 def main():
+    # Bounded set of small-stack threads instead of one 8MB-stack thread per connection
+    threading.stack_size(CLIENT_THREAD_STACK)
+    start_client_workers()
+    
     # Start PC client listener thread (TCP)
     pc_thread = threading.Thread(target=listen_for_pc_clients)
     pc_thread.daemon = True
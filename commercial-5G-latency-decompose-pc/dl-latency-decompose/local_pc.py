@@ -16,6 +16,9 @@ MAX_UDP_SEGMENT = 1300            # Maximum UDP segment size
 UDP_BUFFER_SIZE = 4194304         # Buffer size for UDP socket (4MB)
 TIMEOUT_SEC = 1                   # Timeout for UDP operations
 PING_INTERVAL = 0.02              # Interval for ping-pong in seconds (20ms)
+# Response header from the cloud server: request ID, wall-clock send time in
+# integer nanoseconds, packet size, total segments
+RESPONSE_HEADER = struct.Struct('!IQII')
 
 # Global variables
 time_offset = 0.0                 # Time difference between client and cloud server
@@ -343,14 +346,29 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
         # Statistics tracking
         request_count = 0
         
+        # Segments are read into one reusable buffer and copied into a reassembly
+        # buffer of the announced packet size, which is only grown if a later
+        # packet is larger
+        recv_buffer = bytearray(MAX_UDP_SEGMENT)
+        recv_view = memoryview(recv_buffer)
+        received_packet = bytearray(bytes_per_request)
+        
+        # Triggers are paced against an absolute schedule so that the time spent
+        # receiving each response doesn't add to the interval
+        interval_sec = interval_ms / 1000.0
+        next_trigger = time.perf_counter()
+        
         while request_count < num_requests and running:
-            # Send trigger packet to request data
+            # Send trigger packet to request data. Only one trigger is ever
+            # outstanding: a pipelined trigger would have its response queued
+            # behind the previous one, adding queueing delay to the measured
+            # DL latency and duration
             cloud_data_socket.sendto(b'TRIG', cloud_server_address)
             print(f"Sent trigger packet for request {request_count+1}/{num_requests}")
             
             try:
                 # First receive the header which contains request ID, timestamp, packet size, and total segments
-                # Format: !IdII = 4-byte int (request ID) + 8-byte double + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
+                # Format: !IQII = 4-byte int (request ID) + 8-byte unsigned ns timestamp + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
                 header, server_addr = cloud_data_socket.recvfrom(MAX_UDP_SEGMENT)
                 if not header or len(header) < 20:
                     if not header:
@@ -360,16 +378,17 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                     continue
                 
                 # Parse the header to get request ID, timestamp, packet size, and total segments
-                request_id, server_timestamp, packet_size, total_segments = struct.unpack('!IdII', header[:20])
+                request_id, server_timestamp_ns, packet_size, total_segments = RESPONSE_HEADER.unpack_from(header)
                 
-                if server_timestamp == 0:
+                if server_timestamp_ns == 0:
                     print("Server timestamp is 0, skipping request")
                     flush_udp_buffer(cloud_data_socket)  # Flush all pending packets
                     request_count += 1
                     continue
                 
-                # Record the time when header is received
-                receive_time = time.time()
+                # Record the time when header is received; latency math stays in integer
+                # nanoseconds and is only converted to ms for output
+                receive_time_ns = time.time_ns()
                 
                 # Create results file if this is the first packet with valid size
                 if not is_file_created and packet_size >= 0:
@@ -378,32 +397,34 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 
                 # Correct server timestamp using our time offset
                 with lock:
-                    corrected_server_time = server_timestamp - time_offset
+                    corrected_server_time_ns = server_timestamp_ns - round(time_offset * 1_000_000_000)
                     sync_rtt = current_sync_rtt
                 
                 # Calculate DL transmission delay (server to client)
-                dl_transmission_delay = receive_time - corrected_server_time
+                dl_transmission_delay_ms = (receive_time_ns - corrected_server_time_ns) / 1_000_000
                 
                 # Calculate time difference in ms
-                time_diff_ms = (receive_time - server_timestamp) * 1000
+                time_diff_ms = (receive_time_ns - server_timestamp_ns) / 1_000_000
                 
                 # Output timestamps without correction
-                print(f"Request {request_id}: Local timestamp: {receive_time:.6f}, Server timestamp: {server_timestamp:.6f}")
-                print(f"Corrected server time: {corrected_server_time:.6f}")
-                print(f"DL transmission delay: {dl_transmission_delay*1000:.2f} ms")
+                print(f"Request {request_id}: Local timestamp: {receive_time_ns / 1e9:.6f}, Server timestamp: {server_timestamp_ns / 1e9:.6f}")
+                print(f"Corrected server time: {corrected_server_time_ns / 1e9:.6f}")
+                print(f"DL transmission delay: {dl_transmission_delay_ms:.2f} ms")
                 print(f"Time difference: {time_diff_ms:.2f} ms")
                 print(f"Current sync RTT: {sync_rtt*1000:.2f} ms")
                 
                 # Now receive the payload data in segments
-                received_packet = bytearray()
+                if len(received_packet) < packet_size:
+                    received_packet = bytearray(packet_size)
+                received_bytes = 0
                 segments_received = 0
                 
-                # Start time for measuring packet reception duration
-                packet_start_time = time.time()
+                # Start time for measuring packet reception duration (local interval)
+                packet_start_ns = time.perf_counter_ns()
                 
-                while segments_received < total_segments and running and len(received_packet) < packet_size:
+                while segments_received < total_segments and running and received_bytes < packet_size:
                     try:
-                        segment, addr = cloud_data_socket.recvfrom(MAX_UDP_SEGMENT)
+                        nbytes, addr = cloud_data_socket.recvfrom_into(recv_buffer)
                         
                         # Verify segment is from expected server
                         if addr != server_addr:
@@ -411,11 +432,11 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                             continue
                             
                         # Extract request ID from segment (first 4 bytes)
-                        if len(segment) < 4:
-                            print(f"Segment too small, missing request ID: {len(segment)} bytes")
+                        if nbytes < 4:
+                            print(f"Segment too small, missing request ID: {nbytes} bytes")
                             continue
                             
-                        segment_request_id = struct.unpack('!I', segment[:4])[0]
+                        segment_request_id = struct.unpack_from('!I', recv_buffer)[0]
                         
                         # Verify segment belongs to current request
                         if segment_request_id != request_id:
@@ -423,7 +444,10 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                             continue
                             
                         # Add segment data (excluding request ID) to received packet
-                        received_packet.extend(segment[4:])
+                        segment_end = received_bytes + nbytes - 4
+                        if segment_end <= packet_size:
+                            received_packet[received_bytes:segment_end] = recv_view[4:nbytes]
+                        received_bytes = segment_end
                         segments_received += 1
                         
                         if segments_received % 10 == 0 or segments_received == total_segments:
@@ -437,16 +461,15 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 
                 # If we received all segments
                 if segments_received == total_segments:
-                    if len(received_packet) == packet_size:
+                    if received_bytes == packet_size:
                         # Increment measurement counter
                         measurement_count += 1
                         
                         # Calculate packet reception duration
-                        packet_end_time = time.time()
-                        duration_ms = (packet_end_time - packet_start_time) * 1000
+                        duration_ms = (time.perf_counter_ns() - packet_start_ns) / 1_000_000
                         
                         # Calculate total latency
-                        total_latency_ms = dl_transmission_delay*1000 + duration_ms
+                        total_latency_ms = dl_transmission_delay_ms + duration_ms
                         
                         print(f"Packet fully received for request ID {request_id}. Duration: {duration_ms:.2f} ms, Packet size: {packet_size} bytes")
                         print(f"Total observed latency: {total_latency_ms:.2f} ms")
@@ -454,14 +477,14 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                         # Save results to file with fixed-width format for better alignment
                         if results_file:
                             with lock:  # Use lock to avoid file corruption
-                                results_file.write(f"{measurement_count:<6d}  {dl_transmission_delay*1000:<12.2f}  {time_diff_ms:<14.2f}  {duration_ms:<12.2f}  {total_latency_ms:<12.2f}  {packet_size:<10d}  {sync_rtt*1000:<10.2f}\n")
+                                results_file.write(f"{measurement_count:<6d}  {dl_transmission_delay_ms:<12.2f}  {time_diff_ms:<14.2f}  {duration_ms:<12.2f}  {total_latency_ms:<12.2f}  {packet_size:<10d}  {sync_rtt*1000:<10.2f}\n")
                                 results_file.flush()  # Ensure data is written to disk
                         
                         request_count += 1
                         print(f"Saved measurement #{measurement_count} to file")
                         print("-" * 50)
                     else:
-                        print(f"Packet size mismatch for request ID {request_id}: received {len(received_packet)} bytes, expected {packet_size} bytes")
+                        print(f"Packet size mismatch for request ID {request_id}: received {received_bytes} bytes, expected {packet_size} bytes")
                         flush_udp_buffer(cloud_data_socket)  # Flush on error
                 else:
                     print(f"Incomplete packet for request ID {request_id}: received {segments_received}/{total_segments} segments")
@@ -472,10 +495,16 @@ def receive_data_from_server_udp(cloud_server_address, num_requests, interval_ms
                 flush_udp_buffer(cloud_data_socket)  # Flush on timeout
                 continue
             
-            # Sleep for the specified interval before sending the next trigger
+            # Sleep until the next trigger is due
             if request_count < num_requests:
-                interval_sec = interval_ms / 1000.0
-                time.sleep(interval_sec)
+                next_trigger += interval_sec
+                delay = next_trigger - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Running late (e.g. a slow response); restart the schedule
+                    # from now instead of sending a burst of catch-up triggers
+                    next_trigger = time.perf_counter()
         
         # Print summary
         if request_count > 0:
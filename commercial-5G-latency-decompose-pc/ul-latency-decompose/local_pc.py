@@ -67,7 +67,7 @@ def listen_for_cloud_sync():
         while running:
             try:
                 # Wait for timestamp from cloud server
-                data = cloud_time_socket.recv(8)  # Expect an 8-byte double
+                data = cloud_time_socket.recv(8, socket.MSG_WAITALL)  # Expect an 8-byte double; WAITALL avoids short reads
                 if not data or len(data) < 8:
                     # Connection closed or invalid data
                     if not data:
@@ -3,8 +3,16 @@ import socket
 import time
 import struct
 import threading
+import asyncio
 import os
 import random
+import logging
+import argparse
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Configuration
 SERVER_IP = '0.0.0.0'  # Listen on all interfaces
@@ -12,15 +20,27 @@ SERVER_SYNC_PORT = 5000     # Port for timestamp service (TCP)
 PHONE_SERVER_PORT = 5002    # Port for phone client connections (UDP)
 MAX_UDP_SEGMENT = 4096      # Maximum UDP segment size
 UDP_BUFFER_SIZE = 4194304   # Buffer size for UDP socket (4MB)
+PC_REQUEST_SIZE = 2048      # Maximum PC timestamp request read at once
+TIMESTAMP = struct.Struct('d')  # Timestamp written over the start of each PC response
+RESPONSE_HEADER = struct.Struct('!IdII')  # request ID, timestamp, packet size, total segments
+SEGMENT_ID = struct.Struct('!I')          # request ID prefix on every payload segment
+SEGMENT_PAYLOAD = MAX_UDP_SEGMENT - SEGMENT_ID.size
+ZERO_SEGMENT = memoryview(bytes(SEGMENT_PAYLOAD))  # Zero payload shared by all segments
+
+# Per-request and per-trigger log lines are only emitted with --debug
+server_debug = False
 
-def handle_pc_client(client_socket, client_address):
+log = logging.getLogger("aws_server")
+
+async def handle_pc_client(reader, writer):
     """Handle communication with a connected PC client using TCP"""
+    client_address = writer.get_extra_info('peername')
     try:
         print(f"New PC connection from {client_address}")
         
         while True:
             # Receive request
-            data = client_socket.recv(2048)
+            data = await reader.read(PC_REQUEST_SIZE)
             if not data:
                 # Connection closed by client
                 break
@@ -33,23 +53,22 @@ def handle_pc_client(client_socket, client_address):
             
             # Create response of the same size
             # First 8 bytes contain the timestamp
-            timestamp_bytes = struct.pack('d', current_time)
-            
-            # Fill the rest with padding to match the original data size
             # Always ensure we send at least 8 bytes for the complete timestamp
-            if data_size < 8:
+            if data_size < TIMESTAMP.size:
                 # If received data is smaller than 8 bytes, still send full timestamp
-                response = timestamp_bytes
+                response = TIMESTAMP.pack(current_time)
             else:
-                # If larger, send timestamp + padding
-                padding_size = data_size - 8
-                padding = data[8:] if len(data) > 8 else b'\x00' * padding_size
-                response = timestamp_bytes + padding
+                # If larger, echo the request with the timestamp written over its
+                # first 8 bytes: one copy instead of building header + padding + concat
+                response = bytearray(data)
+                TIMESTAMP.pack_into(response, 0, current_time)
             
             # Send response back to the client
-            client_socket.sendall(response)
+            writer.write(response)
+            await writer.drain()
             
-            print(f"Timestamp sent to {client_address}, response size: {len(response)} bytes")
+            if server_debug:
+                log.debug(f"Timestamp sent to {client_address}, response size: {len(response)} bytes")
     
     except ConnectionResetError:
         print(f"Connection reset by {client_address}")
@@ -57,7 +76,7 @@ def handle_pc_client(client_socket, client_address):
         print(f"Error handling PC client {client_address}: {e}")
     finally:
         # Close the connection
-        client_socket.close()
+        writer.close()
         print(f"Connection closed with PC client {client_address}")
 
 def send_data_to_phone_udp(server_socket, client_address, num_requests, interval_ms, bytes_per_request):
@@ -67,11 +86,18 @@ def send_data_to_phone_udp(server_socket, client_address, num_requests, interval
         
         requests_sent = 0
         
+        # Header and segment ID are packed in place into buffers reused for every
+        # request; segments are gathered from the ID and the shared zero payload
+        header = bytearray(RESPONSE_HEADER.size)
+        segment_id = bytearray(SEGMENT_ID.size)
+        total_segments = (bytes_per_request + MAX_UDP_SEGMENT - 1) // MAX_UDP_SEGMENT if bytes_per_request > 0 else 0
+        
         while requests_sent < num_requests:
             try:
                 # Wait for trigger packet from client
                 trigger, addr = server_socket.recvfrom(MAX_UDP_SEGMENT)
-                print(f"Received trigger from {addr}")
+                if server_debug:
+                    log.debug(f"Received trigger from {addr}")
                 
                 # Verify client address matches
                 if addr != client_address:
@@ -86,18 +112,12 @@ def send_data_to_phone_udp(server_socket, client_address, num_requests, interval
                 # Get current timestamp
                 current_time = time.time()
                 
-                # Create payload of specified size with zeros
-                payload = b''
-                if bytes_per_request > 0:
-                    payload = b'\x00' * bytes_per_request
-                    
                 # Generate a unique request ID for this request
                 request_id = requests_sent + 1
                 
                 # Create header with request ID, timestamp, packet size, and total segments
                 # Format: !IdII = 4-byte int (request ID) + 8-byte double + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
-                total_segments = (bytes_per_request + MAX_UDP_SEGMENT - 1) // MAX_UDP_SEGMENT if bytes_per_request > 0 else 0
-                header = struct.pack('!IdII', request_id, current_time, bytes_per_request, total_segments)
+                RESPONSE_HEADER.pack_into(header, 0, request_id, current_time, bytes_per_request, total_segments)
                 
                 # Send header
                 server_socket.sendto(header, client_address)
@@ -105,17 +125,16 @@ def send_data_to_phone_udp(server_socket, client_address, num_requests, interval
                 # Send payload in segments if needed
                 if bytes_per_request > 0:
                     # Add request ID to each segment by prepending it
-                    for i in range(0, bytes_per_request, MAX_UDP_SEGMENT - 4):  # Reserve 4 bytes for request ID
-                        # Get the segment data
-                        segment_data = payload[i:i+MAX_UDP_SEGMENT-4]
-                        # Create segment with request ID + data
-                        segment = struct.pack('!I', request_id) + segment_data
-                        # Send segment
-                        server_socket.sendto(segment, client_address)
+                    SEGMENT_ID.pack_into(segment_id, 0, request_id)
+                    for i in range(0, bytes_per_request, SEGMENT_PAYLOAD):  # Reserve 4 bytes for request ID
+                        # Send request ID + data as one datagram, gathered by the kernel
+                        segment_len = min(SEGMENT_PAYLOAD, bytes_per_request - i)
+                        server_socket.sendmsg([segment_id, ZERO_SEGMENT[:segment_len]], (), 0, client_address)
                         time.sleep(0.0001)  # Sleep for 100 microseconds
                 
                 requests_sent += 1
-                print(f"Sent request {request_id}/{num_requests} to {client_address}: {bytes_per_request} bytes of payload in {total_segments} segments")
+                if server_debug:
+                    log.debug(f"Sent request {request_id}/{num_requests} to {client_address}: {bytes_per_request} bytes of payload in {total_segments} segments")
             
             except Exception as e:
                 print(f"Error sending data: {e}")
@@ -155,41 +174,32 @@ def handle_phone_client_udp(server_socket, client_address, param_bytes):
     except Exception as e:
         print(f"Error handling phone client {client_address}: {e}")
 
-def listen_for_pc_clients():
+async def listen_for_pc_clients():
     """Listen for PC client connections on SERVER_SYNC_PORT using TCP"""
-    # Create TCP socket for PC clients
-    pc_server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    pc_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    # Disable Nagle algorithm
-    pc_server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-    pc_server_socket.bind((SERVER_IP, SERVER_SYNC_PORT))
-    pc_server_socket.listen(5)  # Allow up to 5 queued connections
+    # PC clients are served as coroutines on one event loop instead of a thread each;
+    # the handlers only wait on the network. SO_REUSEPORT lets further server
+    # processes bind the same port and share incoming connections
+    pc_server = await asyncio.start_server(handle_pc_client, SERVER_IP, SERVER_SYNC_PORT,
+                                           reuse_address=True, reuse_port=hasattr(socket, 'SO_REUSEPORT'),
+                                           backlog=5)
+    # Disable Nagle algorithm (accepted connections inherit it)
+    for pc_server_socket in pc_server.sockets:
+        pc_server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     
     print(f"AWS Server listening for PC clients on TCP {SERVER_IP}:{SERVER_SYNC_PORT}")
     
-    try:
-        while True:
-            # Accept new connection
-            client_socket, client_address = pc_server_socket.accept()
-            
-            # Start a new thread to handle this client
-            client_thread = threading.Thread(
-                target=handle_pc_client,
-                args=(client_socket, client_address)
-            )
-            client_thread.daemon = True
-            client_thread.start()
-    
-    except KeyboardInterrupt:
-        print("PC server shutting down...")
-    finally:
-        pc_server_socket.close()
+    async with pc_server:
+        await pc_server.serve_forever()
 
 def listen_for_phone_clients_udp():
     """Listen for phone client connections on PHONE_SERVER_PORT using UDP"""
     # Create UDP socket for phone clients
     phone_server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     phone_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Let further server processes bind the same port; the kernel keeps each
+    # client's datagrams on one socket
+    if hasattr(socket, 'SO_REUSEPORT'):
+        phone_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     
     # Set large buffer size
     phone_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_BUFFER_SIZE)
@@ -219,10 +229,16 @@ def listen_for_phone_clients_udp():
         phone_server_socket.close()
 
 def main():
-    # Start PC client listener thread (TCP)
-    pc_thread = threading.Thread(target=listen_for_pc_clients)
-    pc_thread.daemon = True
-    pc_thread.start()
+    global server_debug
+    
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description='AWS server for downlink latency decomposition')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print a line for every trigger and request (DEBUG level)')
+    args = parser.parse_args()
+    
+    server_debug = args.debug
+    logging.basicConfig(level=logging.DEBUG if server_debug else logging.INFO, format='%(message)s')
     
     # Start phone client listener thread (UDP)
     phone_thread = threading.Thread(target=listen_for_phone_clients_udp)
@@ -231,10 +247,11 @@ def main():
     
     print(f"AWS Server running with TCP connections for PC clients and UDP for phone clients")
     
-    # Keep main thread alive
+    # Serve PC clients (TCP) on the main thread's event loop
+    if uvloop is not None:
+        uvloop.install()
     try:
-        while True:
-            time.sleep(1)
+        asyncio.run(listen_for_pc_clients())
     except KeyboardInterrupt:
         print("Server shutting down...")
 
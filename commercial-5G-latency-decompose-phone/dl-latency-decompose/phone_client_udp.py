@@ -4,6 +4,7 @@ import time
 import struct
 import threading
 import argparse
+import logging
 
 # Configuration
 AWS_SERVER_DATA_PORT = 5002     # Port for data communication
@@ -13,6 +14,15 @@ MAX_UDP_SEGMENT = 4096          # Maximum UDP segment size
 UDP_BUFFER_SIZE = 4194304       # Buffer size for UDP socket (4MB)
 TIMEOUT_SEC = 1                # Timeout for UDP operations
 
+# Precompiled wire formats for the trigger/receive loop
+RESPONSE_HEADER = struct.Struct('!IdII')  # request ID, timestamp, packet size, total segments
+SEGMENT_ID = struct.Struct('!I')          # request ID prefix on every payload segment
+PARAMS = struct.Struct('!iii')            # num_requests, interval_ms, bytes_per_request
+LOCAL_HEADER = struct.Struct('!dId')      # timestamp, packet size, time diff forwarded to the local server
+DURATION = struct.Struct('d')             # reception duration forwarded to the local server
+
+log = logging.getLogger("phone_client")
+
 # Global variables
 aws_data_socket = None          # UDP socket for AWS server
 local_server_socket = None      # TCP connection to local server
@@ -113,7 +123,7 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
     try:
         # Send parameters to server
         # num_requests, interval_ms, bytes_per_request
-        params = struct.pack('!iii', num_requests, interval_ms, bytes_per_request)
+        params = PARAMS.pack(num_requests, interval_ms, bytes_per_request)
         aws_data_socket.sendto(params, aws_server_address)
         
         print(f"Sent parameters to server: requests={num_requests}, interval={interval_ms}ms, bytes={bytes_per_request}")
@@ -133,24 +143,51 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
         # Statistics tracking
         request_count = 0
         
+        # Per-packet messages are only formatted with --debug; most fall inside
+        # the timed reception window
+        debug = log.isEnabledFor(logging.DEBUG)
+        
+        # Datagrams are read into one reusable buffer instead of allocating
+        # a new bytes object per recvfrom
+        recv_buffer = bytearray(MAX_UDP_SEGMENT)
+        recv_view = memoryview(recv_buffer)
+        
+        # Reassembly buffer shared by all requests; only grown if the server
+        # announces a larger packet than any before
+        received_packet = bytearray(bytes_per_request)
+        
+        # Triggers are paced against an absolute schedule so that the time spent
+        # receiving each response doesn't add to the interval
+        interval_sec = interval_ms / 1000.0
+        next_trigger = time.perf_counter()
+        
+        # Names used for every segment, looked up once instead of per datagram
+        recvfrom_into = aws_data_socket.recvfrom_into
+        unpack_segment_id = SEGMENT_ID.unpack_from
+        id_size = SEGMENT_ID.size
+        
         while request_count < num_requests and running:
-            # Send trigger packet to request data
+            # Send trigger packet to request data. Only one trigger is ever
+            # outstanding: a pipelined trigger would have its response queued
+            # behind the previous one, adding queueing delay to the measured
+            # DL latency and duration
             aws_data_socket.sendto(b'TRIG', aws_server_address)
-            print(f"Sent trigger packet for request {request_count+1}/{num_requests}")
+            if debug:
+                log.debug(f"Sent trigger packet for request {request_count+1}/{num_requests}")
             
             try:
                 # First receive the header which contains request ID, timestamp, packet size, and total segments
                 # Format: !IdII = 4-byte int (request ID) + 8-byte double + 4-byte unsigned int + 4-byte unsigned int = 20 bytes total
-                header, server_addr = aws_data_socket.recvfrom(MAX_UDP_SEGMENT)
-                if not header or len(header) < 20:
-                    if not header:
+                nbytes, server_addr = recvfrom_into(recv_buffer)
+                if nbytes < RESPONSE_HEADER.size:
+                    if not nbytes:
                         print("Empty response from server")
                     else:
-                        print(f"Incomplete header received: {len(header)} bytes, expected 20 bytes")
+                        print(f"Incomplete header received: {nbytes} bytes, expected {RESPONSE_HEADER.size} bytes")
                     continue
                 
                 # Parse the header to get request ID, timestamp, packet size, and total segments
-                request_id, server_timestamp, packet_size, total_segments = struct.unpack('!IdII', header[:20])
+                request_id, server_timestamp, packet_size, total_segments = RESPONSE_HEADER.unpack_from(recv_buffer)
                 
                 if server_timestamp == 0:
                     print("Server timestamp is 0, skipping request")
@@ -160,11 +197,11 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                 
                 # Record the time when header is received
                 receive_time = time.time()
-                print(f"receive_time: {receive_time}")
                 
                 # Output timestamps without correction
-                print(f"Request {request_id}: Local timestamp: {receive_time:.6f}, Server timestamp: {server_timestamp:.6f}")
-                print(f"Time difference: {(receive_time - server_timestamp)*1000:.2f} ms")
+                if debug:
+                    log.debug(f"Request {request_id}: Local timestamp: {receive_time:.6f}, Server timestamp: {server_timestamp:.6f}")
+                    log.debug(f"Time difference: {(receive_time - server_timestamp)*1000:.2f} ms")
                 
                 # Forward header to local server
                 if local_server_socket:
@@ -173,19 +210,23 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                         time_diff_ms = (receive_time - server_timestamp) * 1000
                         
                         # Reformat header for local server (which now expects 20 bytes: timestamp, size, and time diff)
-                        local_header = struct.pack('!dId', server_timestamp, packet_size, time_diff_ms)
+                        local_header = LOCAL_HEADER.pack(server_timestamp, packet_size, time_diff_ms)
                         local_server_socket.sendall(local_header)
-                        print(f"Forwarded header to local server: {len(local_header)} bytes (including time diff: {time_diff_ms:.2f} ms)")
+                        if debug:
+                            log.debug(f"Forwarded header to local server: {len(local_header)} bytes (including time diff: {time_diff_ms:.2f} ms)")
                     except Exception as e:
                         print(f"Error forwarding header to local server: {e}")
                 
-                # Now receive the payload data in segments
-                received_packet = bytearray()
+                # Now receive the payload data in segments, copying each one
+                # straight into the reassembly buffer
+                if len(received_packet) < packet_size:
+                    received_packet = bytearray(packet_size)
+                received_bytes = 0
                 segments_received = 0
                 
-                while segments_received < total_segments and running and len(received_packet) < packet_size:
+                while segments_received < total_segments and running and received_bytes < packet_size:
                     try:
-                        segment, addr = aws_data_socket.recvfrom(MAX_UDP_SEGMENT)
+                        nbytes, addr = recvfrom_into(recv_buffer)
                         
                         # Verify segment is from expected server
                         if addr != server_addr:
@@ -193,11 +234,11 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                             continue
                             
                         # Extract request ID from segment (first 4 bytes)
-                        if len(segment) < 4:
-                            print(f"Segment too small, missing request ID: {len(segment)} bytes")
+                        if nbytes < id_size:
+                            print(f"Segment too small, missing request ID: {nbytes} bytes")
                             continue
                             
-                        segment_request_id = struct.unpack('!I', segment[:4])[0]
+                        segment_request_id = unpack_segment_id(recv_buffer)[0]
                         
                         # Verify segment belongs to current request
                         if segment_request_id != request_id:
@@ -205,11 +246,14 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                             continue
                             
                         # Add segment data (excluding request ID) to received packet
-                        received_packet.extend(segment[4:])
+                        segment_end = received_bytes + nbytes - id_size
+                        if segment_end <= packet_size:
+                            received_packet[received_bytes:segment_end] = recv_view[id_size:nbytes]
+                        received_bytes = segment_end
                         segments_received += 1
                         
-                        if segments_received % 10 == 0 or segments_received == total_segments:
-                            print(f"Received segment {segments_received}/{total_segments} for request ID {request_id}")
+                        if debug and (segments_received % 10 == 0 or segments_received == total_segments):
+                            log.debug(f"Received segment {segments_received}/{total_segments} for request ID {request_id}")
                             
                     except socket.timeout:
                         print(f"Timeout waiting for segment {segments_received+1}/{total_segments}")
@@ -219,7 +263,7 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                 
                 # If we received all segments
                 if segments_received == total_segments:
-                    if len(received_packet) == packet_size:
+                    if received_bytes == packet_size:
                         request_count += 1
                         packet_receive_time = time.time()
                         duration_ms = (packet_receive_time - receive_time) * 1000
@@ -229,15 +273,17 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                         if local_server_socket:
                             try:
                                 # Pack duration as a double (8 bytes)
-                                duration_bytes = struct.pack('d', duration_ms)
+                                duration_bytes = DURATION.pack(duration_ms)
                                 local_server_socket.sendall(duration_bytes)
-                                print(f"Sent reception duration to local server: {duration_ms:.2f} ms")
+                                if debug:
+                                    log.debug(f"Sent reception duration to local server: {duration_ms:.2f} ms")
                             except Exception as e:
                                 print(f"Error sending duration to local server: {e}")
                         
-                        print("-" * 50)
+                        if debug:
+                            log.debug("-" * 50)
                     else:
-                        print(f"Packet size mismatch for request ID {request_id}: received {len(received_packet)} bytes, expected {packet_size} bytes")
+                        print(f"Packet size mismatch for request ID {request_id}: received {received_bytes} bytes, expected {packet_size} bytes")
                         flush_udp_buffer(aws_data_socket)  # Flush on error
                 else:
                     print(f"Incomplete packet for request ID {request_id}: received {segments_received}/{total_segments} segments")
@@ -248,10 +294,16 @@ def receive_data_from_server_udp(aws_server_address, num_requests, interval_ms,
                 flush_udp_buffer(aws_data_socket)  # Flush on timeout
                 continue
             
-            # Sleep for the specified interval before sending the next trigger
+            # Sleep until the next trigger is due
             if request_count < num_requests:
-                interval_sec = interval_ms / 1000.0
-                time.sleep(interval_sec)
+                next_trigger += interval_sec
+                delay = next_trigger - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Running late (e.g. a slow response); restart the schedule
+                    # from now instead of sending a burst of catch-up triggers
+                    next_trigger = time.perf_counter()
         
         # Print summary
         if request_count > 0:
@@ -278,8 +330,12 @@ def main():
                         help='Interval between requests in milliseconds (default: 1000)')
     parser.add_argument('--bytes', type=int, default=0,
                         help='Number of bytes per request (default: 0)')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print per-packet messages (DEBUG level)')
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    
     try:
         # Set up UDP socket for AWS server
         aws_server_address = setup_aws_data_socket(args.aws_server_ip)
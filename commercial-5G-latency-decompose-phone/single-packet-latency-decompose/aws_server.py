@@ -2,87 +2,135 @@
 import socket
 import time
 import struct
-import threading
+import asyncio
+import argparse
+import logging
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Configuration
 SERVER_IP = '0.0.0.0'  # Listen on all interfaces
 SERVER_PORT = 5000     # Port for timestamp service
+REQUEST_HEADER = struct.Struct('!I')  # Request size sent once by the client after connecting
+TIMESTAMP = struct.Struct('d')  # Server time, the whole response to each request
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', 12)
+SOCKET_BUFFER_SIZE = 16384  # Send/receive buffer per connection; each holds one small request at a time
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+busy_poll_usec = 0          # Busy-poll time for client sockets (0 = off), set with --busy-poll
+
+log = logging.getLogger("aws_server")
+
+def tune_client_socket(client_socket):
+    """Set per-connection options on an accepted client socket"""
+    options = [
+        # Not inherited from the listener on every platform
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE),
+    ]
+    if busy_poll_usec:
+        # Spin on the device queue in recv instead of waiting for the softirq wakeup
+        options.append((socket.SOL_SOCKET, SO_BUSY_POLL, busy_poll_usec))
+    for level, option, value in options:
+        try:
+            client_socket.setsockopt(level, option, value)
+        except OSError as e:
+            print(f"Could not set socket option {option}: {e}")
 
-def handle_client(client_socket, client_address):
-    """Handle communication with a connected client"""
+async def handle_client(reader, writer):
+    """Answer each request from a connected client with a timestamp"""
+    client_address = writer.get_extra_info('peername')
+    client_socket = writer.get_extra_info('socket')
+    tune_client_socket(client_socket)
+    
+    # Per-request messages are only formatted with --debug
+    debug = log.isEnabledFor(logging.DEBUG)
+    
+    # Cleared if the platform rejects TCP_QUICKACK
+    quickack = True
+    
     try:
         print(f"New connection from {client_address}")
         
+        # The connection starts with the size of the requests that follow
+        header = await reader.readexactly(REQUEST_HEADER.size)
+        request_size = max(REQUEST_HEADER.unpack(header)[0], 1)
+        print(f"Client {client_address} sends {request_size} byte requests")
+        
         while True:
             # Receive request
-            data = client_socket.recv(2048)
-            if not data:
+            try:
+                await reader.readexactly(request_size)
+            except asyncio.IncompleteReadError:
                 # Connection closed by client
                 break
-                
-            # Get current timestamp
-            current_time = time.time()
             
-            # Get size of received data
-            data_size = len(data)
+            # ACK the request immediately instead of on the delayed-ACK timer;
+            # quick ACK mode is not sticky, so re-arm it after each request
+            if quickack:
+                try:
+                    client_socket.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+                except OSError:
+                    quickack = False
             
-            # Create response of the same size
-            # First 8 bytes contain the timestamp
-            timestamp_bytes = struct.pack('d', current_time)
-            
-            # Fill the rest with padding to match the original data size
-            # Always ensure we send at least 8 bytes for the complete timestamp
-            if data_size < 8:
-                # If received data is smaller than 8 bytes, still send full timestamp
-                response = timestamp_bytes
-            else:
-                # If larger, send timestamp + padding
-                padding_size = data_size - 8
-                padding = data[8:] if len(data) > 8 else b'\x00' * padding_size
-                response = timestamp_bytes + padding
+            # Get current timestamp
+            current_time = time.time()
             
-            # Send response back to the client
-            client_socket.sendall(response)
+            # The response is just the timestamp; the request padding is not echoed back
+            writer.write(TIMESTAMP.pack(current_time))
+            await writer.drain()
             
-            print(f"Timestamp sent to {client_address}, response size: {len(response)} bytes")
+            if debug:
+                log.debug(f"Timestamp sent to {client_address} for a {request_size} byte request")
     
+    except asyncio.IncompleteReadError:
+        print(f"Connection from {client_address} closed before the request size header")
     except ConnectionResetError:
         print(f"Connection reset by {client_address}")
     except Exception as e:
         print(f"Error handling client {client_address}: {e}")
     finally:
         # Close the connection
-        client_socket.close()
+        writer.close()
         print(f"Connection closed with {client_address}")
 
-def main():
-    # Create TCP socket
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+async def serve():
+    """Listen for client connections on SERVER_PORT using TCP"""
+    # All connections are served as coroutines on one event loop (uvloop when
+    # installed, which runs the epoll dispatch in C); each handler only echoes a timestamp
+    server = await asyncio.start_server(handle_client, SERVER_IP, SERVER_PORT,
+                                        reuse_address=True, backlog=5)
     # Disable Nagle algorithm
-    server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-    server_socket.bind((SERVER_IP, SERVER_PORT))
-    server_socket.listen(5)  # Allow up to 5 queued connections
+    for server_socket in server.sockets:
+        server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     
     print(f"AWS Server running on {SERVER_IP}:{SERVER_PORT}")
     
-    try:
-        while True:
-            # Accept new connection
-            client_socket, client_address = server_socket.accept()
-            
-            # Start a new thread to handle this client
-            client_thread = threading.Thread(
-                target=handle_client,
-                args=(client_socket, client_address)
-            )
-            client_thread.daemon = True
-            client_thread.start()
+    async with server:
+        await server.serve_forever()
+
+def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="AWS timestamp server for single-packet latency measurement")
+    parser.add_argument("--debug", action="store_true", help="Print a message for every request (DEBUG level)")
+    parser.add_argument("--busy-poll", type=int, default=0,
+                        help="SO_BUSY_POLL time in microseconds for client sockets (0 = off, needs CAP_NET_ADMIN)")
+    args = parser.parse_args()
+    
+    global busy_poll_usec
+    busy_poll_usec = args.busy_poll
+    
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
     
+    if uvloop is not None:
+        uvloop.install()
+    try:
+        asyncio.run(serve())
     except KeyboardInterrupt:
         print("Server shutting down...")
-    finally:
-        server_socket.close()
 
 if __name__ == "__main__":
     main()
@@ -4,17 +4,66 @@ import time
 import struct
 import threading
 import argparse
+import logging
 
 # Configuration
 AWS_SERVER_PORT = 5000       # Port for timestamp service
 CLIENT_SERVER_PORT = 5001    # Port on client server to send data to
+REQUEST_HEADER = struct.Struct('!I')  # Request size, sent once to the AWS server after connecting
+TIMESTAMP = struct.Struct('d')   # Server timestamp, the whole response to each request
+REPORT = struct.Struct('ddd')    # server_timestamp, rtt, phone_receive_time sent to the client server
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', 12)
+SOCKET_BUFFER_SIZE = 16384   # Send/receive buffer per connection; each carries one small message at a time
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+KEEPALIVE_IDLE = 2           # Seconds idle before the first keepalive probe
+KEEPALIVE_INTERVAL = 1       # Seconds between keepalive probes
+KEEPALIVE_COUNT = 3          # Unanswered probes before the connection is dropped
+USER_TIMEOUT_MS = 5000       # Unacknowledged data older than this drops the connection
 
 # Global variables
 aws_socket = None            # TCP connection to AWS server
 client_socket = None         # TCP connection to client server
+busy_poll_usec = 0           # Busy-poll time for the AWS socket (0 = off), set with --busy-poll
 
-def connect_to_aws_server(aws_server_ip):
-    """Establish TCP connection to AWS server"""
+log = logging.getLogger("phone_client")
+
+def set_socket_buffers(sock):
+    """Use small fixed send/receive buffers instead of the autotuned defaults"""
+    # Not every platform (e.g. iSH on iOS) accepts these, so failures are only reported
+    for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, SOCKET_BUFFER_SIZE)
+        except OSError as e:
+            print(f"Could not set socket option {option}: {e}")
+
+def set_keepalive(sock):
+    """Have the kernel detect a dead peer within seconds instead of on the next failed send"""
+    options = [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        (socket.IPPROTO_TCP, getattr(socket, 'TCP_KEEPIDLE', 4), KEEPALIVE_IDLE),
+        (socket.IPPROTO_TCP, getattr(socket, 'TCP_KEEPINTVL', 5), KEEPALIVE_INTERVAL),
+        (socket.IPPROTO_TCP, getattr(socket, 'TCP_KEEPCNT', 6), KEEPALIVE_COUNT),
+        (socket.IPPROTO_TCP, getattr(socket, 'TCP_USER_TIMEOUT', 18), USER_TIMEOUT_MS),
+    ]
+    # Not every platform (e.g. iSH on iOS) accepts these, so failures are only reported
+    for level, option, value in options:
+        try:
+            sock.setsockopt(level, option, value)
+        except OSError as e:
+            print(f"Could not set socket option {option}: {e}")
+
+def set_busy_poll(sock):
+    """Let recv spin on the device queue for busy_poll_usec instead of waiting for the softirq wakeup"""
+    if not busy_poll_usec:
+        return
+    # Needs CAP_NET_ADMIN (or a net.core.busy_read default), so failures are only reported
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, busy_poll_usec)
+    except OSError as e:
+        print(f"Could not set SO_BUSY_POLL: {e}")
+
+def connect_to_aws_server(aws_server_ip, packet_size):
+    """Establish TCP connection to AWS server and announce the request size"""
     global aws_socket
     
     while True:
@@ -23,7 +72,12 @@ def connect_to_aws_server(aws_server_ip):
             aws_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             # Disable Nagle algorithm
             aws_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            set_socket_buffers(aws_socket)
+            set_keepalive(aws_socket)
+            set_busy_poll(aws_socket)
             aws_socket.connect((aws_server_ip, AWS_SERVER_PORT))
+            # The server reads requests of this size and answers each with an 8-byte timestamp
+            aws_socket.sendall(REQUEST_HEADER.pack(packet_size))
             print(f"Connected to AWS server at {aws_server_ip}:{AWS_SERVER_PORT}")
             return
         except Exception as e:
@@ -41,6 +95,8 @@ def connect_to_client_server(client_server_ip):
             client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             # Disable Nagle algorithm
             client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            set_socket_buffers(client_socket)
+            set_keepalive(client_socket)
             client_socket.connect((client_server_ip, CLIENT_SERVER_PORT))
             print(f"Connected to client server at {client_server_ip}:{CLIENT_SERVER_PORT}")
             return
@@ -49,71 +105,112 @@ def connect_to_client_server(client_server_ip):
             print("Retrying in 5 seconds...")
             time.sleep(5)
 
-def measure_rtt_and_report(aws_server_ip, client_server_ip, packet_size, measurement_interval):
+def measure_rtt_and_report(aws_server_ip, client_server_ip, packet_size, measurement_interval, print_every):
     """Measure RTT to AWS server and report to client server"""
     global aws_socket, client_socket
     
     # Create a packet of specified size
     packet = b'x' * packet_size
     
+    # Reports are packed into one reused buffer
+    report_data = bytearray(REPORT.size)
+    report_view = memoryview(report_data)
+    
+    # The server responds to each request with just its 8-byte timestamp,
+    # received into one reused buffer. Together with the packet and report
+    # buffers above, the measurement loop allocates no buffers per probe
+    expected_size = TIMESTAMP.size
+    response = bytearray(expected_size)
+    response_view = memoryview(response)
+    
+    # Per-chunk messages are only formatted with --debug; they fall inside the RTT
+    debug = log.isEnabledFor(logging.DEBUG)
+    
+    # Cleared if the platform (e.g. iSH on iOS) rejects TCP_QUICKACK
+    quickack = True
+    
+    # Only every print_every-th RTT is printed; every RTT is still reported
+    measurement_count = 0
+    
+    # Functions called on every probe are bound to locals once; the socket
+    # methods are rebound whenever a reconnect replaces the socket
+    monotonic_ns = time.monotonic_ns
+    wall_time = time.time
+    unpack_timestamp = TIMESTAMP.unpack_from
+    pack_report = REPORT.pack_into
+    waitall = socket.MSG_WAITALL
+    bound_aws_socket = bound_client_socket = None
+    
     while True:
         try:
             # Ensure we have connections
             if aws_socket is None:
-                connect_to_aws_server(aws_server_ip)
+                connect_to_aws_server(aws_server_ip, packet_size)
             if client_socket is None:
                 connect_to_client_server(client_server_ip)
+            if aws_socket is not bound_aws_socket:
+                bound_aws_socket = aws_socket
+                send_packet = aws_socket.sendall
+                recv_into = aws_socket.recv_into
+                setsockopt = aws_socket.setsockopt
+            if client_socket is not bound_client_socket:
+                bound_client_socket = client_socket
+                send_report = client_socket.send
                 
-            # Record send time
-            send_time = time.time()
+            # Record send time; the RTT is a local interval, so it is taken from the
+            # monotonic clock, which NTP adjustments can't make jump
+            send_ns = monotonic_ns()
             
             # Send packet to AWS server with specified size
-            aws_socket.sendall(packet)
+            send_packet(packet)
             
-            # Receive response from AWS server - collect all data until we get expected size
-            # The server will respond with at least packet_size bytes (or 8 bytes if packet_size < 8)
-            expected_size = max(packet_size, 8)  # At least 8 bytes for timestamp
-            
-            chunks = []
+            # Receive response from AWS server - fill the buffer until we have the timestamp
             bytes_received = 0
             
             while bytes_received < expected_size:
-                chunk = aws_socket.recv(2048)
-                if not chunk:
+                # MSG_WAITALL normally returns the whole timestamp from one call; the
+                # buffer is only sliced (allocating a view) after a short read
+                target = response_view[bytes_received:] if bytes_received else response
+                chunk_size = recv_into(target, 0, waitall)
+                if not chunk_size:
                     # Connection closed
                     raise ConnectionError("AWS server connection closed during receive")
                     
-                chunks.append(chunk)
-                bytes_received += len(chunk)
-                print(f"Received chunk: {len(chunk)} bytes, total: {bytes_received} bytes")
-            
-            # Combine all received chunks
-            data = b''.join(chunks)
+                bytes_received += chunk_size
+                
+                # ACK the response immediately instead of on the delayed-ACK timer;
+                # quick ACK mode is not sticky, so re-arm it after each read
+                if quickack:
+                    try:
+                        setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+                    except OSError:
+                        quickack = False
+                if debug:
+                    log.debug(f"Received chunk: {chunk_size} bytes, total: {bytes_received} bytes")
             
-            # Record receive time
-            receive_time = time.time()
+            # Record receive time (the wall-clock time is reported to the client server)
+            receive_ns = monotonic_ns()
+            receive_time = wall_time()
             
             # Print data size for debugging
-            print(f"Total data received: {len(data)} bytes (expected at least {expected_size} bytes)")
+            if debug:
+                log.debug(f"Total data received: {bytes_received} bytes (expected {expected_size} bytes)")
             
             # Calculate RTT
-            rtt = receive_time - send_time
+            rtt = (receive_ns - send_ns) / 1_000_000_000
             
-            # Make sure we have at least 8 bytes for the timestamp
-            if len(data) < 8:
-                print(f"Error: Received only {len(data)} bytes, need at least 8 bytes for timestamp")
-                time.sleep(1)
-                continue
-                
             # Unpack timestamp from the first 8 bytes of response
-            server_timestamp = struct.unpack('d', data[:8])[0]
+            server_timestamp = unpack_timestamp(response)[0]
             
             # Pack data to send to client server: server_timestamp, rtt, phone_receive_time
-            report_data = struct.pack('ddd', server_timestamp, rtt, receive_time)
+            pack_report(report_data, 0, server_timestamp, rtt, receive_time)
             
             try:
-                # Send data to client server
-                client_socket.sendall(report_data)
+                # Send data to client server; the 24-byte report fits in one send
+                # and sendall only finishes the rare short write
+                sent = send_report(report_data)
+                if sent < REPORT.size:
+                    client_socket.sendall(report_view[sent:])
             except Exception as e:
                 print(f"Error sending data to client server: {e}")
                 # Try to reconnect
@@ -123,7 +220,9 @@ def measure_rtt_and_report(aws_server_ip, client_server_ip, packet_size, measure
                 # Try to send again
                 client_socket.sendall(report_data)
             
-            print(f"RTT to AWS server: {rtt*1000:.2f}ms, reported to client server")
+            measurement_count += 1
+            if measurement_count % print_every == 0:
+                print(f"RTT to AWS server: {rtt*1000:.2f}ms, reported to client server")
             
             # Wait for next measurement interval
             time.sleep(measurement_interval)
@@ -146,13 +245,23 @@ def main():
     parser.add_argument("--client-ip", default="0.0.0.0", help="Client server IP address")
     parser.add_argument("--packet-size", type=int, default=1, help="Size of packet to send to AWS server (max 1400 bytes)", choices=range(1, 1401))
     parser.add_argument("--interval", type=float, default=1.0, help="Measurement interval in seconds")
+    parser.add_argument("--print-every", type=int, default=1, help="Print every Nth RTT measurement")
+    parser.add_argument("--busy-poll", type=int, default=0,
+                        help="SO_BUSY_POLL time in microseconds for the AWS socket (0 = off, needs CAP_NET_ADMIN)")
+    parser.add_argument("--debug", action="store_true", help="Print per-chunk receive messages (DEBUG level)")
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    
     # Configuration from command-line arguments
     aws_server_ip = args.aws_ip
     client_server_ip = args.client_ip
     packet_size = args.packet_size
     measurement_interval = args.interval
+    print_every = max(args.print_every, 1)
+    
+    global busy_poll_usec
+    busy_poll_usec = args.busy_poll
     
     print(f"Starting Samsung phone RTT measurement app")
     print(f"AWS Server: {aws_server_ip}:{AWS_SERVER_PORT}")
@@ -161,7 +270,7 @@ def main():
     print(f"Measurement Interval: {measurement_interval} seconds")
     
     # Connect to servers
-    connect_to_aws_server(aws_server_ip)
+    connect_to_aws_server(aws_server_ip, packet_size)
     connect_to_client_server(client_server_ip)
     
     # Start thread for RTT measurement
@@ -171,7 +280,8 @@ def main():
             aws_server_ip, 
             client_server_ip, 
             packet_size, 
-            measurement_interval
+            measurement_interval,
+            print_every
         ),
         daemon=True
     )
@@ -12,6 +12,8 @@ PHONE_UDP_PORT = 5002       # Port for receiving data from phone client (UDP)
 TIME_SYNC_INTERVAL = 1      # Send sync packets every 1 second
 MAX_UDP_SEGMENT = 4096      # Maximum UDP segment size
 UDP_BUFFER_SIZE = 4194304   # Buffer size for UDP socket (4MB)
+BUSY_POLL_USEC = 50         # Busy-poll window for the UDP socket (microseconds)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)  # Not exported by the socket module on all versions
 
 # Global variables
 client_socket = None        # Socket for connected client
@@ -129,7 +131,7 @@ def sync_time_with_client(client_sock, client_address):
             client_sock.sendall(timestamp_bytes)
             
             # Wait for response
-            response = client_sock.recv(8)  # Expecting an 8-byte double
+            response = client_sock.recv(8, socket.MSG_WAITALL)  # Expecting an 8-byte double; WAITALL avoids short reads
             
             # Record receive time
             receive_time = time.time()
@@ -176,6 +178,12 @@ def handle_phone_udp_data():
     # Set large buffer size
     udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_BUFFER_SIZE)
     
+    # Busy-poll the NIC queue briefly instead of sleeping until the interrupt wakeup
+    try:
+        udp_socket.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_USEC)
+    except OSError as e:
+        print(f"SO_BUSY_POLL not enabled on UDP socket: {e}")
+    
     # Bind to port
     udp_socket.bind((SERVER_IP, PHONE_UDP_PORT))
     
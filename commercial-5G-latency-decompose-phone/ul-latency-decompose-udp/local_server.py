@@ -4,6 +4,7 @@ import time
 import struct
 import threading
 import argparse
+import logging
 
 # Configuration
 AWS_SERVER_IP_PORT = 5000       # Port for timestamp service
@@ -21,6 +22,8 @@ num_requests = 10               # Number of requests to send
 bytes_per_request = 1           # Number of bytes per request
 should_send = False             # Flag to control sending
 
+log = logging.getLogger("local_server")
+
 def connect_to_aws_time_server(aws_server_ip):
     """Establish TCP connection to AWS server for time synchronization"""
     global aws_time_socket
@@ -47,7 +50,7 @@ def listen_for_aws_sync():
         while running:
             try:
                 # Wait for timestamp from AWS server
-                data = aws_time_socket.recv(8)  # Expect an 8-byte double
+                data = aws_time_socket.recv(8, socket.MSG_WAITALL)  # Expect an 8-byte double; WAITALL avoids short reads
                 if not data or len(data) < 8:
                     # Connection closed or invalid data
                     if not data:
@@ -68,7 +71,7 @@ def listen_for_aws_sync():
                 response = struct.pack('!d', client_timestamp)
                 aws_time_socket.sendall(response)
                 
-                print(f"Received sync from AWS - Server time: {server_timestamp:.6f}, responded with: {client_timestamp:.6f}")
+                log.debug(f"Received sync from AWS - Server time: {server_timestamp:.6f}, responded with: {client_timestamp:.6f}")
                 
             except socket.timeout:
                 # Socket timeout, just continue the loop
@@ -113,11 +116,13 @@ def handle_phone_client(client_address):
     """Send data packets to phone client via UDP"""
     global phone_client_address, running, num_requests, bytes_per_request, phone_udp_socket
     
+    debug = log.isEnabledFor(logging.DEBUG)
+    
     try:
         # Store the client address globally
         phone_client_address = client_address
         
-        print(f"Phone client registered from {client_address}")
+        log.info(f"Phone client registered from {client_address}")
         
         # Send data in this thread
         requests_sent = 0
@@ -137,22 +142,23 @@ def handle_phone_client(client_address):
                 try:
                     phone_udp_socket.sendto(header, client_address)
                     requests_sent += 1
-                    print(f"Sent request {request_id}/{num_requests} to phone client - timestamp: {timestamp:.6f}")
+                    if debug:
+                        log.debug(f"Sent request {request_id}/{num_requests} to phone client - timestamp: {timestamp:.6f}")
                 except Exception as e:
-                    print(f"Error sending UDP packet to phone client: {e}")
+                    log.error(f"Error sending UDP packet to phone client: {e}")
                     break
                 
                 # Sleep before sending next packet
                 time.sleep(PACKET_INTERVAL)
                 
             except Exception as e:
-                print(f"Error sending data to phone client: {e}")
+                log.error(f"Error sending data to phone client: {e}")
                 time.sleep(1)  # Avoid tight loop on error
         
-        print(f"Completed sending {requests_sent}/{num_requests} requests to phone client")
+        log.info(f"Completed sending {requests_sent}/{num_requests} requests to phone client")
             
     except Exception as e:
-        print(f"Error handling phone client {client_address}: {e}")
+        log.error(f"Error handling phone client {client_address}: {e}")
     finally:
         time.sleep(1)
         # Reset global address if this is the current client
@@ -213,8 +219,12 @@ def main():
                         help='Size in bytes (for information only, no payload is sent)')
     parser.add_argument('--interval', type=int, default=1000,
                         help='Interval between packets in milliseconds (default: 1000)')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print per-request and time sync messages (DEBUG level)')
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    
     # Update request parameters
     num_requests = args.requests
     bytes_per_request = args.bytes
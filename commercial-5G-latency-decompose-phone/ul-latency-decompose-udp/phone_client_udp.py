@@ -1,21 +1,72 @@
 #!/usr/bin/env python3
 import socket
+import sys
+import os
+import ctypes
+import ctypes.util
 import time
 import struct
 import threading
 import argparse
+import logging
 
 # Configuration
 LOCAL_SERVER_IP = '127.0.0.1'   # Local server IP address
 LOCAL_SERVER_PORT = 5001        # Local server port for data connection via UDP
 AWS_SERVER_UDP_PORT = 5002      # AWS server UDP port for data transmission
 MAX_UDP_SEGMENT = 4096          # Maximum UDP segment size
+_PAYLOAD_PER_SEG = MAX_UDP_SEGMENT - 4  # Payload bytes per segment after the 4-byte request ID
+_FULL_SEG = bytes(_PAYLOAD_PER_SEG)     # Zero payload of a full segment, shared by all requests
+_FULL_SEG_VIEW = memoryview(_FULL_SEG)  # Sliced for a short final segment without copying
+_FULL_SEG_ADDRESS = ctypes.cast(ctypes.c_char_p(_FULL_SEG), ctypes.c_void_p).value  # For sendmmsg iovecs
+SENDMMSG_BATCH = 1024           # Maximum datagrams handed to one sendmmsg() call (UIO_MAXIOV)
+BUSY_POLL_USEC = 50             # Busy-poll window for the local UDP socket (microseconds)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)  # Not exported by the socket module on all versions
+
+# Precompiled wire formats
+AWS_HEADER = struct.Struct('!IdI')      # request ID, server timestamp, request size
+SEGMENT_ID = struct.Struct('!I')        # request ID prefix on every payload segment
+LOCAL_HEADER = struct.Struct('!IId')    # request ID, request size, timestamp from the local server
+
+# ctypes layouts for Linux sendmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# libc sendmmsg, or None where it is not available (non-Linux)
+libc_sendmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_sendmmsg = _libc.sendmmsg
+        libc_sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        libc_sendmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_sendmmsg = None
 
 # Global variables
 local_udp_socket = None         # UDP socket for local server communication
 aws_udp_socket = None           # UDP socket for AWS server communication
 running = True                  # Flag to control thread execution
+request_batch = None            # sendmmsg() vector for the last request size, see prepare_request_batch()
+segment_gathers = None          # sendmsg() gather lists for the last request size, see prepare_segment_gathers()
 aws_server_ip = None            # AWS server IP address
+aws_address = None              # (ip, port) of the AWS server, built once in main
+
+log = logging.getLogger("phone_client")
 
 def setup_local_udp_socket():
     """Set up UDP socket for communication with local server"""
@@ -24,10 +75,16 @@ def setup_local_udp_socket():
     try:
         # Create UDP socket
         local_udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        print(f"Set up UDP socket for local server communication")
+        # Busy-poll the NIC queue briefly instead of sleeping until the interrupt wakeup
+        # (needs CAP_NET_ADMIN to raise above net.core.busy_read, ignored if not permitted)
+        try:
+            local_udp_socket.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_USEC)
+        except OSError as e:
+            log.info(f"SO_BUSY_POLL not enabled on local UDP socket: {e}")
+        log.info("Set up UDP socket for local server communication")
         return True
     except Exception as e:
-        print(f"Failed to set up UDP socket for local server: {e}")
+        log.error(f"Failed to set up UDP socket for local server: {e}")
         return False
 
 def register_with_local_server(local_ip):
@@ -35,7 +92,7 @@ def register_with_local_server(local_ip):
     global local_udp_socket
     
     if local_udp_socket is None:
-        print("UDP socket not set up")
+        log.error("UDP socket not set up")
         return False
     
     try:
@@ -44,26 +101,26 @@ def register_with_local_server(local_ip):
         
         # Send registration message
         local_udp_socket.sendto(b'REGISTER', local_address)
-        print(f"Sent registration to local server at {local_ip}:{LOCAL_SERVER_PORT}")
+        log.info(f"Sent registration to local server at {local_ip}:{LOCAL_SERVER_PORT}")
         
         # Wait for acknowledgment
         local_udp_socket.settimeout(5)  # 5-second timeout
         try:
             data, addr = local_udp_socket.recvfrom(1024)
             if data == b'ACK':
-                print(f"Registration acknowledged by local server at {addr}")
+                log.info(f"Registration acknowledged by local server at {addr}")
                 # Reset timeout to non-blocking for receiving data
                 local_udp_socket.settimeout(None)
                 return True
             else:
-                print(f"Unexpected response from local server: {data}")
+                log.error(f"Unexpected response from local server: {data}")
                 return False
         except socket.timeout:
-            print(f"Timeout waiting for acknowledgment from local server")
+            log.error(f"Timeout waiting for acknowledgment from local server")
             return False
         
     except Exception as e:
-        print(f"Failed to register with local server: {e}")
+        log.error(f"Failed to register with local server: {e}")
         return False
 
 def setup_aws_udp_socket():
@@ -73,61 +130,158 @@ def setup_aws_udp_socket():
     try:
         # Create UDP socket
         aws_udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        print(f"Set up UDP socket for AWS server communication")
+        # Fix the destination once so each send skips the address conversion
+        aws_udp_socket.connect(aws_address)
+        log.info("Set up UDP socket for AWS server communication")
         return True
     except Exception as e:
-        print(f"Failed to set up UDP socket: {e}")
+        log.error(f"Failed to set up UDP socket: {e}")
         return False
 
+def prepare_request_batch(request_size):
+    """
+    Build the sendmmsg() message vector for a request: the AWS header, then every
+    payload segment as the request ID prefix plus a slice of the shared zero payload
+    
+    Args:
+        request_size: Payload size of the request in bytes
+    
+    Returns:
+        tuple: (request_size, header, rid_prefix, msgs, iovecs); header and rid_prefix
+               are packed in place for each request, iovecs keeps the pointed-to memory alive
+    """
+    header = bytearray(AWS_HEADER.size)
+    rid_prefix = bytearray(SEGMENT_ID.size)
+    total_segments = (request_size + _PAYLOAD_PER_SEG - 1) // _PAYLOAD_PER_SEG
+    count = 1 + total_segments
+    
+    # Two iovecs per message; the header message only uses the first
+    iovecs = (Iovec * (2 * count))()
+    msgs = (Mmsghdr * count)()
+    iovecs[0].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(header))
+    iovecs[0].iov_len = len(header)
+    rid_address = ctypes.addressof(ctypes.c_char.from_buffer(rid_prefix))
+    for i in range(1, count):
+        offset = (i - 1) * _PAYLOAD_PER_SEG
+        iovecs[2 * i].iov_base = rid_address
+        iovecs[2 * i].iov_len = len(rid_prefix)
+        iovecs[2 * i + 1].iov_base = _FULL_SEG_ADDRESS
+        iovecs[2 * i + 1].iov_len = min(_PAYLOAD_PER_SEG, request_size - offset)
+    for i in range(count):
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[2 * i])
+        msgs[i].msg_hdr.msg_iovlen = 2 if i else 1
+    return request_size, header, rid_prefix, msgs, iovecs
+
+def prepare_segment_gathers(request_size):
+    """
+    Build the sendmsg() gather lists of every payload segment of a request, for
+    platforms without sendmmsg()
+    
+    Args:
+        request_size: Payload size of the request in bytes
+    
+    Returns:
+        tuple: (request_size, rid_prefix, gathers); rid_prefix is packed in place for
+               each request and every gather list is [rid_prefix, payload view]
+    """
+    rid_prefix = bytearray(SEGMENT_ID.size)
+    gathers = [[rid_prefix, _FULL_SEG_VIEW[:min(_PAYLOAD_PER_SEG, request_size - i)]]
+               for i in range(0, request_size, _PAYLOAD_PER_SEG)]
+    return request_size, rid_prefix, gathers
+
+def send_request_batch(request_id, request_size, server_timestamp):
+    """
+    Send a request's header and all its segments to the AWS server with sendmmsg()
+    
+    Args:
+        request_id: Request ID from the local server
+        request_size: Payload size of the request in bytes
+        server_timestamp: Timestamp from the local server
+    
+    Returns:
+        int: Number of payload segments sent
+    """
+    global request_batch
+    
+    # The message vector only depends on the request size, so consecutive
+    # requests of the same size just repack the header and request ID
+    if request_batch is None or request_batch[0] != request_size:
+        request_batch = prepare_request_batch(request_size)
+    header, rid_prefix, msgs = request_batch[1:4]
+    AWS_HEADER.pack_into(header, 0, request_id, server_timestamp, request_size)
+    SEGMENT_ID.pack_into(rid_prefix, 0, request_id)
+    
+    # At most SENDMMSG_BATCH per call, and sendmmsg may send fewer messages than
+    # requested; resume from where it stopped
+    count = len(msgs)
+    fd = aws_udp_socket.fileno()
+    msgs_address = ctypes.addressof(msgs)
+    msg_size = ctypes.sizeof(Mmsghdr)
+    sent = 0
+    while sent < count:
+        result = libc_sendmmsg(fd, msgs_address + sent * msg_size, min(count - sent, SENDMMSG_BATCH), 0)
+        if result < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        sent += result
+    return count - 1
+
 def send_data_to_aws(request_id, request_size, server_timestamp):
     """Send data to AWS server over UDP"""
-    global aws_udp_socket, aws_server_ip
+    global aws_udp_socket, aws_address, segment_gathers
     
-    if aws_udp_socket is None or aws_server_ip is None:
-        print("AWS socket or server IP not set up")
+    if aws_udp_socket is None or aws_address is None:
+        log.error("AWS socket or server IP not set up")
         return False
     
+    # Evaluate once so the per-segment loop does no logging work when debug is off
+    debug = log.isEnabledFor(logging.DEBUG)
+    
     try:
+        if libc_sendmmsg is not None:
+            # Linux: the header and every segment go out in one sendmmsg() call
+            # instead of a syscall per datagram
+            segments_sent = send_request_batch(request_id, request_size, server_timestamp)
+            if debug:
+                log.debug(f"Sent header and {segments_sent} segments to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
+            log.info(f"Completed sending data to AWS server - Request ID: {request_id}, Size: {request_size} bytes in {segments_sent} segments")
+            return True
+        
         # Create header with request_id, server_timestamp
         # Format: !Id = 4-byte unsigned int + 8-byte double = 12 bytes total
-        header = struct.pack('!IdI', request_id, server_timestamp, request_size)
-        
-        # Create destination address
-        aws_address = (aws_server_ip, AWS_SERVER_UDP_PORT)
+        header = AWS_HEADER.pack(request_id, server_timestamp, request_size)
         
         # Send header to AWS server
-        aws_udp_socket.sendto(header, aws_address)
-        print(f"Sent header to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
+        aws_udp_socket.send(header)
+        if debug:
+            log.debug(f"Sent header to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
         
-        # Create payload of specified size
-        payload = b'\x00' * request_size
+        # Request ID prefixed to each segment (4 bytes). Segments are gathered by
+        # sendmsg() from the prefix and the shared zero payload; the gather lists
+        # only depend on the request size, so consecutive requests of the same
+        # size just repack the request ID
+        if segment_gathers is None or segment_gathers[0] != request_size:
+            segment_gathers = prepare_segment_gathers(request_size)
+        rid_prefix, gathers = segment_gathers[1:]
+        SEGMENT_ID.pack_into(rid_prefix, 0, request_id)
         
-        # Split payload into segments if needed
         segments_sent = 0
-        total_segments = (request_size + MAX_UDP_SEGMENT - 5) // (MAX_UDP_SEGMENT - 4) if request_size > 0 else 0
+        total_segments = len(gathers)
+        sendmsg = aws_udp_socket.sendmsg
         
-        for i in range(0, request_size, MAX_UDP_SEGMENT - 4):
-            # Get segment size
-            segment_end = min(i + MAX_UDP_SEGMENT - 4, request_size)
-            
-            # Get the segment data
-            segment_data = payload[i:segment_end]
-            
-            # Add request ID to each segment (4 bytes)
-            segment = struct.pack('!I', request_id) + segment_data
-            
+        for segment in gathers:
             # Send segment
-            aws_udp_socket.sendto(segment, aws_address)
+            sendmsg(segment)
             segments_sent += 1
             
-            if segments_sent % 10 == 0 or segments_sent == total_segments:
-                print(f"Sent segment {segments_sent}/{total_segments} to AWS server")
+            if debug and (segments_sent % 10 == 0 or segments_sent == total_segments):
+                log.debug(f"Sent segment {segments_sent}/{total_segments} to AWS server")
         
-        print(f"Completed sending data to AWS server - Request ID: {request_id}, Size: {request_size} bytes in {segments_sent} segments")
+        log.info(f"Completed sending data to AWS server - Request ID: {request_id}, Size: {request_size} bytes in {segments_sent} segments")
         return True
         
     except Exception as e:
-        print(f"Error sending data to AWS server: {e}")
+        log.error(f"Error sending data to AWS server: {e}")
         return False
 
 def receive_data_from_local_server():
@@ -135,6 +289,7 @@ def receive_data_from_local_server():
     global local_udp_socket, running
     
     data_count = 0
+    debug = log.isEnabledFor(logging.DEBUG)
     
     try:
         while running:
@@ -144,30 +299,31 @@ def receive_data_from_local_server():
                 
                 # Check that we received enough data for a header
                 if len(data) < 16:
-                    print(f"Incomplete header received: {len(data)} bytes, expected at least 16 bytes")
+                    log.warning(f"Incomplete header received: {len(data)} bytes, expected at least 16 bytes")
                     continue
                 
                 # Parse header - first 16 bytes are the header
                 # Header: request_id (4 bytes), size (4 bytes), timestamp (8 bytes)
-                request_id, request_size, server_timestamp = struct.unpack('!IId', data[:16])
+                request_id, request_size, server_timestamp = LOCAL_HEADER.unpack_from(data)
                 
                 data_count += 1
-                print(f"Received packet {data_count} from local server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
+                if debug:
+                    log.debug(f"Received packet {data_count} from local server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
                 
                 # Forward data to AWS server
                 send_data_to_aws(request_id, request_size, server_timestamp)
                 
             except Exception as e:
-                print(f"Error receiving data from local server: {e}")
+                log.error(f"Error receiving data from local server: {e}")
                 break
     
     except Exception as e:
-        print(f"Error in data reception thread: {e}")
+        log.error(f"Error in data reception thread: {e}")
     finally:
-        print(f"Data reception thread exited, received {data_count} packets total")
+        log.info(f"Data reception thread exited, received {data_count} packets total")
 
 def main():
-    global local_udp_socket, aws_udp_socket, running, aws_server_ip
+    global local_udp_socket, aws_udp_socket, running, aws_server_ip, aws_address
     
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='Phone client for latency decomposition')
@@ -175,27 +331,33 @@ def main():
                         help=f'IP address of the local server (default: {LOCAL_SERVER_IP})')
     parser.add_argument('--aws-ip', dest='aws_server_ip', required=True,
                         help='IP address of the AWS server')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print per-packet messages (DEBUG level)')
     args = parser.parse_args()
     
+    # Per-packet output is off by default; it costs a stdout write per packet
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    
     # Store AWS server IP
     aws_server_ip = args.aws_server_ip
+    aws_address = (aws_server_ip, AWS_SERVER_UDP_PORT)
     
     try:
         # Set up UDP socket for AWS server communication
         if not setup_aws_udp_socket():
-            print("Failed to set up UDP socket for AWS server, exiting...")
+            log.error("Failed to set up UDP socket for AWS server, exiting...")
             running = False
             return
             
         # Set up UDP socket for local server
         if not setup_local_udp_socket():
-            print("Failed to set up UDP socket for local server, exiting...")
+            log.error("Failed to set up UDP socket for local server, exiting...")
             running = False
             return
         
         # Register with local server
         if not register_with_local_server(args.local_server_ip):
-            print("Failed to register with local server, exiting...")
+            log.error("Failed to register with local server, exiting...")
             running = False
             return
         
@@ -204,15 +366,15 @@ def main():
         reception_thread.daemon = True
         reception_thread.start()
         
-        print(f"Phone client running. Registered with local server and ready to forward data to AWS server at {aws_server_ip}:{AWS_SERVER_UDP_PORT}")
-        print("Press Ctrl+C to exit.")
+        log.info(f"Phone client running. Registered with local server and ready to forward data to AWS server at {aws_server_ip}:{AWS_SERVER_UDP_PORT}")
+        log.info("Press Ctrl+C to exit.")
         
         # Keep the main thread running
         try:
             while running:
                 time.sleep(0.1)
         except KeyboardInterrupt:
-            print("Exiting...")
+            log.info("Exiting...")
             running = False
         
     finally:
@@ -129,7 +129,7 @@ def sync_time_with_client(client_sock, client_address):
             client_sock.sendall(timestamp_bytes)
             
             # Wait for response
-            response = client_sock.recv(8)  # Expecting an 8-byte double
+            response = client_sock.recv(8, socket.MSG_WAITALL)  # Expecting an 8-byte double; WAITALL avoids short reads
             
             # Record receive time
             receive_time = time.time()
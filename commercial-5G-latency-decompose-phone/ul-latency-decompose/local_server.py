@@ -47,7 +47,7 @@ def listen_for_aws_sync():
         while running:
             try:
                 # Wait for timestamp from AWS server
-                data = aws_time_socket.recv(8)  # Expect an 8-byte double
+                data = aws_time_socket.recv(8, socket.MSG_WAITALL)  # Expect an 8-byte double; WAITALL avoids short reads
                 if not data or len(data) < 8:
                     # Connection closed or invalid data
                     if not data:
@@ -1,21 +1,70 @@
 #!/usr/bin/env python3
 import socket
+import sys
+import os
+import ctypes
+import ctypes.util
 import time
 import struct
 import threading
 import argparse
+import logging
 
 # Configuration
 LOCAL_SERVER_IP = '127.0.0.1'   # Local server IP address
 LOCAL_SERVER_PORT = 5001        # Local server port for data connection
 AWS_SERVER_UDP_PORT = 5002      # AWS server UDP port for data transmission
 MAX_UDP_SEGMENT = 4096          # Maximum UDP segment size
+_PAYLOAD_PER_SEG = MAX_UDP_SEGMENT - 4  # Payload bytes per segment after the 4-byte request ID
+_FULL_SEG = bytes(_PAYLOAD_PER_SEG)     # Zero payload of a full segment, shared by all requests
+_FULL_SEG_VIEW = memoryview(_FULL_SEG)  # Sliced for a short final segment without copying
+_FULL_SEG_ADDRESS = ctypes.cast(ctypes.c_char_p(_FULL_SEG), ctypes.c_void_p).value  # For sendmmsg iovecs
+SENDMMSG_BATCH = 1024           # Maximum datagrams handed to one sendmmsg() call (UIO_MAXIOV)
+LOCAL_HEADER = struct.Struct('!IId')  # request_id (4) + size (4) + timestamp (8) from the local server
+AWS_HEADER = struct.Struct('!IdI')      # request ID, server timestamp, request size
+SEGMENT_ID = struct.Struct('!I')        # request ID prefix on every payload segment
+LOCAL_RCVBUF = 262144           # Receive buffer for the local server connection
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', 12)
+
+log = logging.getLogger("phone_client")
+
+# ctypes layouts for Linux sendmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# libc sendmmsg, or None where it is not available (non-Linux)
+libc_sendmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_sendmmsg = _libc.sendmmsg
+        libc_sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        libc_sendmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_sendmmsg = None
 
 # Global variables
 local_server_socket = None      # TCP connection to local server
 aws_udp_socket = None           # UDP socket for AWS server communication
 running = True                  # Flag to control thread execution
+request_batch = None            # sendmmsg() vector for the last request size, see prepare_request_batch()
+segment_gathers = None          # sendmsg() gather lists for the last request size, see prepare_segment_gathers()
 aws_server_ip = None            # AWS server IP address
+aws_address = None              # (ip, port) of the AWS server, built once in main
 
 def connect_to_local_server(local_ip):
     """Establish TCP connection to local server for data reception"""
@@ -26,6 +75,18 @@ def connect_to_local_server(local_ip):
         local_server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # Disable Nagle algorithm
         local_server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # ACK headers immediately, and don't wake up for less than one full header;
+        # not every platform (e.g. iSH on iOS) supports these, so failures are only reported
+        options = [
+            (socket.IPPROTO_TCP, TCP_QUICKACK, 1),
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, LOCAL_RCVBUF),
+            (socket.SOL_SOCKET, socket.SO_RCVLOWAT, LOCAL_HEADER.size),
+        ]
+        for level, option, value in options:
+            try:
+                local_server_socket.setsockopt(level, option, value)
+            except OSError as e:
+                print(f"Could not set socket option {option}: {e}")
         local_server_socket.connect((local_ip, LOCAL_SERVER_PORT))
         print(f"Connected to local server at {local_ip}:{LOCAL_SERVER_PORT}")
         return True
@@ -46,49 +107,163 @@ def setup_aws_udp_socket():
         print(f"Failed to set up UDP socket: {e}")
         return False
 
+def make_sockaddr_in(address):
+    """
+    Pack an (ip, port) tuple into a struct sockaddr_in for sendmmsg
+    
+    Args:
+        address: IPv4 address tuple (ip, port)
+    
+    Returns:
+        ctypes buffer holding the sockaddr_in
+    """
+    ip, port = address
+    sockaddr = struct.pack('=H', socket.AF_INET) + struct.pack('!H', port) + socket.inet_aton(ip) + bytes(8)
+    return ctypes.create_string_buffer(sockaddr, len(sockaddr))
+
+def prepare_request_batch(request_size, aws_address):
+    """
+    Build the sendmmsg() message vector for a request: the AWS header, then every
+    payload segment as the request ID prefix plus a slice of the shared zero payload
+    
+    Args:
+        request_size: Payload size of the request in bytes
+        aws_address: AWS server address tuple (ip, port)
+    
+    Returns:
+        tuple: (request_size, header, rid_prefix, msgs, iovecs, sockaddr); header and
+               rid_prefix are packed in place for each request, iovecs and sockaddr keep
+               the pointed-to memory alive
+    """
+    sockaddr = make_sockaddr_in(aws_address)
+    header = bytearray(AWS_HEADER.size)
+    rid_prefix = bytearray(SEGMENT_ID.size)
+    total_segments = (request_size + _PAYLOAD_PER_SEG - 1) // _PAYLOAD_PER_SEG
+    count = 1 + total_segments
+    
+    # Two iovecs per message; the header message only uses the first
+    iovecs = (Iovec * (2 * count))()
+    msgs = (Mmsghdr * count)()
+    iovecs[0].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(header))
+    iovecs[0].iov_len = len(header)
+    rid_address = ctypes.addressof(ctypes.c_char.from_buffer(rid_prefix))
+    for i in range(1, count):
+        offset = (i - 1) * _PAYLOAD_PER_SEG
+        iovecs[2 * i].iov_base = rid_address
+        iovecs[2 * i].iov_len = len(rid_prefix)
+        iovecs[2 * i + 1].iov_base = _FULL_SEG_ADDRESS
+        iovecs[2 * i + 1].iov_len = min(_PAYLOAD_PER_SEG, request_size - offset)
+    for i in range(count):
+        msgs[i].msg_hdr.msg_name = ctypes.cast(sockaddr, ctypes.c_void_p)
+        msgs[i].msg_hdr.msg_namelen = len(sockaddr)
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[2 * i])
+        msgs[i].msg_hdr.msg_iovlen = 2 if i else 1
+    return request_size, header, rid_prefix, msgs, iovecs, sockaddr
+
+def prepare_segment_gathers(request_size):
+    """
+    Build the sendmsg() gather lists of every payload segment of a request, for
+    platforms without sendmmsg()
+    
+    Args:
+        request_size: Payload size of the request in bytes
+    
+    Returns:
+        tuple: (request_size, rid_prefix, gathers); rid_prefix is packed in place for
+               each request and every gather list is [rid_prefix, payload view]
+    """
+    rid_prefix = bytearray(SEGMENT_ID.size)
+    gathers = [[rid_prefix, _FULL_SEG_VIEW[:min(_PAYLOAD_PER_SEG, request_size - i)]]
+               for i in range(0, request_size, _PAYLOAD_PER_SEG)]
+    return request_size, rid_prefix, gathers
+
+def send_request_batch(request_id, request_size, server_timestamp):
+    """
+    Send a request's header and all its segments to the AWS server with sendmmsg()
+    
+    Args:
+        request_id: Request ID from the local server
+        request_size: Payload size of the request in bytes
+        server_timestamp: Timestamp from the local server
+    
+    Returns:
+        int: Number of payload segments sent
+    """
+    global request_batch
+    
+    # The message vector only depends on the request size, so consecutive
+    # requests of the same size just repack the header and request ID
+    if request_batch is None or request_batch[0] != request_size:
+        request_batch = prepare_request_batch(request_size, aws_address)
+    header, rid_prefix, msgs = request_batch[1:4]
+    AWS_HEADER.pack_into(header, 0, request_id, server_timestamp, request_size)
+    SEGMENT_ID.pack_into(rid_prefix, 0, request_id)
+    
+    # At most SENDMMSG_BATCH per call, and sendmmsg may send fewer messages than
+    # requested; resume from where it stopped
+    count = len(msgs)
+    fd = aws_udp_socket.fileno()
+    msgs_address = ctypes.addressof(msgs)
+    msg_size = ctypes.sizeof(Mmsghdr)
+    sent = 0
+    while sent < count:
+        result = libc_sendmmsg(fd, msgs_address + sent * msg_size, min(count - sent, SENDMMSG_BATCH), 0)
+        if result < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        sent += result
+    return count - 1
+
 def send_data_to_aws(request_id, request_size, server_timestamp):
     """Send data to AWS server over UDP"""
-    global aws_udp_socket, aws_server_ip
+    global aws_udp_socket, aws_address, segment_gathers
     
-    if aws_udp_socket is None or aws_server_ip is None:
+    if aws_udp_socket is None or aws_address is None:
         print("AWS socket or server IP not set up")
         return False
     
+    # Evaluate once so the per-segment loop does no logging work when debug is off
+    debug = log.isEnabledFor(logging.DEBUG)
+    
     try:
+        if libc_sendmmsg is not None:
+            # Linux: the header and every segment go out in one sendmmsg() call
+            # instead of a syscall per datagram
+            segments_sent = send_request_batch(request_id, request_size, server_timestamp)
+            if debug:
+                log.debug(f"Sent header and {segments_sent} segments to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
+            print(f"Completed sending data to AWS server - Request ID: {request_id}, Size: {request_size} bytes in {segments_sent} segments")
+            return True
+        
         # Create header with request_id, server_timestamp
         # Format: !Id = 4-byte unsigned int + 8-byte double = 12 bytes total
-        header = struct.pack('!IdI', request_id, server_timestamp, request_size)
-        
-        # Create destination address
-        aws_address = (aws_server_ip, AWS_SERVER_UDP_PORT)
+        header = AWS_HEADER.pack(request_id, server_timestamp, request_size)
         
         # Send header to AWS server
         aws_udp_socket.sendto(header, aws_address)
-        print(f"Sent header to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
+        if debug:
+            log.debug(f"Sent header to AWS server - Request ID: {request_id}, Server timestamp: {server_timestamp:.6f}")
         
-        # Create payload of specified size
-        payload = b'\x00' * request_size
+        # Request ID prefixed to each segment (4 bytes). Segments are gathered by
+        # sendmsg() from the prefix and the shared zero payload; the gather lists
+        # only depend on the request size, so consecutive requests of the same
+        # size just repack the request ID
+        if segment_gathers is None or segment_gathers[0] != request_size:
+            segment_gathers = prepare_segment_gathers(request_size)
+        rid_prefix, gathers = segment_gathers[1:]
+        SEGMENT_ID.pack_into(rid_prefix, 0, request_id)
         
-        # Split payload into segments if needed
         segments_sent = 0
-        total_segments = (request_size + MAX_UDP_SEGMENT - 5) // (MAX_UDP_SEGMENT - 4) if request_size > 0 else 0
+        total_segments = len(gathers)
+        sendmsg = aws_udp_socket.sendmsg
         
-        for i in range(0, request_size, MAX_UDP_SEGMENT - 4):
-            # Get segment size
-            segment_end = min(i + MAX_UDP_SEGMENT - 4, request_size)
-            
-            # Get the segment data
-            segment_data = payload[i:segment_end]
-            
-            # Add request ID to each segment (4 bytes)
-            segment = struct.pack('!I', request_id) + segment_data
-            
+        for segment in gathers:
             # Send segment
-            aws_udp_socket.sendto(segment, aws_address)
+            sendmsg(segment, (), 0, aws_address)
             segments_sent += 1
             
-            if segments_sent % 10 == 0 or segments_sent == total_segments:
-                print(f"Sent segment {segments_sent}/{total_segments} to AWS server")
+            if debug and (segments_sent % 10 == 0 or segments_sent == total_segments):
+                log.debug(f"Sent segment {segments_sent}/{total_segments} to AWS server")
         
         print(f"Completed sending data to AWS server - Request ID: {request_id}, Size: {request_size} bytes in {segments_sent} segments")
         return True
@@ -97,34 +272,62 @@ def send_data_to_aws(request_id, request_size, server_timestamp):
         print(f"Error sending data to AWS server: {e}")
         return False
 
+def recv_exactly(sock, view):
+    """Fill view from a stream socket, looping over short reads; returns the bytes read (short only on close)"""
+    # MSG_WAITALL lets the kernel wait for the whole read, so the loop only
+    # runs again if the wait is cut short (signal or close)
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:], 0, socket.MSG_WAITALL)
+        if not n:
+            break
+        received += n
+    return received
+
 def receive_data_from_local_server():
     """Continuously receive data from local server"""
     global local_server_socket, running
     
     data_count = 0
+    quickack = True
+    
+    # Headers are read into one reused buffer; TCP may split a header across reads
+    header_buffer = bytearray(LOCAL_HEADER.size)
+    header_view = memoryview(header_buffer)
+    
+    # Per-header calls bound once; the loop body is only read, parse and send
+    setsockopt = local_server_socket.setsockopt
+    unpack_header = LOCAL_HEADER.unpack_from
+    send_to_aws = send_data_to_aws
     
     try:
         while running:
             try:
                 # Receive header from local server
                 # Header: request_id (4 bytes), size (4 bytes), timestamp (8 bytes)
-                header = local_server_socket.recv(16)
-                if not header:
+                received = recv_exactly(local_server_socket, header_view)
+                if received < LOCAL_HEADER.size:
                     # Connection closed
+                    if received:
+                        print(f"Incomplete header received: {received} bytes, expected {LOCAL_HEADER.size} bytes")
                     print("Connection closed by local server")
                     break
                 
-                if len(header) < 16:
-                    print(f"Incomplete header received: {len(header)} bytes, expected 16 bytes")
-                    continue
+                # Quick ACK mode is not sticky, so re-arm it after each read
+                if quickack:
+                    try:
+                        setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+                    except OSError:
+                        quickack = False
                 
                 # Parse header
-                request_id, request_size, server_timestamp = struct.unpack('!IId', header)
+                request_id, request_size, server_timestamp = unpack_header(header_buffer)
                 
                 data_count += 1
                 
-                # Forward data to AWS server
-                send_data_to_aws(request_id, request_size, server_timestamp)
+                # Send to AWS right here: the server timestamp is already running, so a
+                # handoff to another thread would add its wakeup to the measured UL latency
+                send_to_aws(request_id, request_size, server_timestamp)
                 
             except Exception as e:
                 print(f"Error receiving data from local server: {e}")
@@ -136,7 +339,7 @@ def receive_data_from_local_server():
         print(f"Data reception thread exited, received {data_count} packets total")
 
 def main():
-    global local_server_socket, aws_udp_socket, running, aws_server_ip
+    global local_server_socket, aws_udp_socket, running, aws_server_ip, aws_address
     
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='Phone client for latency decomposition')
@@ -144,10 +347,15 @@ def main():
                         help=f'IP address of the local server (default: {LOCAL_SERVER_IP})')
     parser.add_argument('--aws-ip', dest='aws_server_ip', required=True,
                         help='IP address of the AWS server')
+    parser.add_argument('--debug', action='store_true',
+                        help='Print per-packet messages (DEBUG level)')
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    
     # Store AWS server IP
     aws_server_ip = args.aws_server_ip
+    aws_address = (aws_server_ip, AWS_SERVER_UDP_PORT)
     
     try:
         # Set up UDP socket for AWS server communication
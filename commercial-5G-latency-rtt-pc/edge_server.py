@@ -2,7 +2,13 @@ import socket
 import struct
 import time
 import threading
-from collections import defaultdict
+import logging
+import os
+import errno
+import sys
+import ctypes
+import ctypes.util
+from collections import deque, OrderedDict
 
 # Maximum UDP packet size (practically safe)
 MAX_UDP_PACKET = 1300
@@ -10,16 +16,125 @@ MAX_UDP_PACKET = 1300
 UDP_PORT = 5000
 # Port for UDP ping-pong measurements
 PING_PONG_PORT = 5001
+PING_PREFIX = b'PING:'
+PONG_PREFIX = b'PONG:'
+PING_BUFFER_SIZE = 1024
+
+# Server socket buffer sizes; the kernel caps them at net.core.rmem_max / wmem_max
+SOCKET_RCVBUF = 16 * 1024 * 1024
+SOCKET_SNDBUF = 16 * 1024 * 1024
+
+# CPUs the UDP server and ping-pong threads are pinned to (skipped if not available;
+# CPU 0 is avoided: it usually takes most device IRQs and timer work);
+# each socket's SO_INCOMING_CPU is set to match its thread
+UDP_SERVER_CPU = 2
+PING_PONG_CPU = 1
+SO_INCOMING_CPU = getattr(socket, 'SO_INCOMING_CPU', 49)
+
+# Per-chunk and per-response log lines are only emitted with EDGE_DEBUG=1
+EDGE_DEBUG = os.getenv('EDGE_DEBUG', '0') == '1'
+
+# How long a thread may hold the GIL while another waits for it (CPython default: 5 ms).
+# Kept short so a pong is not delayed behind a batch being parsed by the UDP server thread.
+GIL_SWITCH_INTERVAL = 0.0005
 
 # Message types
 MSG_TYPE_CONTROL = 1
 MSG_TYPE_REQUEST = 2
 
+# Wire formats, compiled once
+REQUEST_HEADER = struct.Struct('!BIHH')   # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+REQUEST_ID = struct.Struct('!I')          # request_id field, patched into cached headers at offset 1
+CONTROL_MESSAGE = struct.Struct('!BII')   # type(1) + request_size(4) + response_size(4)
+CONTROL_ACK = bytes([MSG_TYPE_CONTROL])   # ACK is just the message type
+
+# Maximum number of response chunks handed to one sendmmsg() call
+SENDMMSG_BATCH = 64
+# Datagrams pulled from the socket per recvmmsg() call
+RECVMMSG_BATCH = 64
+# recvmmsg flag: block for the first datagram only, then take what is queued
+MSG_WAITFORONE = getattr(socket, 'MSG_WAITFORONE', 0x10000)
+SOCKADDR_IN = struct.Struct('!2xH4s8x')  # family (skipped), port, address
+
+# UDP generic segmentation offload (Linux): one sendmsg() carries several
+# MAX_UDP_PACKET datagrams, bounded by the kernel's 64 segments / 64KB limits
+UDP_SEGMENT = getattr(socket, 'UDP_SEGMENT', 103)
+GSO_MAX_SEGMENTS = min(64, 65507 // MAX_UDP_PACKET)
+GSO_SIZE_CMSG = struct.pack('=H', MAX_UDP_PACKET)
+
+# Opt-in MSG_ZEROCOPY for GSO responses of at least this many bytes (0 = disabled),
+# e.g. ZEROCOPY_MIN_RESPONSE=65536. Only pays off for large responses on a real NIC.
+ZEROCOPY_MIN_RESPONSE = int(os.getenv('ZEROCOPY_MIN_RESPONSE', '0'))
+SO_ZEROCOPY = getattr(socket, 'SO_ZEROCOPY', 60)
+MSG_ZEROCOPY = getattr(socket, 'MSG_ZEROCOPY', 0x4000000)
+IP_RECVERR = getattr(socket, 'IP_RECVERR', 11)
+SO_EE_ORIGIN_ZEROCOPY = 5
+SO_EE_CODE_ZEROCOPY_COPIED = 1
+# struct sock_extended_err: errno, origin, type, code, pad, info, data
+SOCK_EXTENDED_ERR = struct.Struct('=IBBBBII')
+
+# ctypes layouts for Linux sendmmsg(2)/recvmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# Shared response payload: contents are irrelevant to the client, so every chunk
+# sends a prefix of this one zero buffer instead of allocating its own
+FILLER = bytes(MAX_UDP_PACKET)
+FILLER_VIEW = memoryview(FILLER)
+FILLER_ADDRESS = ctypes.cast(ctypes.c_char_p(FILLER), ctypes.c_void_p).value
+
+# libc sendmmsg/recvmmsg, or None where they are not available (non-Linux).
+# ctypes.CDLL releases the GIL for the duration of each call, so a thread blocked
+# in recvmmsg() does not hold up the other server threads.
+libc_sendmmsg = None
+libc_recvmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_sendmmsg = _libc.sendmmsg
+        libc_sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        libc_sendmmsg.restype = ctypes.c_int
+        libc_recvmmsg = _libc.recvmmsg
+        libc_recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        libc_recvmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_sendmmsg = None
+        libc_recvmmsg = None
+
 # Global variables
 running = True              # Flag to control thread execution
+server_stats = {'chunks_rx': 0, 'requests_rx': 0, 'responses_tx': 0}  # Reported once per second by main()
+log = logging.getLogger("edge_server")
+udp_gso_enabled = False     # Set once UDP_SEGMENT is known to work on the server socket
+zerocopy_enabled = False    # Set once SO_ZEROCOPY is enabled on the server socket
+zerocopy_next_id = 0        # Kernel ID of the next MSG_ZEROCOPY send on the socket
+zerocopy_pending = deque()  # (last_send_id, chunks): headers pinned until the kernel completes
+
+# Storage for received chunks: one bit per chunk plus a count of chunks seen.
+# chunk_buffer and completed_requests are owned by the UDP server thread: chunks and
+# control messages (which clear them) are handled in arrival order on that thread, so
+# neither needs a lock. A second receive thread should get its own socket
+# (SO_REUSEPORT) and its own copies rather than share these.
+chunk_buffer = {}  # {request_id: [bitmap, received_count, total_chunks]}
 
-# Storage for received chunks
-chunk_buffer = defaultdict(dict)  # {request_id: {chunk_id: data}}
+# Recently completed request IDs (oldest first), so late duplicate chunks are dropped
+# without recreating state for a request that has already been answered
+COMPLETED_HISTORY = 1024
+completed_requests = OrderedDict()
 
 def receive_large_message(sock, expected_size, max_packet_size=MAX_UDP_PACKET, timeout=5):
     """
@@ -38,26 +153,28 @@ def receive_large_message(sock, expected_size, max_packet_size=MAX_UDP_PACKET, t
         # Set timeout for receiving datagrams
         sock.settimeout(timeout)
         
+        # Preallocate the whole message (plus room for the last datagram to overshoot)
+        # so each datagram is received straight into its final position
+        buffer = bytearray(expected_size + max_packet_size)
+        view = memoryview(buffer)
+        
         # Receive first datagram
-        data, client_address = sock.recvfrom(max_packet_size)
-        current_size = len(data)
-        received_data = data
+        current_size, client_address = sock.recvfrom_into(view[:max_packet_size])
         
         # If message is complete in one datagram
         if current_size >= expected_size:
-            return received_data, client_address
+            return bytes(view[:current_size]), client_address
             
         # Receive remaining datagrams
         while current_size < expected_size:
             try:
-                data, _ = sock.recvfrom(max_packet_size)
-                received_data += data
-                current_size += len(data)
+                nbytes, _ = sock.recvfrom_into(view[current_size:current_size + max_packet_size])
+                current_size += nbytes
             except socket.timeout:
                 print("Timeout while receiving message fragments")
                 return None, None
                 
-        return received_data, client_address
+        return bytes(view[:current_size]), client_address
         
     except socket.timeout as e:
         print(f"Error receiving message: {e}")
@@ -80,46 +197,306 @@ def process_chunk(data, client_address):
     try:
         # Ensure we have at least the header
         if len(data) < 9:  # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-            print(f"Received too small chunk from {client_address}")
+            log.warning(f"Received too small chunk from {client_address}")
             return False, None
             
         # Unpack header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
         try:
-            msg_type, request_id, chunk_id, total_chunks = struct.unpack('!BIHH', data[:9])
+            msg_type, request_id, chunk_id, total_chunks = REQUEST_HEADER.unpack_from(data)
         except struct.error as e:
-            print(f"Error unpacking chunk header from {client_address}: {e}, data length: {len(data)}")
+            log.warning(f"Error unpacking chunk header from {client_address}: {e}, data length: {len(data)}")
             return False, None
         
         if msg_type != MSG_TYPE_REQUEST:
-            print(f"Received unexpected message type: {msg_type}")
+            log.warning(f"Received unexpected message type: {msg_type}")
             return False, None
         
-        # Just record that we received this chunk - no need to store payload
-        chunk_buffer[request_id][chunk_id] = True
-        print(f"Received chunk {chunk_id+1}/{total_chunks} of request {request_id}")
+        if chunk_id >= total_chunks:
+            log.warning(f"Received chunk {chunk_id} beyond total {total_chunks} from {client_address}")
+            return False, None
         
-        # Check if we have received all chunks
-        if len(chunk_buffer[request_id]) == total_chunks:
-            print(f"Received all chunks for request {request_id}")
-            # Clear buffer for this request
-            del chunk_buffer[request_id]
-            return True, request_id
-            
-        return False, request_id
+        return record_chunk(request_id, chunk_id, total_chunks), request_id
         
     except (IndexError) as e:
-        print(f"Error processing chunk: {e}")
+        log.warning(f"Error processing chunk: {e}")
         return False, None
 
+def record_chunk(request_id, chunk_id, total_chunks):
+    """
+    Mark a validated chunk as received
+    
+    Args:
+        request_id: Request the chunk belongs to
+        chunk_id: Index of the chunk, already checked against total_chunks
+        total_chunks: Number of chunks in the request
+    
+    Returns:
+        bool: True if this chunk completed the request
+    """
+    # Late duplicate for a request that has already completed
+    if request_id in completed_requests:
+        return False
+    
+    # Just record that we received this chunk - no need to store payload
+    state = chunk_buffer.get(request_id)
+    if state is None:
+        state = chunk_buffer[request_id] = [bytearray((total_chunks + 7) // 8), 0, total_chunks]
+    bitmap = state[0]
+    byte, bit = chunk_id >> 3, 1 << (chunk_id & 7)
+    if bitmap[byte] & bit:
+        return False  # Duplicate chunk
+    bitmap[byte] |= bit
+    state[1] += 1
+    server_stats['chunks_rx'] += 1
+    if EDGE_DEBUG:
+        log.debug(f"Received chunk {chunk_id+1}/{total_chunks} of request {request_id}")
+    
+    # Check if we have received all chunks
+    if state[1] == state[2]:
+        server_stats['requests_rx'] += 1
+        if EDGE_DEBUG:
+            log.debug(f"Received all chunks for request {request_id}")
+        # Clear buffer for this request and remember it as completed
+        del chunk_buffer[request_id]
+        completed_requests[request_id] = None
+        if len(completed_requests) > COMPLETED_HISTORY:
+            completed_requests.popitem(last=False)
+        return True
+        
+    return False
+
 def clear_chunk_buffer():
     """
     Clear the chunk buffer
     """
+    # A new session restarts request IDs, so forget completed ones too
+    completed_requests.clear()
     if chunk_buffer:
         chunk_buffer.clear()
         print("Cleared chunk buffer")
 
-def send_response(sock, client_address, request_id, response_size):
+def make_sockaddr_in(address):
+    """
+    Pack an (ip, port) tuple into a struct sockaddr_in for sendmmsg
+    
+    Args:
+        address: IPv4 address tuple (ip, port)
+    
+    Returns:
+        ctypes buffer holding the sockaddr_in
+    """
+    ip, port = address
+    sockaddr = struct.pack('=H', socket.AF_INET) + struct.pack('!H', port) + socket.inet_aton(ip) + bytes(8)
+    return ctypes.create_string_buffer(sockaddr, len(sockaddr))
+
+def send_chunks(sock, client_address, chunks):
+    """
+    Send a list of datagrams to the client, batched into sendmmsg() calls on Linux
+    
+    Args:
+        sock: UDP socket
+        client_address: Client address tuple (ip, port)
+        chunks: List of (header, payload_len) tuples; header is a writable buffer
+                (e.g. a bytearray view) and the payload is a prefix of FILLER
+    """
+    if libc_sendmmsg is None:
+        # Fallback: one gathered sendmsg per chunk
+        for chunk_header, payload_len in chunks:
+            sock.sendmsg([chunk_header, FILLER_VIEW[:payload_len]], (), 0, client_address)
+        return
+    
+    sockaddr = make_sockaddr_in(client_address)
+    fd = sock.fileno()
+    
+    for batch_start in range(0, len(chunks), SENDMMSG_BATCH):
+        batch = chunks[batch_start:batch_start + SENDMMSG_BATCH]
+        count = len(batch)
+        
+        # Two iovecs per chunk: its header, then a prefix of the shared filler;
+        # the kernel gathers them, so header and payload are never concatenated
+        iovecs = (Iovec * (2 * count))()
+        msgs = (Mmsghdr * count)()
+        for i, (chunk_header, payload_len) in enumerate(batch):
+            iovecs[2 * i].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(chunk_header))
+            iovecs[2 * i].iov_len = len(chunk_header)
+            iovecs[2 * i + 1].iov_base = FILLER_ADDRESS
+            iovecs[2 * i + 1].iov_len = payload_len
+            msgs[i].msg_hdr.msg_name = ctypes.cast(sockaddr, ctypes.c_void_p)
+            msgs[i].msg_hdr.msg_namelen = len(sockaddr)
+            msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[2 * i])
+            msgs[i].msg_hdr.msg_iovlen = 2 if payload_len else 1
+        
+        # sendmmsg may send fewer messages than requested; resume from where it stopped
+        sent = 0
+        while sent < count:
+            result = libc_sendmmsg(fd, ctypes.addressof(msgs) + sent * ctypes.sizeof(Mmsghdr), count - sent, 0)
+            if result < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            sent += result
+
+def probe_udp_gso(sock):
+    """
+    Check whether the kernel supports UDP_SEGMENT on this socket
+    
+    Args:
+        sock: UDP socket
+    
+    Returns:
+        bool: True if GSO sends can be used
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        sock.getsockopt(socket.IPPROTO_UDP, UDP_SEGMENT)
+        return True
+    except OSError:
+        return False
+
+def send_chunks_gso(sock, client_address, chunks, flags=0):
+    """
+    Send chunks of MAX_UDP_PACKET bytes (only the last may be shorter) with UDP GSO.
+    Each sendmsg() gathers up to GSO_MAX_SEGMENTS chunks and the kernel splits them back
+    into datagrams. Falls back to send_chunks() if the route rejects GSO.
+    
+    Args:
+        sock: UDP socket
+        client_address: Client address tuple (ip, port)
+        chunks: List of (header, payload_len) tuples; the payload is a prefix of FILLER
+        flags: sendmsg flags, e.g. MSG_ZEROCOPY
+    
+    Returns:
+        int: Number of sendmsg() calls made with flags
+    """
+    global udp_gso_enabled
+    
+    sends = 0
+    
+    gso_cmsg = [(socket.IPPROTO_UDP, UDP_SEGMENT, GSO_SIZE_CMSG)]
+    for group_start in range(0, len(chunks), GSO_MAX_SEGMENTS):
+        # Gather list alternating headers and filler prefixes
+        group = []
+        for chunk_header, payload_len in chunks[group_start:group_start + GSO_MAX_SEGMENTS]:
+            group.append(chunk_header)
+            group.append(FILLER_VIEW[:payload_len])
+        try:
+            try:
+                sock.sendmsg(group, gso_cmsg, flags, client_address)
+                sends += 1
+            except OSError as e:
+                # ENOBUFS: too many zerocopy sends outstanding; copy this group instead
+                if not flags or e.errno != errno.ENOBUFS:
+                    raise
+                sock.sendmsg(group, gso_cmsg, 0, client_address)
+        except OSError as e:
+            # EIO: device without checksum offload; others: GSO unsupported
+            if e.errno not in (errno.EIO, errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            print(f"UDP GSO not usable ({e}), falling back to sendmmsg")
+            udp_gso_enabled = False
+            send_chunks(sock, client_address, chunks[group_start:])
+            break
+    
+    return sends
+
+def enable_zerocopy(sock):
+    """
+    Turn on SO_ZEROCOPY so large GSO responses can be sent with MSG_ZEROCOPY
+    
+    Args:
+        sock: UDP socket
+    
+    Returns:
+        bool: True if zerocopy sends can be used
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_ZEROCOPY, 1)
+        return True
+    except OSError as e:
+        print(f"MSG_ZEROCOPY not available: {e}")
+        return False
+
+def reap_zerocopy_completions(sock):
+    """
+    Read MSG_ZEROCOPY completions from the socket error queue and release the
+    response headers they cover. Zerocopy is turned off if the kernel reports that
+    it had to copy anyway (e.g. loopback or no scatter-gather support).
+    
+    Args:
+        sock: UDP socket with SO_ZEROCOPY enabled
+    """
+    global zerocopy_enabled
+    
+    while zerocopy_pending:
+        try:
+            _, ancdata, _, _ = sock.recvmsg(0, socket.CMSG_SPACE(SOCK_EXTENDED_ERR.size + 16),
+                                            socket.MSG_ERRQUEUE | socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+        
+        for level, cmsg_type, cmsg_data in ancdata:
+            if level != socket.IPPROTO_IP or cmsg_type != IP_RECVERR:
+                continue
+            _, origin, _, code, _, first_id, last_id = SOCK_EXTENDED_ERR.unpack_from(cmsg_data)
+            if origin != SO_EE_ORIGIN_ZEROCOPY:
+                continue
+            
+            # Sends first_id..last_id have completed; their buffers may be released
+            while zerocopy_pending and zerocopy_pending[0][0] <= last_id:
+                zerocopy_pending.popleft()
+            
+            if code & SO_EE_CODE_ZEROCOPY_COPIED and zerocopy_enabled:
+                print("Kernel copied MSG_ZEROCOPY data, disabling zerocopy sends")
+                zerocopy_enabled = False
+
+def make_response_template(response_size):
+    """
+    Build the chunk headers of a response, with request_id left as 0
+    
+    Args:
+        response_size: Size of response data to send
+    
+    Returns:
+        tuple: (headers, chunks) - the bytearray holding every chunk header, and the
+               (header view, payload_len) list to pass to send_chunks()
+    """
+    # Calculate header size: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+    header_size = 9
+    
+    # Calculate actual payload size
+    payload_size = response_size - header_size
+    if payload_size < 0:
+        print(f"Warning: Response size {response_size} is too small for header, adjusting")
+        payload_size = 0
+    
+    # Calculate how many chunks we need
+    max_chunk_payload = MAX_UDP_PACKET - header_size
+    total_chunks = (payload_size + max_chunk_payload - 1) // max_chunk_payload
+    total_chunks = max(1, total_chunks)  # At least 1 chunk
+    
+    # Split data into chunks, built up front so they can be sent in one batch;
+    # all headers are packed in place into a single buffer
+    chunks = []
+    headers = bytearray(REQUEST_HEADER.size * total_chunks)
+    headers_view = memoryview(headers)
+    remaining_payload = payload_size
+    for chunk_id in range(total_chunks):
+        # Calculate this chunk's payload size
+        this_chunk_payload = min(max_chunk_payload, remaining_payload)
+        
+        # Pack the header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+        offset = chunk_id * REQUEST_HEADER.size
+        REQUEST_HEADER.pack_into(headers, offset, MSG_TYPE_REQUEST, 0, chunk_id, total_chunks)
+        
+        # The payload is sent from the shared filler, not copied per chunk
+        chunks.append((headers_view[offset:offset + REQUEST_HEADER.size], this_chunk_payload))
+        
+        # Update remaining payload
+        remaining_payload -= this_chunk_payload
+    
+    return headers, chunks
+
+def send_response(sock, client_address, request_id, response_size, template=None):
     """
     Send response data to client
     
@@ -128,47 +505,48 @@ def send_response(sock, client_address, request_id, response_size):
         client_address: Client address tuple (ip, port)
         request_id: Request ID to respond to
         response_size: Size of response data to send
+        template: Result of make_response_template(response_size), reused across
+                  responses of one client session; built for this call if None
     
     Returns:
         bool: True if response sent successfully, False otherwise
     """
+    global zerocopy_next_id
+    
     try:
-        # Calculate header size: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-        header_size = 9
-        
-        # Calculate actual payload size
-        payload_size = response_size - header_size
-        if payload_size < 0:
-            print(f"Warning: Response size {response_size} is too small for header, adjusting")
-            payload_size = 0
+        # Zerocopy sends are read by the kernel after sendmsg() returns, so they
+        # get their own headers rather than a template the next response patches
+        zerocopy = zerocopy_enabled and udp_gso_enabled and response_size >= ZEROCOPY_MIN_RESPONSE
+        if template is None or zerocopy:
+            template = make_response_template(response_size)
+        headers, chunks = template
+        total_chunks = len(chunks)
         
-        # Calculate how many chunks we need
-        max_chunk_payload = MAX_UDP_PACKET - header_size
-        total_chunks = (payload_size + max_chunk_payload - 1) // max_chunk_payload
-        total_chunks = max(1, total_chunks)  # At least 1 chunk
+        # Only the request ID differs between responses of the same size
+        for offset in range(1, len(headers), REQUEST_HEADER.size):
+            REQUEST_ID.pack_into(headers, offset, request_id)
         
-        print(f"Sending response for request {request_id}: {response_size} bytes in {total_chunks} chunks")
+        if EDGE_DEBUG:
+            log.debug(f"Sending response for request {request_id}: {response_size} bytes in {total_chunks} chunks")
         
-        # Split data into chunks and send
-        remaining_payload = payload_size
-        for chunk_id in range(total_chunks):
-            # Calculate this chunk's payload size
-            this_chunk_payload = min(max_chunk_payload, remaining_payload)
-            
-            # Pack the header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-            # Use explicit ints to ensure correct type conversion across platforms
-            chunk_header = struct.pack('!BIHH', int(MSG_TYPE_REQUEST), int(request_id), int(chunk_id), int(total_chunks))
-            
-            # Create chunk data with header and payload
-            chunk_data = chunk_header + b'0' * this_chunk_payload
-            
-            # Send the chunk
-            sock.sendto(chunk_data, client_address)
-            print(f"Sent response chunk {chunk_id+1}/{total_chunks} for request {request_id}")
-            time.sleep(0.000001)  # Sleep for 100 microseconds
-            
-            # Update remaining payload
-            remaining_payload -= this_chunk_payload
+        # Send all chunks back to back; no sleep between them
+        if zerocopy_pending:
+            reap_zerocopy_completions(sock)
+        if udp_gso_enabled and total_chunks > 1:
+            if zerocopy:
+                # The kernel reads the buffers after sendmsg() returns: keep the
+                # headers alive until their completion is reaped (FILLER is static)
+                sends = send_chunks_gso(sock, client_address, chunks, MSG_ZEROCOPY)
+                if sends:
+                    zerocopy_next_id += sends
+                    zerocopy_pending.append((zerocopy_next_id - 1, chunks))
+            else:
+                send_chunks_gso(sock, client_address, chunks)
+        else:
+            send_chunks(sock, client_address, chunks)
+        server_stats['responses_tx'] += 1
+        if EDGE_DEBUG:
+            log.debug(f"Sent {total_chunks} response chunks for request {request_id}")
             
         return True
             
@@ -176,6 +554,45 @@ def send_response(sock, client_address, request_id, response_size):
         print(f"Error sending response: {e}")
         return False
 
+def set_socket_buffers(sock, name):
+    """
+    Enlarge the socket buffers so bursts of request or response chunks are not dropped
+    
+    Args:
+        sock: UDP socket
+        name: Socket description for the log message
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+    except OSError as e:
+        print(f"Failed to set {name} socket buffers: {e}")
+    
+    # Linux reports double the usable size and silently caps at rmem_max/wmem_max
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+    print(f"{name} socket buffers - RCVBUF: {rcvbuf} bytes, SNDBUF: {sndbuf} bytes")
+    if rcvbuf < SOCKET_RCVBUF:
+        print(f"  (raise net.core.rmem_max to at least {SOCKET_RCVBUF} for the full receive buffer)")
+
+def pin_to_cpu(sock, cpu, name):
+    """
+    Pin the calling thread to one CPU and ask the kernel to process the socket there too
+    
+    Args:
+        sock: Socket served by the calling thread
+        cpu: CPU number
+        name: Thread description for the log message
+    """
+    if not hasattr(os, 'sched_setaffinity') or cpu not in os.sched_getaffinity(0):
+        return
+    try:
+        os.sched_setaffinity(0, {cpu})  # 0 = the calling thread on Linux
+        sock.setsockopt(socket.SOL_SOCKET, SO_INCOMING_CPU, cpu)
+        print(f"{name} thread pinned to CPU {cpu}")
+    except OSError as e:
+        print(f"Could not pin {name} thread to CPU {cpu}: {e}")
+
 def handle_ping_pong_udp():
     """
     Handle ping-pong requests over UDP.
@@ -186,34 +603,49 @@ def handle_ping_pong_udp():
         ping_pong_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         ping_pong_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         ping_pong_socket.bind(('', PING_PONG_PORT))
+        set_socket_buffers(ping_pong_socket, "Ping-pong")
+        pin_to_cpu(ping_pong_socket, PING_PONG_CPU, "Ping-pong")
         
         print(f"Server listening for ping-pong requests on UDP port {PING_PONG_PORT}")
         
         pong_count = 0
         
+        # Echo pings in batches, in place, where recvmmsg/sendmmsg are available
+        if libc_recvmmsg and libc_sendmmsg:
+            batch = make_recv_batch(RECVMMSG_BATCH, PING_BUFFER_SIZE)
+            replies = (Mmsghdr * RECVMMSG_BATCH)()
+            while running:
+                try:
+                    sent = echo_pings(ping_pong_socket, batch, replies)
+                except OSError as e:
+                    print(f"Error processing ping-pong batch: {e}")
+                    continue
+                if (pong_count + sent) // 100 > pong_count // 100:
+                    print(f"Sent {pong_count + sent} pong responses")
+                pong_count += sent
+            return
+        
+        # Fallback: one datagram at a time, still turned around in a reused buffer
+        buffer = bytearray(PING_BUFFER_SIZE)
+        view = memoryview(buffer)
         while running:
             # Receive ping request
-            data, client_address = ping_pong_socket.recvfrom(1024)
+            length, client_address = ping_pong_socket.recvfrom_into(buffer)
             
             try:
-                message = data.decode()
-                
                 # Handle PING message
-                if message.startswith("PING:"):
-                    # Extract sequence number
-                    sequence = message.split(":")[1]
-                    
-                    # Create pong response with same sequence
-                    response = f"PONG:{sequence}".encode()
+                if buffer.startswith(PING_PREFIX, 0, length):
+                    # Rewrite the prefix in place; the (binary) sequence field is echoed as is
+                    buffer[:len(PONG_PREFIX)] = PONG_PREFIX
                     
                     # Send response back to the client (same address that sent the ping)
-                    ping_pong_socket.sendto(response, client_address)
+                    ping_pong_socket.sendto(view[:length], client_address)
                     
                     pong_count += 1
                     if pong_count % 100 == 0:
                         print(f"Sent {pong_count} pong responses")
                 else:
-                    print(f"Unexpected message format from {client_address}: {message}")
+                    print(f"Unexpected message format from {client_address}: {bytes(view[:length])!r}")
             
             except Exception as e:
                 print(f"Error processing ping-pong message: {e}")
@@ -225,6 +657,175 @@ def handle_ping_pong_udp():
         if 'ping_pong_socket' in locals():
             ping_pong_socket.close()
 
+def make_recv_batch(count, bufsize):
+    """
+    Allocate reusable recvmmsg() headers over one bytearray of count * bufsize bytes
+    
+    Args:
+        count: Number of datagrams per recvmmsg() call
+        bufsize: Maximum size of each datagram
+    
+    Returns:
+        tuple: (msgs, iovecs, names, buffer, bufsize)
+    """
+    buffer = bytearray(count * bufsize)
+    base = ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+    names = (ctypes.c_char * SOCKADDR_IN.size * count)()
+    iovecs = (Iovec * count)()
+    msgs = (Mmsghdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = base + i * bufsize
+        iovecs[i].iov_len = bufsize
+        msgs[i].msg_hdr.msg_name = ctypes.addressof(names[i])
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+    return msgs, iovecs, names, buffer, bufsize
+
+def recv_batch(sock, batch):
+    """
+    Wait for at least one datagram and receive all queued ones, up to the batch size
+    
+    Args:
+        sock: Blocking UDP socket
+        batch: Buffers from make_recv_batch()
+    
+    Returns:
+        int: Number of datagrams now held in the batch buffers
+    """
+    msgs, _, names, buffer, bufsize = batch
+    count = len(msgs)
+    
+    # The kernel overwrites msg_namelen, so reset it every call
+    for i in range(count):
+        msgs[i].msg_hdr.msg_namelen = SOCKADDR_IN.size
+    
+    while True:
+        received = libc_recvmmsg(sock.fileno(), ctypes.addressof(msgs), count, MSG_WAITFORONE, None)
+        if received >= 0:
+            return received
+        err = ctypes.get_errno()
+        if err != errno.EINTR:
+            raise OSError(err, os.strerror(err))
+
+def echo_pings(sock, batch, replies):
+    """
+    Receive a batch of pings and send them all back as pongs with one sendmmsg()
+    
+    Each ping is turned into a pong by rewriting its prefix in the receive buffer,
+    and the reply goes out from that same memory to the address recvmmsg() filled
+    in, so no per-packet objects are built.
+    
+    Args:
+        sock: Blocking UDP socket
+        batch: Buffers from make_recv_batch()
+        replies: Mmsghdr array of the same length, reused for the replies
+    
+    Returns:
+        int: Number of pongs sent
+    """
+    msgs, iovecs, _, buffer, bufsize = batch
+    received = recv_batch(sock, batch)
+    
+    count = 0
+    for i in range(received):
+        offset = i * bufsize
+        length = msgs[i].msg_len
+        if not buffer.startswith(PING_PREFIX, offset, offset + length):
+            print(f"Unexpected message format from {batch_address(batch, i)}: {bytes(buffer[offset:offset + length])!r}")
+            continue
+        buffer[offset:offset + len(PONG_PREFIX)] = PONG_PREFIX
+        iovecs[i].iov_len = length
+        replies[count].msg_hdr = msgs[i].msg_hdr
+        count += 1
+    
+    try:
+        sent = 0
+        while sent < count:
+            result = libc_sendmmsg(sock.fileno(), ctypes.addressof(replies) + sent * ctypes.sizeof(Mmsghdr), count - sent, 0)
+            if result < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            sent += result
+    finally:
+        # Restore the full receive size for the next batch
+        for i in range(received):
+            iovecs[i].iov_len = bufsize
+    return count
+
+def batch_address(batch, index):
+    """
+    Decode the sender address of one datagram in a received batch
+    
+    Args:
+        batch: Buffers from make_recv_batch()
+        index: Datagram index within the batch
+    
+    Returns:
+        tuple: (ip, port)
+    """
+    port, ip = SOCKADDR_IN.unpack_from(batch[2][index])
+    return socket.inet_ntoa(ip), port
+
+def rx_batch(sock, batch):
+    """
+    Receive one batch and run the request chunk fast path over it in place
+    
+    Chunk headers are parsed straight out of the batch buffer, and the sender
+    address is only decoded for datagrams that leave this function, so a chunk
+    that does not complete a request costs no more than a header unpack and a
+    bitmap update.
+    
+    Args:
+        sock: Blocking UDP socket
+        batch: Buffers from make_recv_batch()
+    
+    Returns:
+        list: (msg_type, payload, client_address) in arrival order; payload is the
+              completed request_id for MSG_TYPE_REQUEST, otherwise the datagram as a
+              memoryview that is only valid until the next call
+    """
+    msgs, _, _, buffer, bufsize = batch
+    received = recv_batch(sock, batch)
+    
+    events = []
+    for i in range(received):
+        offset = i * bufsize
+        length = msgs[i].msg_len
+        if length == 0:
+            continue
+        if buffer[offset] != MSG_TYPE_REQUEST:
+            events.append((buffer[offset], memoryview(buffer)[offset:offset + length], batch_address(batch, i)))
+            continue
+        if length < REQUEST_HEADER.size:
+            log.warning(f"Received too small chunk from {batch_address(batch, i)}")
+            continue
+        _, request_id, chunk_id, total_chunks = REQUEST_HEADER.unpack_from(buffer, offset)
+        if chunk_id >= total_chunks:
+            log.warning(f"Received chunk {chunk_id} beyond total {total_chunks} from {batch_address(batch, i)}")
+            continue
+        if record_chunk(request_id, chunk_id, total_chunks):
+            events.append((MSG_TYPE_REQUEST, request_id, batch_address(batch, i)))
+    return events
+
+def rx_single(sock, max_packet_size):
+    """
+    Receive one datagram with recvfrom() and return it in the rx_batch() format
+    
+    Args:
+        sock: Blocking UDP socket
+        max_packet_size: Maximum size of the datagram
+    
+    Returns:
+        list: (msg_type, payload, client_address) entries, as for rx_batch()
+    """
+    data, client_address = sock.recvfrom(max_packet_size)
+    if not data:
+        return []
+    if data[0] != MSG_TYPE_REQUEST:
+        return [(data[0], data, client_address)]
+    is_complete, request_id = process_chunk(data, client_address)
+    return [(MSG_TYPE_REQUEST, request_id, client_address)] if is_complete else []
+
 def start_udp_server(port=UDP_PORT, max_packet_size=MAX_UDP_PACKET):
     """
     Start a UDP server that listens for incoming data
@@ -236,6 +837,8 @@ def start_udp_server(port=UDP_PORT, max_packet_size=MAX_UDP_PACKET):
     Returns:
         None
     """
+    global udp_gso_enabled, zerocopy_enabled
+    
     # Create UDP socket
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     
@@ -244,67 +847,98 @@ def start_udp_server(port=UDP_PORT, max_packet_size=MAX_UDP_PACKET):
     server_socket.bind(server_address)
     
     print(f"UDP Server listening on port {port}")
+    set_socket_buffers(server_socket, "UDP server")
+    pin_to_cpu(server_socket, UDP_SERVER_CPU, "UDP server")
+    
+    # Multi-chunk responses use UDP GSO where the kernel supports it
+    udp_gso_enabled = probe_udp_gso(server_socket)
+    print(f"UDP GSO {'enabled' if udp_gso_enabled else 'not available, using sendmmsg'}")
+    
+    # Optional zerocopy for large GSO responses
+    if ZEROCOPY_MIN_RESPONSE > 0 and udp_gso_enabled:
+        zerocopy_enabled = enable_zerocopy(server_socket)
+        if zerocopy_enabled:
+            print(f"MSG_ZEROCOPY enabled for responses of {ZEROCOPY_MIN_RESPONSE} bytes or more")
     
     # Dictionary to store client configurations
     client_configs = {}
     
+    # Reusable recvmmsg() buffers (Linux); otherwise one recvfrom per datagram
+    batch = make_recv_batch(RECVMMSG_BATCH, max_packet_size) if libc_recvmmsg else None
+    
     try:
         while True:
-            # Wait for incoming data
-            data, client_address = server_socket.recvfrom(max_packet_size)
+            # Wait for incoming data; request chunks only surface here once they
+            # complete a request
+            if batch is not None:
+                events = rx_batch(server_socket, batch)
+            else:
+                events = rx_single(server_socket, max_packet_size)
             
-            try:
-                # Get message type from first byte
-                msg_type = data[0]
-                
+            for msg_type, payload, client_address in events:
                 if msg_type == MSG_TYPE_CONTROL:
                     # Clear chunk buffer when control message is received
                     clear_chunk_buffer()
                     
                     # Unpack control message: type(1) + request_size(4) + response_size(4)
                     try:
-                        _, request_size, response_size = struct.unpack('!BII', data)
+                        _, request_size, response_size = CONTROL_MESSAGE.unpack(payload)
                         print(f"Received control message - Request size: {request_size}, Response size: {response_size}")
                         
                         # Store client configuration
                         client_configs[client_address] = {
                             'request_size': request_size,
-                            'response_size': response_size
+                            'response_size': response_size,
+                            # Chunk headers for this response size, patched per request
+                            'template': make_response_template(response_size) if response_size > 0 else None
                         }
                         
                         # Send control ACK (just the message type)
-                        ack_message = struct.pack('!B', MSG_TYPE_CONTROL)
-                        server_socket.sendto(ack_message, client_address)
+                        server_socket.sendto(CONTROL_ACK, client_address)
                         print("Sent control ACK")
                     except struct.error as e:
                         print(f"Error unpacking control message from {client_address}: {e}")
                     
                 elif msg_type == MSG_TYPE_REQUEST:
-                    # Process the chunk
-                    is_complete, request_id = process_chunk(data, client_address)
-                    
-                    # If request is complete and we have client config
-                    if is_complete and client_address in client_configs:
+                    # payload is the completed request_id; respond if we have client config
+                    if client_address in client_configs:
                         response_size = client_configs[client_address]['response_size']
                         
                         # Send response if needed
                         if response_size > 0:
-                            send_response(server_socket, client_address, request_id, response_size)
-                
-            except (IndexError) as e:
-                print(f"Error processing message: {e}")
+                            send_response(server_socket, client_address, payload, response_size,
+                                          client_configs[client_address]['template'])
             
     except KeyboardInterrupt:
         print("\nServer shutting down...")
     finally:
         server_socket.close()
 
+def report_stats(last):
+    """
+    Print the server counters if they changed since the previous report
+    
+    Args:
+        last: Snapshot returned by the previous call
+    
+    Returns:
+        dict: Snapshot of server_stats to pass to the next call
+    """
+    current = dict(server_stats)
+    if current != last:
+        print(f"Stats - chunks received: {current['chunks_rx']}, requests completed: {current['requests_rx']}, " +
+              f"responses sent: {current['responses_tx']}")
+    return current
+
 def main():
     """
     Main function to start the server
     """
     global running
     
+    logging.basicConfig(level=logging.DEBUG if EDGE_DEBUG else logging.INFO, format='%(message)s')
+    sys.setswitchinterval(GIL_SWITCH_INTERVAL)
+    
     try:
         # Start ping-pong handler thread
         ping_pong_thread = threading.Thread(
@@ -322,9 +956,11 @@ def main():
         
         print("Server started. Press Ctrl+C to exit.")
         
-        # Keep the main thread alive
+        # Keep the main thread alive, reporting aggregate counters instead of per-packet lines
+        stats = dict(server_stats)
         while True:
             time.sleep(1)
+            stats = report_stats(stats)
             
     except KeyboardInterrupt:
         print("\nServer shutting down...")
@@ -5,10 +5,25 @@ import time
 import random
 import datetime
 import os
+import sys
+import select
 import threading
-from collections import defaultdict
+import queue
+import logging
+import asyncio
+import array
+import ctypes
+import ctypes.util
+import functools
+from collections import deque
 
-# Maximum UDP packet size (practically safe)
+try:
+    import netifaces
+except ImportError:
+    netifaces = None
+
+# Maximum UDP packet size (practically safe): fits a 1500-byte MTU with room for
+# tunnel overhead, so chunks are never IP-fragmented. Must match the edge server.
 MAX_UDP_PACKET = 1300
 # UDP port for data communication
 UDP_PORT = 5000
@@ -16,38 +31,140 @@ UDP_PORT = 5000
 PING_PONG_PORT = 5001
 # Interval for ping-pong in seconds (20ms)
 PING_INTERVAL = 0.02
+# Ping/pong wire format: 5-byte "PING:"/"PONG:" prefix + 8-byte big-endian sequence
+PING_PREFIX = b'PING:'
+PONG_PREFIX = b'PONG:'
+PING_MESSAGE_SIZE = 13
+PING_SEQUENCE = struct.Struct('!Q')  # Sequence field at offset 5
+# Slots in the ping send-time ring (power of two); 8192 pings = ~160s at 20ms
+PING_RING_SIZE = 8192
+PING_RING_MASK = PING_RING_SIZE - 1
+# Per-packet ping-pong diagnostics are only logged with PING_DEBUG=1 in the environment
+PING_DEBUG = os.getenv('PING_DEBUG', '0') == '1'
+
+# CPU the ping-pong thread is pinned to (CPU 0 is avoided: it usually takes
+# most device IRQs and timer work) and its SCHED_FIFO priority (needs
+# CAP_SYS_NICE; skipped otherwise)
+PING_PONG_CPU = 1
+PING_PONG_PRIORITY = 50
+# Same for the request-response measurement loop in main; matches the phone client
+MEASUREMENT_CPU = 2
+MEASUREMENT_PRIORITY = 50
+SO_INCOMING_CPU = getattr(socket, 'SO_INCOMING_CPU', 49)
 
 # Message types
 MSG_TYPE_CONTROL = 1
 MSG_TYPE_REQUEST = 2
 
+# Chunk header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+REQUEST_HEADER = struct.Struct('!BIHH')
+REQUEST_ID = struct.Struct('!I')  # request_id field at offset 1
+
+# Path MTU discovery: set DF on outgoing datagrams instead of fragmenting (Linux)
+IP_MTU_DISCOVER = getattr(socket, 'IP_MTU_DISCOVER', 10)
+IP_PMTUDISC_DO = getattr(socket, 'IP_PMTUDISC_DO', 2)
+
+# Socket buffer sizes; the kernel caps them at net.core.rmem_max / wmem_max
+SOCKET_RCVBUF = 4 * 1024 * 1024
+SOCKET_SNDBUF = 1 * 1024 * 1024
+
+# Kernel receive timestamps (SO_TIMESTAMPNS, struct timespec in a cmsg)
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35)
+TIMESPEC = struct.Struct('@ll')
+RX_TIMESTAMPS = sys.platform.startswith('linux') and hasattr(socket, 'CMSG_SPACE')
+TIMESTAMP_CMSG_SPACE = socket.CMSG_SPACE(TIMESPEC.size) if RX_TIMESTAMPS else 0
+
+# Busy-poll budget for receives on the measurement socket, in microseconds
+# (poll() only busy-polls when net.core.busy_poll is also set)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+BUSY_POLL_USEC = 50
+
+# Maximum number of messages handed to one sendmmsg() call (UIO_MAXIOV)
+SENDMMSG_BATCH = 1024
+# Pongs read per recvmmsg() call, and the receive buffer per pong (pongs are 13 bytes)
+RECVMMSG_BATCH = 16
+PONG_BUFFER_SIZE = 64
+# struct cmsghdr: cmsg_len (size_t), cmsg_level, cmsg_type
+CMSGHDR = struct.Struct('@Nii')
+
+# ctypes layouts for Linux sendmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# libc sendmmsg/recvmmsg, or None where they are not available (non-Linux)
+libc_sendmmsg = None
+libc_recvmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_sendmmsg = _libc.sendmmsg
+        libc_sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        libc_sendmmsg.restype = ctypes.c_int
+        libc_recvmmsg = _libc.recvmmsg
+        libc_recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        libc_recvmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_sendmmsg = None
+        libc_recvmmsg = None
+
 # Global request counter
 request_counter = 0
 
-# Response tracking
-response_buffer = defaultdict(dict)  # {request_id: {chunk_id: data}}
+# Reusable send buffer: one MAX_UDP_PACKET slot per request chunk. Only the byte count
+# of the payload matters, so it is left zero-filled
+request_buffer = bytearray()
+
+# Chunk views and sendmmsg() vector for the last (server_address, request_size):
+# (key, chunks, prepared), rebuilt only when the key or request_buffer changes
+request_batch = None
+
+# Poller for the request/response socket, registered once in setup_udp_socket
+response_poller = None
 
 # Results tracking
 results_file = None             # File to save measurement results
+RESULTS_BUFFER_SIZE = 1 << 16   # Write buffer for the results file (64KB)
+RESULTS_FLUSH_EVERY = 32        # Flush the results file every N measurements
 measurement_count = 0           # Counter for received packets
 
 # Ping-pong measurements
 ping_pong_socket = None         # UDP socket for ping-pong measurements
-ping_sequence = {}              # Dictionary to track {sequence: send_time}
-ping_pong_rtts = []             # List to store RTT values
+ping_message = bytearray(PING_PREFIX + bytes(PING_SEQUENCE.size))  # Reusable ping; only the sequence changes
+ping_send_ns = array.array('q', bytes(8 * PING_RING_SIZE))   # Send time per ring slot, 0 = no ping pending
+ping_send_seq = array.array('Q', bytes(8 * PING_RING_SIZE))  # Sequence that owns each ring slot
+ping_pong_rtts = deque(maxlen=10000)  # Most recent RTT values (bounded)
+ping_pong_sum = 0.0             # Sum of all RTTs, for the running average
 ping_pong_min_rtt = float('inf')  # Minimum RTT observed
 ping_pong_max_rtt = 0.0         # Maximum RTT observed
 ping_pong_avg_rtt = 0.0         # Average RTT
 ping_pong_count = 0             # Number of ping-pongs completed
-ping_pong_lock = threading.Lock() # Lock for ping-pong stats
 running = True                  # Flag to control thread execution
+ping_stats_queue = queue.SimpleQueue()  # Periodic ping-pong stats, printed off the event loop
 
+# Ping-pong diagnostics logger; debug messages are enabled by PING_DEBUG
+ping_log = logging.getLogger("ping_pong")
+ping_log.setLevel(logging.DEBUG if PING_DEBUG else logging.WARNING)
+
+@functools.lru_cache(maxsize=1)
 def get_local_interfaces():
-    """Returns a list of local network interfaces with their IP addresses"""
+    """Returns a list of local network interfaces with their IP addresses (computed once)"""
     interfaces = []
     
-    try:
-        import netifaces
+    if netifaces is not None:
         for iface in netifaces.interfaces():
             try:
                 addrs = netifaces.ifaddresses(iface)
@@ -58,7 +175,7 @@ def get_local_interfaces():
                             interfaces.append((iface, addr['addr']))
             except Exception:
                 pass
-    except ImportError:
+    else:
         # Fallback if netifaces isn't available
         try:
             import subprocess
@@ -98,52 +215,24 @@ def get_local_interfaces():
                                     if ip != '127.0.0.1' and current_iface:
                                         interfaces.append((current_iface, ip))
             elif 'linux' in os_type:  # Linux
-                # Use a simpler approach for Linux
-                try:
-                    # Try using ip command first
-                    output = subprocess.check_output(['ip', 'addr']).decode('utf-8')
-                    lines = output.splitlines()
-                    
-                    current_iface = None
-                    for line in lines:
-                        # Get interface name
-                        if ': ' in line and not line.startswith(' '):
-                            parts = line.split(': ')
-                            if len(parts) >= 2:
-                                current_iface = parts[1].split('@')[0]
-                        
-                        # Get IPv4 address
-                        if current_iface and 'inet ' in line and 'inet6' not in line:
-                            parts = line.strip().split()
-                            for i, part in enumerate(parts):
-                                if part == 'inet' and i+1 < len(parts):
-                                    ip = parts[i+1].split('/')[0]
-                                    if ip != '127.0.0.1':  # Skip loopback
-                                        interfaces.append((current_iface, ip))
-                                        break
+                # Ask the kernel directly (SIOCGIFADDR) instead of spawning ip/ifconfig
+                import fcntl
+                SIOCGIFADDR = 0x8915
                 
-                except (subprocess.SubprocessError, FileNotFoundError):
-                    # Fallback to ifconfig
-                    output = subprocess.check_output(['ifconfig']).decode('utf-8')
-                    lines = output.splitlines()
-                    
-                    current_iface = None
-                    for line in lines:
-                        # Get interface name
-                        if ' ' in line and not line.startswith(' '):
-                            current_iface = line.split(' ')[0]
-                        
-                        # Get IPv4 address
-                        if current_iface and 'inet ' in line and 'inet6' not in line:
-                            parts = line.strip().split()
-                            for i, part in enumerate(parts):
-                                if part == 'inet' and i+1 < len(parts):
-                                    ip = parts[i+1].split('/')[0]
-                                    if 'addr:' in ip:
-                                        ip = ip.split('addr:')[1]
-                                    if ip != '127.0.0.1':  # Skip loopback
-                                        interfaces.append((current_iface, ip))
-                                        break
+                query_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                try:
+                    for _, iface in socket.if_nameindex():
+                        try:
+                            ifreq = struct.pack('256s', iface.encode()[:15])
+                            result = fcntl.ioctl(query_socket.fileno(), SIOCGIFADDR, ifreq)
+                        except OSError:
+                            # Interface has no IPv4 address
+                            continue
+                        ip = socket.inet_ntoa(result[20:24])
+                        if ip != '127.0.0.1':  # Skip loopback
+                            interfaces.append((iface, ip))
+                finally:
+                    query_socket.close()
         except Exception as e:
             print(f"Could not determine network interfaces: {e}")
     
@@ -222,19 +311,238 @@ def send_control_message(sock, server_address, request_size, response_size):
         print(f"Error in control message: {e}")
         return False
 
+def set_socket_buffers(sock, name):
+    """
+    Enlarge the socket buffers so bursts of response chunks or pongs are not dropped
+    
+    Args:
+        sock: UDP socket
+        name: Socket description for the log message
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+    except OSError as e:
+        print(f"Failed to set {name} socket buffers: {e}")
+    
+    # Linux reports double the usable size and silently caps at rmem_max/wmem_max
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+    print(f"{name} socket buffers - RCVBUF: {rcvbuf} bytes, SNDBUF: {sndbuf} bytes")
+    if rcvbuf < SOCKET_RCVBUF:
+        print(f"  (raise net.core.rmem_max to at least {SOCKET_RCVBUF} for the full receive buffer)")
+
+def enable_busy_poll(sock):
+    """
+    Let receives on the socket spin briefly in the kernel instead of sleeping until the softirq wakeup
+    
+    Args:
+        sock: UDP socket
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_USEC)
+    except OSError as e:
+        # Raising the budget above net.core.busy_read needs CAP_NET_ADMIN
+        print(f"Busy polling not enabled: {e}")
+
+def enable_rx_timestamps(sock):
+    """Ask the kernel to timestamp received datagrams (SO_TIMESTAMPNS) where supported"""
+    if not RX_TIMESTAMPS:
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    except OSError as e:
+        print(f"Kernel receive timestamps not available: {e}")
+
+def recv_timestamped(sock, bufsize, flags=0):
+    """
+    Receive one datagram together with its arrival time
+    
+    The kernel stamps datagrams with CLOCK_REALTIME when they reach the socket. To stay
+    on the perf_counter_ns() clock used for send times, the datagram's age (wall clock now
+    minus the kernel stamp) is subtracted from perf_counter_ns(). This removes the delay
+    between arrival and this thread being scheduled from the measurement.
+    
+    Args:
+        sock: UDP socket, ideally with enable_rx_timestamps() applied
+        bufsize: Maximum datagram size
+        flags: recv flags
+    
+    Returns:
+        tuple: (data, address, receive_ns)
+    """
+    if not RX_TIMESTAMPS:
+        data, address = sock.recvfrom(bufsize, flags)
+        return data, address, time.perf_counter_ns()
+    
+    data, ancdata, _, address = sock.recvmsg(bufsize, TIMESTAMP_CMSG_SPACE, flags)
+    receive_ns = time.perf_counter_ns()
+    for level, cmsg_type, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMPNS:
+            sec, nsec = TIMESPEC.unpack_from(cmsg_data)
+            age_ns = time.time_ns() - (sec * 1_000_000_000 + nsec)
+            if age_ns > 0:
+                receive_ns -= age_ns
+            break
+    return data, address, receive_ns
+
+def make_recv_batch(count, bufsize):
+    """
+    Allocate reusable recvmmsg() headers with one data and one control buffer per message
+    
+    Args:
+        count: Number of messages per recvmmsg() call
+        bufsize: Data buffer size per message
+    
+    Returns:
+        tuple: (msgs, iovecs, buffers, controls)
+    """
+    buffers = (ctypes.c_char * bufsize * count)()
+    controls = (ctypes.c_char * max(TIMESTAMP_CMSG_SPACE, 1) * count)()
+    iovecs = (Iovec * count)()
+    msgs = (Mmsghdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = ctypes.addressof(buffers[i])
+        iovecs[i].iov_len = bufsize
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+    return msgs, iovecs, buffers, controls
+
+def recv_batch_timestamped(sock, batch):
+    """
+    Receive up to len(msgs) queued datagrams with one non-blocking recvmmsg() call
+    
+    Arrival times are derived from the SO_TIMESTAMPNS stamps as in recv_timestamped().
+    
+    Args:
+        sock: UDP socket
+        batch: Buffers from make_recv_batch()
+    
+    Returns:
+        list: (data, receive_ns) per datagram; raises BlockingIOError if none are queued
+    """
+    msgs, _, buffers, controls = batch
+    count = len(msgs)
+    
+    # The kernel overwrites msg_controllen, so reset the control buffers every call
+    for i in range(count):
+        msgs[i].msg_hdr.msg_control = ctypes.addressof(controls[i]) if RX_TIMESTAMPS else None
+        msgs[i].msg_hdr.msg_controllen = TIMESTAMP_CMSG_SPACE
+    
+    received = libc_recvmmsg(sock.fileno(), ctypes.addressof(msgs), count, socket.MSG_DONTWAIT, None)
+    receive_ns = time.perf_counter_ns()
+    now_ns = time.time_ns()
+    if received < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))  # EAGAIN becomes BlockingIOError
+    
+    datagrams = []
+    for i in range(received):
+        data = ctypes.string_at(buffers[i], msgs[i].msg_len)
+        arrival_ns = receive_ns
+        if msgs[i].msg_hdr.msg_controllen >= socket.CMSG_LEN(TIMESPEC.size):
+            _, level, cmsg_type = CMSGHDR.unpack_from(controls[i])
+            if level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMPNS:
+                sec, nsec = TIMESPEC.unpack_from(controls[i], socket.CMSG_LEN(0))
+                age_ns = now_ns - (sec * 1_000_000_000 + nsec)
+                if age_ns > 0:
+                    arrival_ns -= age_ns
+        datagrams.append((data, arrival_ns))
+    return datagrams
+
+def make_sockaddr_in(address):
+    """
+    Pack an (ip, port) tuple into a struct sockaddr_in for sendmmsg
+    
+    Args:
+        address: IPv4 address tuple (ip, port)
+    
+    Returns:
+        ctypes buffer holding the sockaddr_in
+    """
+    ip, port = address
+    sockaddr = struct.pack('=H', socket.AF_INET) + struct.pack('!H', port) + socket.inet_aton(ip) + bytes(8)
+    return ctypes.create_string_buffer(sockaddr, len(sockaddr))
+
+def prepare_chunks(server_address, chunks):
+    """
+    Build the sendmmsg() message vector for a list of datagrams ahead of sending
+    
+    Args:
+        server_address: Server address tuple (ip, port), or None for a connected socket
+        chunks: List of writable buffers (memoryview slices of a bytearray), one per datagram
+    
+    Returns:
+        tuple: (msgs, iovecs, sockaddr); iovecs and sockaddr keep the pointed-to memory alive
+    """
+    # A connected socket takes no destination (msg_name NULL)
+    sockaddr = make_sockaddr_in(server_address) if server_address else None
+    count = len(chunks)
+    
+    # One iovec per chunk, pointing straight into the chunk's buffer
+    iovecs = (Iovec * count)()
+    msgs = (Mmsghdr * count)()
+    for i, chunk_data in enumerate(chunks):
+        iovecs[i].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(chunk_data))
+        iovecs[i].iov_len = len(chunk_data)
+        if sockaddr is not None:
+            msgs[i].msg_hdr.msg_name = ctypes.cast(sockaddr, ctypes.c_void_p)
+            msgs[i].msg_hdr.msg_namelen = len(sockaddr)
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+    return msgs, iovecs, sockaddr
+
+def send_chunks(sock, server_address, chunks, prepared=None):
+    """
+    Send a list of datagrams to the server, batched into sendmmsg() calls on Linux
+    
+    Args:
+        sock: UDP socket
+        server_address: Server address tuple (ip, port), or None for a connected socket
+        chunks: List of writable buffers (memoryview slices of a bytearray), one per datagram
+        prepared: Optional prepare_chunks() result for these chunks, to skip building it here
+    """
+    if libc_sendmmsg is None:
+        # Fallback: one send/sendto per chunk
+        for chunk_data in chunks:
+            if server_address:
+                sock.sendto(chunk_data, server_address)
+            else:
+                sock.send(chunk_data)
+        return
+    
+    if prepared is None:
+        prepared = prepare_chunks(server_address, chunks)
+    msgs = prepared[0]
+    count = len(msgs)
+    fd = sock.fileno()
+    
+    # At most SENDMMSG_BATCH per call, and sendmmsg may send fewer messages than
+    # requested; resume from where it stopped
+    sent = 0
+    while sent < count:
+        result = libc_sendmmsg(fd, ctypes.addressof(msgs) + sent * ctypes.sizeof(Mmsghdr),
+                               min(count - sent, SENDMMSG_BATCH), 0)
+        if result < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        sent += result
+
 def send_request(sock, server_address, request_size):
     """
     Send request data to server
     
     Args:
         sock: UDP socket
-        server_address: Server address tuple (ip, port)
+        server_address: Server address tuple (ip, port), or None for a connected socket
         request_size: Size of request data to send
     
     Returns:
-        tuple: (request_id, send_time) if sent successfully, (None, None) otherwise
+        tuple: (request_id, send_time_ns) if sent successfully, (None, None) otherwise
     """
-    global request_counter
+    global request_counter, request_buffer, request_batch
     try:
         # Generate a request ID
         request_id = request_counter
@@ -256,61 +564,86 @@ def send_request(sock, server_address, request_size):
         
         print(f"Total request data length: {request_size} bytes, splitting into {total_chunks} chunks")
         
-        # Split data into chunks and send
-        remaining_payload = payload_size
-        for chunk_id in range(total_chunks):
-            # Calculate this chunk's payload size
-            this_chunk_payload = min(max_chunk_payload, remaining_payload)
-            
-            # Pack the header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-            chunk_header = struct.pack('!BIHH', MSG_TYPE_REQUEST, request_id, chunk_id, total_chunks)
-            
-            # Create chunk data with header and payload
-            chunk_data = chunk_header + b'0' * this_chunk_payload
-            
-            # Send the chunk
-            sock.sendto(chunk_data, server_address)
-            print(f"Sent chunk {chunk_id+1}/{total_chunks} of request {request_id}: {len(chunk_data)} bytes")
-            
-            # Update remaining payload
-            remaining_payload -= this_chunk_payload
+        # Grow the reusable buffer if this request needs more chunk slots; the
+        # zeroed payload is never rewritten, only the headers change later
+        buffer_size = total_chunks * MAX_UDP_PACKET
+        if len(request_buffer) < buffer_size:
+            request_buffer = bytearray(buffer_size)
+            request_batch = None
+        
+        # Chunk views, static header fields and the sendmmsg() vector depend only on
+        # the destination and request size, so they are built once per run
+        batch_key = (server_address, request_size)
+        if request_batch is None or request_batch[0] != batch_key:
+            buffer_view = memoryview(request_buffer)
+            chunks = []
+            remaining_payload = payload_size
+            for chunk_id in range(total_chunks):
+                # Calculate this chunk's payload size
+                this_chunk_payload = min(max_chunk_payload, remaining_payload)
+                
+                # Pack the header in place; request_id is rewritten per request
+                offset = chunk_id * MAX_UDP_PACKET
+                REQUEST_HEADER.pack_into(request_buffer, offset, MSG_TYPE_REQUEST, 0, chunk_id, total_chunks)
+                
+                # The chunk is a view of its slot: header followed by payload
+                chunks.append(buffer_view[offset:offset + header_size + this_chunk_payload])
+                
+                # Update remaining payload
+                remaining_payload -= this_chunk_payload
             
-        # Record start time just before sending first chunk
-        send_time = time.time()
+            prepared = prepare_chunks(server_address, chunks) if libc_sendmmsg else None
+            request_batch = (batch_key, chunks, prepared)
         
-        return request_id, send_time
+        _, chunks, prepared = request_batch
+        
+        # Only the request ID differs between requests
+        for chunk_id in range(total_chunks):
+            REQUEST_ID.pack_into(request_buffer, chunk_id * MAX_UDP_PACKET + 1, request_id)
+        
+        # Record start time just before sending first chunk; all per-request
+        # Python work is done, so the timed region is the send call itself
+        send_time_ns = time.perf_counter_ns()
+        
+        # Send all chunks
+        send_chunks(sock, server_address, chunks, prepared)
+        print(f"Sent {total_chunks} chunks of request {request_id}: {request_size} bytes")
+        
+        return request_id, send_time_ns
         
     except Exception as e:
         print(f"Error sending request: {e}")
         return None, None
 
-def receive_response(sock, request_id, send_time, timeout_ms=5000):
+def receive_response(sock, request_id, send_time_ns, timeout_ms=5000):
     """
     Wait for and process response chunks for a specific request
     
     Args:
         sock: UDP socket
         request_id: Request ID to wait for response
-        send_time: Time when the request was sent
+        send_time_ns: perf_counter_ns() value when the request was sent
         timeout_ms: Socket timeout in milliseconds
     
     Returns:
         tuple: (bool, float) - success status and RTT in ms
     """
-    # Set timeout for receiving response
-    original_timeout = sock.gettimeout()
-    sock.settimeout(timeout_ms / 1000)  # Convert ms to seconds
-    
     response_complete = False
-    start_time = time.time()
-    received_chunks = {}  # {chunk_id: True}
+    deadline_ns = time.perf_counter_ns() + timeout_ms * 1_000_000
+    received_mask = 0     # Bit n set once chunk n has arrived
+    complete_mask = None  # All total_chunks bits set, known after the first chunk
     total_chunks = None
     
     try:
-        while time.time() - start_time < timeout_ms / 1000:  # Convert ms to seconds
+        while True:
+            # Wait for data until the overall deadline, without touching the socket timeout
+            remaining_ms = (deadline_ns - time.perf_counter_ns()) // 1_000_000
+            if remaining_ms <= 0 or not response_poller.poll(remaining_ms):
+                break
+            
             try:
                 # Receive response data
-                data, _ = sock.recvfrom(MAX_UDP_PACKET)
+                data, _, chunk_receive_ns = recv_timestamped(sock, MAX_UDP_PACKET, socket.MSG_DONTWAIT)
                 
                 # Ensure we have at least the header
                 if len(data) < 9:  # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
@@ -318,7 +651,7 @@ def receive_response(sock, request_id, send_time, timeout_ms=5000):
                     continue
                 
                 # Unpack header to get type, request ID, chunk ID and total chunks
-                msg_type, resp_request_id, chunk_id, chunks_count = struct.unpack('!BIHH', data[:9])
+                msg_type, resp_request_id, chunk_id, chunks_count = REQUEST_HEADER.unpack_from(data)
                 
                 if msg_type != MSG_TYPE_REQUEST:
                     print(f"Received unexpected message type: {msg_type}")
@@ -327,33 +660,30 @@ def receive_response(sock, request_id, send_time, timeout_ms=5000):
                 # Check if this response matches our request
                 if resp_request_id == request_id:
                     # Record this chunk and update total chunks if needed
-                    received_chunks[chunk_id] = True
+                    received_mask |= 1 << chunk_id
                     if total_chunks is None:
                         total_chunks = chunks_count
+                        complete_mask = (1 << total_chunks) - 1
                     print(f"Received response chunk {chunk_id+1}/{chunks_count} for request {request_id}")
                     
                     # Check if we have all chunks
-                    if len(received_chunks) == total_chunks:
+                    if received_mask == complete_mask:
                         # Calculate RTT when all response chunks received
-                        receive_complete_time = time.time()
-                        rtt_ms = (receive_complete_time - send_time) * 1000  # Convert to ms
+                        # Calculate RTT from the arrival time of the last chunk
+                        rtt_ms = (chunk_receive_ns - send_time_ns) / 1e6  # Convert to ms
                         print(f"Received all {total_chunks} response chunks for request {request_id}")
                         response_complete = True
                         break
                 else:
                     print(f"Received response for different request: {resp_request_id}")
             
-            except socket.timeout:
-                # Timeout on this receive, try again if within overall timeout
+            except BlockingIOError:
+                # Poll reported data that was gone (e.g. bad checksum), wait again
                 pass
     
     except Exception as e:
         print(f"Error receiving response: {e}")
     
-    finally:
-        # Restore original timeout
-        sock.settimeout(original_timeout)
-    
     # Calculate RTT if response is complete
     if response_complete:
         return True, rtt_ms
@@ -369,7 +699,7 @@ def create_results_file(request_size, response_size):
     
     # Create results file with size information
     results_filename = f"rtt_req{request_size}_resp{response_size}_{timestamp}.txt"
-    results_file = open(results_filename, "w")
+    results_file = open(results_filename, "w", buffering=RESULTS_BUFFER_SIZE)
     
     # Write header to results file with fixed-width format
     results_file.write(f"{'Request ID':<10s}  {'RTT (ms)':<12s}  {'Req Size':<10s}  {'Resp Size':<10s}\n")
@@ -380,6 +710,8 @@ def create_results_file(request_size, response_size):
 
 def setup_udp_socket(mobile_ip=None):
     """Set up UDP socket for communication with server, binding to mobile IP if provided"""
+    global response_poller
+    
     try:
         # Create UDP socket
         udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -393,146 +725,305 @@ def setup_udp_socket(mobile_ip=None):
                 print(f"Failed to bind UDP socket to {mobile_ip}: {bind_err}")
                 print("Continuing without binding to specific interface")
         
+        # Register once for readability so receive_response can wait with poll()
+        response_poller = select.poll()
+        response_poller.register(udp_socket, select.POLLIN)
+        
+        # Use kernel arrival times for response chunks
+        enable_rx_timestamps(udp_socket)
+        set_socket_buffers(udp_socket, "UDP")
+        enable_busy_poll(udp_socket)
+        
+        # Never fragment request chunks; a path MTU below MAX_UDP_PACKET
+        # then shows up as EMSGSIZE instead of silently fragmented datagrams
+        if sys.platform.startswith('linux'):
+            try:
+                udp_socket.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+            except OSError as e:
+                print(f"Failed to enable path MTU discovery: {e}")
+        
         return udp_socket
     except Exception as e:
         print(f"Failed to set up UDP socket: {e}")
         return None
 
-def send_ping_thread(socket_obj, server_address):
+def send_ping(loop, socket_obj, sequence, next_tick):
     """
-    Thread function to continuously send ping packets to the server.
+    Send one ping and schedule the next one on the event loop.
+    Pings follow a fixed cadence (loop.call_at) so processing time does not add drift.
     
     Args:
-        socket_obj: The shared UDP socket to use
-        server_address: Tuple of (IP, port) for the server
+        loop: The ping-pong event loop
+        socket_obj: The shared UDP socket, connected to the server
+        sequence: Sequence number of this ping
+        next_tick: Loop time at which this ping was due
     """
-    global running, ping_sequence
+    if not running:
+        loop.stop()
+        return
+    
+    start_ns = time.perf_counter_ns()
+    
+    # Store the send time in the ring before sending so a fast pong finds it.
+    # The receiver runs on the same event loop and reads the slot long before
+    # the ring wraps, so no lock is needed.
+    slot = sequence & PING_RING_MASK
+    ping_send_seq[slot] = sequence
+    ping_send_ns[slot] = start_ns
     
+    # Send ping message with sequence number
+    PING_SEQUENCE.pack_into(ping_message, 5, sequence)
     try:
-        print(f"Starting to send ping packets to {server_address}")
+        socket_obj.send(ping_message)
+    except OSError as e:
+        if socket_obj.fileno() == -1:
+            loop.stop()  # Socket closed on shutdown
+            return
+        ping_log.warning(f"Error sending ping: {e}")
+    
+    # Debug output for every 1000th message
+    if PING_DEBUG and sequence % 1000 == 0:
+        ping_log.debug(f"Sent ping {sequence}")
+    
+    # Schedule the next ping; skip ahead instead of bursting if the loop fell behind
+    next_tick = max(next_tick + PING_INTERVAL, loop.time())
+    loop.call_at(next_tick, send_ping, loop, socket_obj, sequence + 1, next_tick)
+
+def process_pong(data, receive_ns):
+    """
+    Match a pong to its ping and update the RTT statistics
+    
+    Args:
+        data: The received datagram
+        receive_ns: Arrival time on the perf_counter_ns() clock
+    """
+    global ping_pong_rtts, ping_pong_sum, ping_pong_min_rtt, ping_pong_max_rtt, ping_pong_avg_rtt, ping_pong_count
+    
+    # Compare the prefix in place; no decode or slice of the datagram
+    if len(data) >= PING_MESSAGE_SIZE and data.startswith(PONG_PREFIX):
+        # Extract sequence number
+        sequence = PING_SEQUENCE.unpack_from(data, 5)[0]
         
-        # Main ping sending loop
-        sequence = 0
-        while running:
-            sequence += 1
-            start_time = time.time()
-            
-            # Send ping message with sequence number
-            message = f"PING:{sequence}".encode()
-            socket_obj.sendto(message, server_address)
+        # Look up the send time; a slot reused by a newer ping or
+        # already answered (duplicate pong) does not match. Only a matching
+        # pong clears the slot, so a stale one can't wipe a live ping's send time
+        slot = sequence & PING_RING_MASK
+        if ping_send_seq[slot] == sequence:
+            send_ns = ping_send_ns[slot]
+            ping_send_ns[slot] = 0
+        else:
+            send_ns = 0
+        
+        # Calculate RTT if we have the send time
+        if send_ns:
+            rtt = (receive_ns - send_ns) / 1e6  # Convert to milliseconds
             
-            # Store the send time with the sequence number
-            with ping_pong_lock:
-                ping_sequence[sequence] = start_time
-                
-                # Debug output for every 1000th message
-                if sequence % 1000 == 0:
-                    print(f"Sent ping {sequence} at {start_time:.6f}")
+            # Update statistics (the event loop is their only writer)
+            ping_pong_count += 1
+            ping_pong_sum += rtt
+            ping_pong_rtts.append(rtt)
+            ping_pong_min_rtt = min(ping_pong_min_rtt, rtt) if ping_pong_min_rtt != float('inf') else rtt
+            ping_pong_max_rtt = max(ping_pong_max_rtt, rtt)
+            ping_pong_avg_rtt = ping_pong_sum / ping_pong_count
             
-            # Sleep until next interval - adjust for processing time
-            sleep_time = PING_INTERVAL - (time.time() - start_time)
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            # Hand stats to the printer thread periodically; no I/O on the event loop
+            if ping_pong_count % 100 == 0:
+                ping_stats_queue.put((ping_pong_count, ping_pong_min_rtt, ping_pong_avg_rtt, ping_pong_max_rtt))
+        elif PING_DEBUG:
+            # This can happen if the pong response is very delayed
+            ping_log.debug(f"Received pong for unknown sequence: {sequence}")
+    elif PING_DEBUG:
+        ping_log.debug(f"Unexpected message format: {data!r}")
+
+def receive_pongs(socket_obj, batch=None):
+    """
+    Event loop reader callback: process every pong queued on the socket.
     
-    except Exception as e:
-        print(f"Error in ping sender thread: {e}")
+    Args:
+        socket_obj: The shared (non-blocking) UDP socket to use
+        batch: Buffers from make_recv_batch() to read with recvmmsg(), or None for recvmsg()
+    """
+    while True:
+        # Receive queued pong responses
+        try:
+            if batch is not None:
+                pongs = recv_batch_timestamped(socket_obj, batch)
+            else:
+                data, _, receive_ns = recv_timestamped(socket_obj, 2048)
+                pongs = ((data, receive_ns),)
+        except BlockingIOError:
+            return  # Queue drained
+        except OSError as e:
+            ping_log.warning(f"Error receiving pong: {e}")
+            return
+        
+        # Process the responses
+        for data, receive_ns in pongs:
+            try:
+                process_pong(data, receive_ns)
+            except Exception as e:
+                if PING_DEBUG:
+                    ping_log.debug(f"Error processing pong message: {e}")
+        
+        # A short batch means the queue is empty; skip the extra EAGAIN syscall
+        if batch is not None and len(pongs) < RECVMMSG_BATCH:
+            return
+
+def print_ping_stats_thread():
+    """
+    Thread function printing the periodic ping-pong stats queued by process_pong(),
+    so console I/O never runs on the ping-pong event loop thread.
+    """
+    # Lower this thread's priority (Linux applies setpriority per thread id)
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+    
+    while True:
+        count, min_rtt, avg_rtt, max_rtt = ping_stats_queue.get()
+        print(f"Ping-pong stats - Count: {count}, Min: {min_rtt:.2f}ms, " + 
+              f"Avg: {avg_rtt:.2f}ms, Max: {max_rtt:.2f}ms")
 
-def receive_pong_thread(socket_obj):
+def check_pong_activity(loop, last_count):
     """
-    Thread function to continuously receive pong responses from the server.
+    Report once per second when no pong has arrived since the previous check.
+    
+    Args:
+        loop: The ping-pong event loop
+        last_count: ping_pong_count at the previous check
+    """
+    if not running:
+        return
+    if ping_pong_count == last_count:
+        print("No pong received in the last second")
+    loop.call_later(1.0, check_pong_activity, loop, ping_pong_count)
+
+def run_ping_pong_loop(socket_obj, server_address):
+    """
+    Thread function running the ping-pong event loop.
+    Pongs are read when the socket becomes readable and pings are sent from timer
+    callbacks, so sender and receiver share one thread without locks or socket timeouts.
     
     Args:
         socket_obj: The shared UDP socket to use
+        server_address: Tuple of (IP, port) for the server
     """
-    global running, ping_sequence, ping_pong_rtts, ping_pong_min_rtt, ping_pong_max_rtt, ping_pong_avg_rtt, ping_pong_count
+    loop = asyncio.new_event_loop()
+    fd = socket_obj.fileno()
     
     try:
-        print(f"Ping receiver starting to listen for responses")
-        
-        # Stats for packet analysis
-        packets_received = 0
+        print(f"Starting to send ping packets to {server_address}")
         
-        # Main pong receiving loop
-        while running:
-            # Receive pong response
-            try:
-                socket_obj.settimeout(1.0)  # 1 second timeout
-                data, addr = socket_obj.recvfrom(2048)  # Increase buffer size
-                
-                # Process the response
-                try:
-                    message = data.decode()
-                    
-                    if message.startswith("PONG:"):
-                        # Extract sequence number
-                        sequence = int(message.split(":")[1])
-                        
-                        # Calculate RTT if we have the send time
-                        with ping_pong_lock:
-                            if sequence in ping_sequence:
-                                send_time = ping_sequence[sequence]
-                                receive_time = time.time()
-                                rtt = (receive_time - send_time) * 1000  # Convert to milliseconds
-                                
-                                # Update statistics
-                                ping_pong_count += 1
-                                ping_pong_rtts.append(rtt)
-                                ping_pong_min_rtt = min(ping_pong_min_rtt, rtt) if ping_pong_min_rtt != float('inf') else rtt
-                                ping_pong_max_rtt = max(ping_pong_max_rtt, rtt)
-                                ping_pong_avg_rtt = sum(ping_pong_rtts) / len(ping_pong_rtts)
-                                
-                                # Delete old sequence to prevent memory leak
-                                del ping_sequence[sequence]
-                                
-                                # Log stats periodically
-                                packets_received += 1
-                                if ping_pong_count % 100 == 0:
-                                    print(f"Ping-pong stats - Count: {ping_pong_count}, Min: {ping_pong_min_rtt:.2f}ms, " + 
-                                          f"Avg: {ping_pong_avg_rtt:.2f}ms, Max: {ping_pong_max_rtt:.2f}ms")
-                                    
-                                    # Clean up old sequence numbers (if any left)
-                                    current_time = time.time()
-                                    old_sequences = [seq for seq, t in ping_sequence.items() if current_time - t > 5]
-                                    for seq in old_sequences:
-                                        del ping_sequence[seq]
-                            else:
-                                # This can happen if the pong response is very delayed
-                                print(f"Received pong for unknown sequence: {sequence}")
-                    else:
-                        print(f"Unexpected message format: {message}")
-                except Exception as e:
-                    print(f"Error processing pong message: {e}")
-                    continue
-                    
-            except socket.timeout:
-                print("No pong received in the last second")
-                continue
-            except Exception as e:
-                print(f"Error receiving pong: {e}")
-                if not running:
-                    break
-                continue
+        # recvmsg() in a reader callback rather than a DatagramProtocol, which
+        # would drop the SO_TIMESTAMPNS control messages
+        # recvmmsg() batches pongs that queued up while the loop was busy
+        socket_obj.setblocking(False)
+        batch = make_recv_batch(RECVMMSG_BATCH, PONG_BUFFER_SIZE) if libc_recvmmsg else None
+        loop.add_reader(fd, receive_pongs, socket_obj, batch)
+        loop.call_soon(send_ping, loop, socket_obj, 1, loop.time())
+        loop.call_later(1.0, check_pong_activity, loop, 0)
+        loop.run_forever()
     
     except Exception as e:
-        print(f"Error in pong receiver thread: {e}")
+        print(f"Error in ping-pong event loop: {e}")
+    finally:
+        loop.remove_reader(fd)
+        loop.close()
+
+def pin_ping_pong_thread(thread, cpu=PING_PONG_CPU):
+    """
+    Pin a started thread to one CPU and, if permitted, give it real-time priority
+    
+    Args:
+        thread: A started threading.Thread
+        cpu: CPU number to bind the thread to
+    
+    Returns:
+        bool: True if the thread was pinned, False otherwise
+    """
+    if not hasattr(os, 'sched_setaffinity') or cpu not in os.sched_getaffinity(0):
+        return False
+    
+    # On Linux the affinity/scheduler calls accept a thread id (native_id)
+    tid = thread.native_id
+    try:
+        os.sched_setaffinity(tid, {cpu})
+    except OSError as e:
+        print(f"Could not pin {thread.name} to CPU {cpu}: {e}")
+        return False
+    
+    try:
+        os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(PING_PONG_PRIORITY))
+    except (AttributeError, OSError):
+        pass  # No CAP_SYS_NICE: keep the default policy, affinity still applies
+    
+    return True
+
+def pin_measurement_thread(cpu=MEASUREMENT_CPU):
+    """
+    Pin the calling thread to one CPU and, if permitted, give it real-time priority
+    
+    Args:
+        cpu: CPU number to bind the thread to
+    
+    Returns:
+        tuple: Previous (affinity, policy, param) for unpin_measurement_thread, or None if not pinned
+    """
+    if not hasattr(os, 'sched_setaffinity') or cpu not in os.sched_getaffinity(0):
+        return None
+    
+    saved = (os.sched_getaffinity(0), os.sched_getscheduler(0), os.sched_getparam(0))
+    try:
+        os.sched_setaffinity(0, {cpu})  # 0 = the calling thread on Linux
+    except OSError as e:
+        print(f"Could not pin measurement thread to CPU {cpu}: {e}")
+        return None
+    
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(MEASUREMENT_PRIORITY))
+        print(f"Measurement thread pinned to CPU {cpu} with SCHED_FIFO priority {MEASUREMENT_PRIORITY}")
+    except (AttributeError, OSError):
+        # No CAP_SYS_NICE: keep the default policy, affinity still applies
+        print(f"Measurement thread pinned to CPU {cpu}")
+    
+    return saved
+
+def unpin_measurement_thread(saved):
+    """
+    Restore the scheduling policy and affinity saved by pin_measurement_thread
+    
+    Args:
+        saved: Value returned by pin_measurement_thread
+    """
+    if saved is None:
+        return
+    affinity, policy, param = saved
+    try:
+        os.sched_setscheduler(0, policy, param)
+        os.sched_setaffinity(0, affinity)
+    except OSError as e:
+        print(f"Could not restore measurement thread scheduling: {e}")
 
 def ping_pong_client(cloud_ip, mobile_ip=None):
     """
     Create UDP ping-pong measurement between client and server.
-    One thread sends pings, another receives pongs.
+    A single event loop thread sends pings and receives pongs.
     
     Args:
         cloud_ip: IP address of the cloud server
         mobile_ip: Optional mobile interface IP to bind to
     """
-    global ping_sequence, ping_pong_socket
+    global ping_pong_socket
     
     # Initialize sequence tracking
-    ping_sequence = {}  # Dictionary to track {sequence: send_time}
+    ping_send_ns[:] = array.array('q', bytes(8 * PING_RING_SIZE))
     
     try:
         # Create a single shared UDP socket
         ping_pong_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        enable_rx_timestamps(ping_pong_socket)
+        set_socket_buffers(ping_pong_socket, "Ping-pong")
         
         # Bind to specific interface if provided
         if mobile_ip:
@@ -543,40 +1034,42 @@ def ping_pong_client(cloud_ip, mobile_ip=None):
                 print(f"Failed to bind ping-pong socket to {mobile_ip}: {bind_err}")
                 print("Continuing without binding to specific interface")
         
+        # Connect to the server so pings go out with send() (no per-packet route
+        # lookup) and only the server's pongs are delivered
+        server_address = (cloud_ip, PING_PONG_PORT)
+        ping_pong_socket.connect(server_address)
+        
         # Get the local port we're bound to
         local_addr = ping_pong_socket.getsockname()
         print(f"Ping-pong socket using local address: {local_addr}")
         
-        # Server address
-        server_address = (cloud_ip, PING_PONG_PORT)
+        # Stats printer, kept off the event loop thread
+        threading.Thread(target=print_ping_stats_thread, daemon=True).start()
         
-        # Start receiver thread
-        receiver = threading.Thread(
-            target=receive_pong_thread,
-            args=(ping_pong_socket,),
-            daemon=True
-        )
-        receiver.start()
-        
-        # Wait a moment to ensure receiver is listening
-        time.sleep(0.1)
-        
-        # Start sender thread
-        sender = threading.Thread(
-            target=send_ping_thread,
+        # Run sender and receiver on one event loop thread
+        loop_thread = threading.Thread(
+            target=run_ping_pong_loop,
             args=(ping_pong_socket, server_address),
             daemon=True
         )
-        sender.start()
+        loop_thread.start()
+        
+        # Keep the ping-pong thread off the main loop's CPU to cut scheduler jitter
+        if pin_ping_pong_thread(loop_thread):
+            try:
+                ping_pong_socket.setsockopt(socket.SOL_SOCKET, SO_INCOMING_CPU, PING_PONG_CPU)
+            except OSError:
+                pass
+            print(f"Ping-pong thread pinned to CPU {PING_PONG_CPU}")
         
-        print(f"Ping-pong client started with sender and receiver threads")
+        print(f"Ping-pong client started")
         
         # Return the socket so it can be properly closed
-        return ping_pong_socket, sender, receiver
+        return ping_pong_socket, loop_thread
         
     except Exception as e:
         print(f"Error setting up ping-pong client: {e}")
-        return None, None, None
+        return None, None
 
 def main():
     """
@@ -585,6 +1078,7 @@ def main():
     global measurement_count, results_file, running, ping_pong_socket
     
     args = parse_arguments()
+    logging.basicConfig(format='%(message)s')
     
     # Check if list-interfaces was requested
     if args.list_interfaces:
@@ -616,7 +1110,7 @@ def main():
     # Start ping-pong UDP latency testing if not disabled
     if not args.no_ping_pong:
         print(f"Starting UDP ping-pong testing to {args.cloud_ip} using interface {args.mobile_ip}")
-        ping_pong_socket, _, _ = ping_pong_client(args.cloud_ip, args.mobile_ip)
+        ping_pong_socket, _ = ping_pong_client(args.cloud_ip, args.mobile_ip)
     
     time.sleep(1)
     
@@ -626,9 +1120,10 @@ def main():
         print("Failed to create UDP socket. Exiting...")
         return
     
-    client_socket.settimeout(args.timeout / 1000)  # Convert ms to seconds
+    client_socket.settimeout(args.timeout / 1000)  # Convert ms to seconds (control handshake)
     
     server_address = (args.cloud_ip, UDP_PORT)
+    pinned = None
     
     try:
         # Send control message and wait for ACK
@@ -638,14 +1133,25 @@ def main():
             
         print("Connection established with server")
         
+        # Responses are waited for with response_poller, so the socket timeout is
+        # only needed for the control handshake; blocking mode avoids an extra poll per call
+        client_socket.settimeout(None)
+        
+        # Connect to the server so requests skip the per-packet destination lookup
+        # (sendmmsg()/send() without an address); server_address is not needed below
+        client_socket.connect(server_address)
+        
         # Create results file
         create_results_file(args.request_size, args.response_size)
         
+        # Keep CPU migrations out of the measured RTTs
+        pinned = pin_measurement_thread()
+        
         # Send requests and wait for responses
         successful_requests = 0
         for i in range(args.count):
             print(f"\nSending request {i+1}/{args.count}")
-            request_id, send_time = send_request(client_socket, server_address, args.request_size)
+            request_id, send_time_ns = send_request(client_socket, None, args.request_size)
             
             if request_id is None:
                 print(f"Failed to send request {i+1}")
@@ -654,7 +1160,7 @@ def main():
             # Wait for response if expected
             if args.response_size > 0:
                 print(f"Waiting for response to request {request_id}...")
-                response_received, rtt = receive_response(client_socket, request_id, send_time, args.timeout)
+                response_received, rtt = receive_response(client_socket, request_id, send_time_ns, args.timeout)
                 
                 if response_received:
                     successful_requests += 1
@@ -666,7 +1172,9 @@ def main():
                         # Save results to file
                         if results_file:
                             results_file.write(f"{measurement_count:<10d}  {rtt:<12.3f}  {args.request_size:<10d}  {args.response_size:<10d}\n")
-                            results_file.flush()  # Ensure data is written to disk
+                            # Flush in batches; the file is closed (and flushed) on exit
+                            if measurement_count % RESULTS_FLUSH_EVERY == 0:
+                                results_file.flush()
                             print(f"Saved measurement #{measurement_count} to file")
                 else:
                     print(f"Response timeout for request {i+1}")
@@ -682,6 +1190,8 @@ def main():
         print("\nClient shutting down...")
         running = False
     finally:
+        unpin_measurement_thread(pinned)
+        
         # Close sockets
         client_socket.close()
         if ping_pong_socket:
@@ -1,7 +1,12 @@
 import socket
 import struct
 import time
-from collections import defaultdict
+import os
+import errno
+import sys
+import ctypes
+import ctypes.util
+from collections import OrderedDict
 
 # Maximum UDP packet size (practically safe)
 MAX_UDP_PACKET = 8192
@@ -12,8 +17,61 @@ UDP_PORT = 5000
 MSG_TYPE_CONTROL = 1
 MSG_TYPE_REQUEST = 2
 
-# Storage for received chunks
-chunk_buffer = defaultdict(dict)  # {request_id: {chunk_id: data}}
+# Wire formats, compiled once
+REQUEST_HEADER = struct.Struct('!BIHH')   # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+CONTROL_MESSAGE = struct.Struct('!BII')   # type(1) + request_size(4) + response_size(4)
+CONTROL_ACK = bytes([MSG_TYPE_CONTROL])   # ACK is just the message type
+
+# ctypes layouts for Linux recvmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# Pause after each response chunk so a large response doesn't reach the cellular
+# downlink as one back-to-back burst
+CHUNK_INTERVAL = 0.0001  # 100 microseconds
+# Datagrams pulled from the socket per recvmmsg() call
+RECVMMSG_BATCH = 64
+# recvmmsg flag: block for the first datagram only, then take what is queued
+MSG_WAITFORONE = getattr(socket, 'MSG_WAITFORONE', 0x10000)
+SOCKADDR_IN = struct.Struct('!2xH4s8x')  # family (skipped), port, address
+
+# Shared payload filler: only the byte count of a chunk's payload matters, so every
+# chunk sends a prefix of this one zeroed buffer instead of building its own
+FILLER = bytes(MAX_UDP_PACKET)
+FILLER_VIEW = memoryview(FILLER)
+
+# libc recvmmsg, or None where it is not available (non-Linux)
+libc_recvmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_recvmmsg = _libc.recvmmsg
+        libc_recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        libc_recvmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_recvmmsg = None
+
+# Storage for received chunks: one bit per chunk plus a count of chunks seen
+chunk_buffer = {}  # {request_id: [bitmap, received_count, total_chunks]}
+
+# Recently completed request IDs (oldest first), so late duplicate chunks are dropped
+# without recreating state for a request that has already been answered
+COMPLETED_HISTORY = 1024
+completed_requests = OrderedDict()
 
 def receive_large_message(sock, expected_size, max_packet_size=MAX_UDP_PACKET, timeout=5):
     """
@@ -32,26 +90,28 @@ def receive_large_message(sock, expected_size, max_packet_size=MAX_UDP_PACKET, t
         # Set timeout for receiving datagrams
         sock.settimeout(timeout)
         
+        # Preallocate the whole message (plus room for the last datagram to overshoot)
+        # so each datagram is received straight into its final position
+        buffer = bytearray(expected_size + max_packet_size)
+        view = memoryview(buffer)
+        
         # Receive first datagram
-        data, client_address = sock.recvfrom(max_packet_size)
-        current_size = len(data)
-        received_data = data
+        current_size, client_address = sock.recvfrom_into(view[:max_packet_size])
         
         # If message is complete in one datagram
         if current_size >= expected_size:
-            return received_data, client_address
+            return bytes(view[:current_size]), client_address
             
         # Receive remaining datagrams
         while current_size < expected_size:
             try:
-                data, _ = sock.recvfrom(max_packet_size)
-                received_data += data
-                current_size += len(data)
+                nbytes, _ = sock.recvfrom_into(view[current_size:current_size + max_packet_size])
+                current_size += nbytes
             except socket.timeout:
                 print("Timeout while receiving message fragments")
                 return None, None
                 
-        return received_data, client_address
+        return bytes(view[:current_size]), client_address
         
     except socket.timeout as e:
         print(f"Error receiving message: {e}")
@@ -78,21 +138,40 @@ def process_chunk(data, client_address):
             return False, None
             
         # Unpack header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-        msg_type, request_id, chunk_id, total_chunks = struct.unpack('!BIHH', data[:9])
+        msg_type, request_id, chunk_id, total_chunks = REQUEST_HEADER.unpack_from(data)
         
         if msg_type != MSG_TYPE_REQUEST:
             print(f"Received unexpected message type: {msg_type}")
             return False, None
         
+        if chunk_id >= total_chunks:
+            print(f"Received chunk {chunk_id} beyond total {total_chunks} from {client_address}")
+            return False, None
+        
+        # Late duplicate for a request that has already completed
+        if request_id in completed_requests:
+            return False, request_id
+        
         # Just record that we received this chunk - no need to store payload
-        chunk_buffer[request_id][chunk_id] = True
+        state = chunk_buffer.get(request_id)
+        if state is None:
+            state = chunk_buffer[request_id] = [bytearray((total_chunks + 7) // 8), 0, total_chunks]
+        bitmap = state[0]
+        byte, bit = chunk_id >> 3, 1 << (chunk_id & 7)
+        if bitmap[byte] & bit:
+            return False, request_id  # Duplicate chunk
+        bitmap[byte] |= bit
+        state[1] += 1
         print(f"Received chunk {chunk_id+1}/{total_chunks} of request {request_id}")
         
         # Check if we have received all chunks
-        if len(chunk_buffer[request_id]) == total_chunks:
+        if state[1] == state[2]:
             print(f"Received all chunks for request {request_id}")
-            # Clear buffer for this request
+            # Clear buffer for this request and remember it as completed
             del chunk_buffer[request_id]
+            completed_requests[request_id] = None
+            if len(completed_requests) > COMPLETED_HISTORY:
+                completed_requests.popitem(last=False)
             return True, request_id
             
         return False, request_id
@@ -105,10 +184,26 @@ def clear_chunk_buffer():
     """
     Clear the chunk buffer
     """
+    # A new session restarts request IDs, so forget completed ones too
+    completed_requests.clear()
     if chunk_buffer:
         chunk_buffer.clear()
         print("Cleared chunk buffer")
 
+def send_chunks(sock, client_address, chunks):
+    """
+    Send a list of datagrams to the client, paced CHUNK_INTERVAL apart
+    
+    Args:
+        sock: UDP socket
+        client_address: Client address tuple (ip, port)
+        chunks: List of (header, payload_len) tuples; the payload is a prefix of FILLER
+    """
+    # One gathered sendmsg per chunk, so header and payload are never concatenated
+    for chunk_header, payload_len in chunks:
+        sock.sendmsg([chunk_header, FILLER_VIEW[:payload_len]], (), 0, client_address)
+        time.sleep(CHUNK_INTERVAL)
+
 def send_response(sock, client_address, request_id, response_size):
     """
     Send response data to client
@@ -139,25 +234,25 @@ def send_response(sock, client_address, request_id, response_size):
         
         print(f"Sending response for request {request_id}: {response_size} bytes in {total_chunks} chunks")
         
-        # Split data into chunks and send
+        # Split data into chunks, built up front before sending
+        chunks = []
         remaining_payload = payload_size
         for chunk_id in range(total_chunks):
             # Calculate this chunk's payload size
             this_chunk_payload = min(max_chunk_payload, remaining_payload)
             
             # Pack the header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-            chunk_header = struct.pack('!BIHH', MSG_TYPE_REQUEST, request_id, chunk_id, total_chunks)
+            chunk_header = REQUEST_HEADER.pack(MSG_TYPE_REQUEST, request_id, chunk_id, total_chunks)
             
-            # Create chunk data with header and payload
-            chunk_data = chunk_header + b'0' * this_chunk_payload
-            
-            # Send the chunk
-            sock.sendto(chunk_data, client_address)
-            print(f"Sent response chunk {chunk_id+1}/{total_chunks} for request {request_id}")
-            time.sleep(0.0001)  # Sleep for 100 microseconds
+            # The payload is sent from the shared filler, not copied per chunk
+            chunks.append((chunk_header, this_chunk_payload))
             
             # Update remaining payload
             remaining_payload -= this_chunk_payload
+        
+        # Send all chunks, paced CHUNK_INTERVAL apart
+        send_chunks(sock, client_address, chunks)
+        print(f"Sent {total_chunks} response chunks for request {request_id}")
             
         return True
             
@@ -165,6 +260,65 @@ def send_response(sock, client_address, request_id, response_size):
         print(f"Error sending response: {e}")
         return False
 
+def make_recv_batch(count, bufsize):
+    """
+    Allocate reusable recvmmsg() headers over one bytearray of count * bufsize bytes
+    
+    Args:
+        count: Number of datagrams per recvmmsg() call
+        bufsize: Maximum size of each datagram
+    
+    Returns:
+        tuple: (msgs, iovecs, names, buffer, bufsize)
+    """
+    buffer = bytearray(count * bufsize)
+    base = ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+    names = (ctypes.c_char * SOCKADDR_IN.size * count)()
+    iovecs = (Iovec * count)()
+    msgs = (Mmsghdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = base + i * bufsize
+        iovecs[i].iov_len = bufsize
+        msgs[i].msg_hdr.msg_name = ctypes.addressof(names[i])
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+    return msgs, iovecs, names, buffer, bufsize
+
+def recv_batch(sock, batch):
+    """
+    Wait for at least one datagram and return all queued ones, up to the batch size
+    
+    Args:
+        sock: Blocking UDP socket
+        batch: Buffers from make_recv_batch()
+    
+    Returns:
+        list: (data, client_address) per datagram; data is a memoryview into the
+              batch buffer and is only valid until the next call
+    """
+    msgs, _, names, buffer, bufsize = batch
+    count = len(msgs)
+    
+    # The kernel overwrites msg_namelen, so reset it every call
+    for i in range(count):
+        msgs[i].msg_hdr.msg_namelen = SOCKADDR_IN.size
+    
+    while True:
+        received = libc_recvmmsg(sock.fileno(), ctypes.addressof(msgs), count, MSG_WAITFORONE, None)
+        if received >= 0:
+            break
+        err = ctypes.get_errno()
+        if err != errno.EINTR:
+            raise OSError(err, os.strerror(err))
+    
+    view = memoryview(buffer)
+    datagrams = []
+    for i in range(received):
+        port, ip = SOCKADDR_IN.unpack_from(names[i])
+        offset = i * bufsize
+        datagrams.append((view[offset:offset + msgs[i].msg_len], (socket.inet_ntoa(ip), port)))
+    return datagrams
+
 def start_udp_server(port=UDP_PORT, max_packet_size=MAX_UDP_PACKET):
     """
     Start a UDP server that listens for incoming data
@@ -188,48 +342,54 @@ def start_udp_server(port=UDP_PORT, max_packet_size=MAX_UDP_PACKET):
     # Dictionary to store client configurations
     client_configs = {}
     
+    # Reusable recvmmsg() buffers (Linux); otherwise one recvfrom per datagram
+    batch = make_recv_batch(RECVMMSG_BATCH, max_packet_size) if libc_recvmmsg else None
+    
     try:
         while True:
-            # Wait for incoming data
-            data, client_address = server_socket.recvfrom(max_packet_size)
+            # Wait for incoming data; each call returns every queued datagram
+            if batch is not None:
+                datagrams = recv_batch(server_socket, batch)
+            else:
+                datagrams = (server_socket.recvfrom(max_packet_size),)
             
-            try:
-                # Get message type from first byte
-                msg_type = data[0]
-                
-                if msg_type == MSG_TYPE_CONTROL:
-                    # Clear chunk buffer when control message is received
-                    clear_chunk_buffer()
-                    
-                    # Unpack control message: type(1) + request_size(4) + response_size(4)
-                    _, request_size, response_size = struct.unpack('!BII', data)
-                    print(f"Received control message - Request size: {request_size}, Response size: {response_size}")
-                    
-                    # Store client configuration
-                    client_configs[client_address] = {
-                        'request_size': request_size,
-                        'response_size': response_size
-                    }
-                    
-                    # Send control ACK (just the message type)
-                    ack_message = struct.pack('!B', MSG_TYPE_CONTROL)
-                    server_socket.sendto(ack_message, client_address)
-                    print("Sent control ACK")
-                    
-                elif msg_type == MSG_TYPE_REQUEST:
-                    # Process the chunk
-                    is_complete, request_id = process_chunk(data, client_address)
+            for data, client_address in datagrams:
+                try:
+                    # Get message type from first byte
+                    msg_type = data[0]
                     
-                    # If request is complete and we have client config
-                    if is_complete and client_address in client_configs:
-                        response_size = client_configs[client_address]['response_size']
+                    if msg_type == MSG_TYPE_CONTROL:
+                        # Clear chunk buffer when control message is received
+                        clear_chunk_buffer()
                         
-                        # Send response if needed
-                        if response_size > 0:
-                            send_response(server_socket, client_address, request_id, response_size)
-                
-            except (struct.error, IndexError) as e:
-                print(f"Error processing message: {e}")
+                        # Unpack control message: type(1) + request_size(4) + response_size(4)
+                        _, request_size, response_size = CONTROL_MESSAGE.unpack(data)
+                        print(f"Received control message - Request size: {request_size}, Response size: {response_size}")
+                        
+                        # Store client configuration
+                        client_configs[client_address] = {
+                            'request_size': request_size,
+                            'response_size': response_size
+                        }
+                        
+                        # Send control ACK (just the message type)
+                        server_socket.sendto(CONTROL_ACK, client_address)
+                        print("Sent control ACK")
+                        
+                    elif msg_type == MSG_TYPE_REQUEST:
+                        # Process the chunk
+                        is_complete, request_id = process_chunk(data, client_address)
+                        
+                        # If request is complete and we have client config
+                        if is_complete and client_address in client_configs:
+                            response_size = client_configs[client_address]['response_size']
+                            
+                            # Send response if needed
+                            if response_size > 0:
+                                send_response(server_socket, client_address, request_id, response_size)
+                    
+                except (struct.error, IndexError) as e:
+                    print(f"Error processing message: {e}")
             
     except KeyboardInterrupt:
         print("\nServer shutting down...")
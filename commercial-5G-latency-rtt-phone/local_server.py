@@ -6,64 +6,111 @@ import threading
 import argparse
 import datetime
 import os
+import queue
+import itertools
 
 # Configuration
 LISTEN_IP = '0.0.0.0'     # Listen on all interfaces for phone connection
 LISTEN_PORT = 5001        # Port for receiving data from phone
+FLUSH_INTERVAL = 0.1      # Maximum time between results file flushes (seconds)
+
+# RTT record: request_id(4) + rtt(8) + request_size(4) + response_size(4) = 20 bytes
+RTT_RECORD = struct.Struct('!IdII')
+RECV_BATCH = 64                 # Records received per recv_into() call at most
+CLIENT_RCVBUF = 1024 * 1024     # Receive buffer for each phone connection
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', 12)
 
 # Global variables
 rtt_lock = threading.Lock()      # Lock for thread-safe updates to data
 running = True                  # Flag to control thread execution
-measurement_count = 0           # Counter for received packets
+measurement_count = itertools.count(1)  # Counter for received packets (next() is atomic)
+write_queue = queue.SimpleQueue()  # Measurements waiting for the results writer thread
 results_file = None             # File to save measurement results
 request_size = 0                # Size of request packets
 response_size = 0               # Size of response packets
 
+def tune_client_socket(client_socket):
+    """Set per-connection options on an accepted phone socket"""
+    options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.IPPROTO_TCP, TCP_QUICKACK, 1),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, CLIENT_RCVBUF),
+        # Don't wake up for less than one full record
+        (socket.SOL_SOCKET, socket.SO_RCVLOWAT, RTT_RECORD.size),
+    ]
+    for level, option, value in options:
+        try:
+            client_socket.setsockopt(level, option, value)
+        except OSError as e:
+            print(f"Could not set socket option {option}: {e}")
+
+def record_measurement(original_request_id, rtt_ms, req_size, resp_size):
+    """Record one RTT measurement received from the phone"""
+    global results_file, request_size, response_size
+    
+    # Update packet sizes - store the first valid values
+    with rtt_lock:
+        if request_size == 0 and response_size == 0:
+            request_size = req_size
+            response_size = resp_size
+            
+            # Create new results file with size information if it wasn't created yet
+            if results_file is None:
+                create_results_file()
+    
+    # Increment measurement counter
+    measurement_id = next(measurement_count)
+    
+    print(f"Original request {original_request_id}: RTT = {rtt_ms:.3f} ms, Request size = {req_size}, Response size = {resp_size}")
+    
+    # Queue the result for the writer thread - using measurement_id as the request ID
+    if results_file:
+        write_queue.put((measurement_id, rtt_ms, req_size, resp_size))
+    
+    print(f"Saved measurement #{measurement_id} to file")
+    print("-" * 50)
+
 def handle_phone_client(client_socket, client_address):
     """Handle a phone client connection"""
-    global measurement_count, results_file, request_size, response_size
-    
     try:
         print(f"Phone connected from {client_address}")
+        tune_client_socket(client_socket)
+        
+        # Records arrive in batches; a partial record at the end of a batch is
+        # moved to the front of the buffer and completed by the next recv
+        buffer = bytearray(RTT_RECORD.size * RECV_BATCH)
+        view = memoryview(buffer)
+        pending = 0
+        
+        # Cleared if the platform rejects TCP_QUICKACK
+        quickack = True
         
         while running:
             try:
-                # Receive RTT data: request_id(4) + rtt(8) + request_size(4) + response_size(4) = 20 bytes
-                data = client_socket.recv(20)
-                if not data or len(data) < 20:
-                    if not data:
-                        print("Connection closed by phone")
+                received = client_socket.recv_into(view[pending:])
+                if not received:
+                    if pending:
+                        print(f"Incomplete data received: {pending} bytes, expected {RTT_RECORD.size} bytes")
                     else:
-                        print(f"Incomplete data received: {len(data)} bytes, expected 20 bytes")
+                        print("Connection closed by phone")
                     break
                 
-                # Parse the data to get request ID, RTT, request size and response size
-                original_request_id, rtt_ms, req_size, resp_size = struct.unpack('!IdII', data)
-                
-                # Update packet sizes - store the first valid values
-                with rtt_lock:
-                    if request_size == 0 and response_size == 0:
-                        request_size = req_size
-                        response_size = resp_size
-                        
-                        # Create new results file with size information if it wasn't created yet
-                        if results_file is None:
-                            create_results_file()
+                # Quick ACK mode is not sticky, so re-arm it after each read
+                if quickack:
+                    try:
+                        client_socket.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+                    except OSError:
+                        quickack = False
                 
-                # Increment measurement counter
-                with rtt_lock:
-                    measurement_count += 1
+                # Parse every complete record in the buffer
+                available = pending + received
+                complete = available - available % RTT_RECORD.size
+                for record in RTT_RECORD.iter_unpack(view[:complete]):
+                    record_measurement(*record)
                 
-                print(f"Original request {original_request_id}: RTT = {rtt_ms:.3f} ms, Request size = {req_size}, Response size = {resp_size}")
-                
-                # Save results to file - using measurement_count as the request ID
-                if results_file:
-                    with rtt_lock:  # Use lock to avoid file corruption
-                        results_file.write(f"{measurement_count:<10d}  {rtt_ms:<12.3f}  {req_size:<10d}  {resp_size:<10d}\n")
-                        results_file.flush()  # Ensure data is written to disk
-                
-                print(f"Saved measurement #{measurement_count} to file")
-                print("-" * 50)
+                pending = available - complete
+                if pending:
+                    buffer[:pending] = buffer[complete:available]
                 
             except socket.timeout:
                 # Socket timeout, just continue the loop
@@ -97,6 +144,25 @@ def create_results_file():
     print(f"Saving results to {results_filename}")
     return results_filename
 
+def results_writer():
+    """Write queued measurements to the results file, flushing when the queue drains or every FLUSH_INTERVAL"""
+    last_flush = time.monotonic()
+    unflushed = False
+    
+    while running or not write_queue.empty():
+        try:
+            measurement_id, rtt_ms, req_size, resp_size = write_queue.get(timeout=FLUSH_INTERVAL)
+            results_file.write(f"{measurement_id:<10d}  {rtt_ms:<12.3f}  {req_size:<10d}  {resp_size:<10d}\n")
+            unflushed = True
+        except queue.Empty:
+            pass
+        
+        now = time.monotonic()
+        if unflushed and (write_queue.empty() or now - last_flush >= FLUSH_INTERVAL):
+            results_file.flush()  # Ensure data is written to disk
+            unflushed = False
+            last_flush = now
+
 def listen_for_phone():
     """Listen for phone connections"""
     # Create TCP socket for phone communication
@@ -153,6 +219,13 @@ def main():
         )
         phone_listen_thread.start()
         
+        # Start results writer thread
+        writer_thread = threading.Thread(
+            target=results_writer,
+            daemon=True
+        )
+        writer_thread.start()
+        
         print(f"Local server running on port {args.port}")
         print("Press Ctrl+C to exit")
         
@@ -163,6 +236,8 @@ def main():
         except KeyboardInterrupt:
             print("Exiting...")
             running = False
+            # Let the writer drain queued measurements before the file is closed
+            writer_thread.join(timeout=2)
     finally:
         # Close results file
         if results_file:
@@ -3,7 +3,14 @@ import socket
 import struct
 import time
 import random
-from collections import defaultdict
+import os
+import sys
+import ctypes
+import ctypes.util
+import errno
+import gc
+import logging
+import select
 
 # Maximum UDP packet size (practically safe)
 MAX_UDP_PACKET = 8192
@@ -13,19 +20,112 @@ UDP_PORT = 5000
 LOCAL_SERVER_IP = '127.0.0.1'
 LOCAL_SERVER_PORT = 5001
 
+# Per-chunk send/receive diagnostics are only logged with CLIENT_DEBUG=1 in the environment;
+# they would otherwise run inside the timed request-response window
+CLIENT_DEBUG = os.getenv('CLIENT_DEBUG', '0') == '1'
+
 # Message types
 MSG_TYPE_CONTROL = 1
 MSG_TYPE_REQUEST = 2
 
+# Wire formats, compiled once
+REQUEST_HEADER = struct.Struct('!BIHH')   # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+REQUEST_ID = struct.Struct('!I')          # request_id field at offset 1 of REQUEST_HEADER
+CONTROL_MESSAGE = struct.Struct('!BII')   # type(1) + request_size(4) + response_size(4)
+RTT_RECORD = struct.Struct('!IdII')       # request_id(4) + rtt(8) + request_size(4) + response_size(4)
+
+# Maximum number of request chunks handed to one sendmmsg() call (UIO_MAXIOV)
+SENDMMSG_BATCH = 1024
+# Queued response chunks drained per recvmmsg() call; kept small so the batch
+# buffers stay cache-resident
+RECVMMSG_BATCH = 16
+
+# CPU the measurement loop is pinned to (keep it off the NIC IRQ cores) and its
+# SCHED_FIFO priority (needs CAP_SYS_NICE; skipped otherwise)
+MEASUREMENT_CPU = 2
+MEASUREMENT_PRIORITY = 50
+
+# UDP GSO (Linux 4.18+): one sendmsg() carries several MAX_UDP_PACKET segments,
+# up to 64 segments and the 64KB datagram limit
+UDP_SEGMENT = getattr(socket, 'UDP_SEGMENT', 103)
+GSO_MAX_SEGMENTS = min(64, 65507 // MAX_UDP_PACKET)
+GSO_SIZE_CMSG = struct.pack('=H', MAX_UDP_PACKET)
+# GSO segments are not fragmented, so each one (plus IPv4 and UDP headers)
+# has to fit the route MTU
+IP_MTU = getattr(socket, 'IP_MTU', 14)
+UDP_IP_HEADER_SIZE = 28
+
+# Socket buffer sizes, large enough for a full request or response burst
+SOCKET_RCVBUF = 4 * 1024 * 1024
+SOCKET_SNDBUF = 4 * 1024 * 1024
+
+# Busy-poll budget for receives on the measurement socket, in microseconds
+# (poll() only busy-polls when net.core.busy_poll is also set)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+BUSY_POLL_USEC = 50
+
+# ctypes layouts for Linux sendmmsg(2)
+class Iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class Msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(Iovec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class Mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', Msghdr),
+                ('msg_len', ctypes.c_uint)]
+
+# Shared payload filler: only the byte count of a chunk's payload matters, so every
+# chunk sends a prefix of this one zeroed buffer instead of building its own
+FILLER = bytes(MAX_UDP_PACKET)
+FILLER_VIEW = memoryview(FILLER)
+FILLER_ADDRESS = ctypes.cast(ctypes.c_char_p(FILLER), ctypes.c_void_p).value
+
+# libc sendmmsg/recvmmsg, or None where they are not available (non-Linux)
+libc_sendmmsg = None
+libc_recvmmsg = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc_sendmmsg = _libc.sendmmsg
+        libc_sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        libc_sendmmsg.restype = ctypes.c_int
+        libc_recvmmsg = _libc.recvmmsg
+        libc_recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        libc_recvmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        libc_sendmmsg = None
+        libc_recvmmsg = None
+
 # Global request counter
 request_counter = 0
 
-# Response tracking
-response_buffer = defaultdict(dict)  # {request_id: {chunk_id: data}}
+# Set once UDP_SEGMENT is known to work on the client socket
+udp_gso_enabled = False
+
+# Chunk headers and send vectors for the last (server_address, request_size):
+# (key, headers, chunks, prepared, groups), rebuilt only when the key changes
+request_batch = None
+
+# Reusable receive buffer for response chunks
+receive_buffer = bytearray(MAX_UDP_PACKET)
+# recvmmsg() buffers for chunks already queued behind the first (Linux), see make_recv_batch()
+receive_batch = None
+# Poller for the request/response socket, registered once in main()
+response_poller = None
 
 # Local server connection
 local_server_socket = None
 
+log = logging.getLogger("phone_client")
+
 def parse_arguments():
     """
     Parse command line arguments
@@ -90,7 +190,7 @@ def send_rtt_to_local_server(request_id, rtt_ms, request_size, response_size):
     
     try:
         # Pack data: request_id(4) + rtt(8) + request_size(4) + response_size(4) = 20 bytes
-        data = struct.pack('!IdII', request_id, rtt_ms, request_size, response_size)
+        data = RTT_RECORD.pack(request_id, rtt_ms, request_size, response_size)
         local_server_socket.sendall(data)
         return True
     except Exception as e:
@@ -113,7 +213,7 @@ def send_control_message(sock, server_address, request_size, response_size):
     """
     try:
         # Pack control message: type(1) + request_size(4) + response_size(4)
-        control_message = struct.pack('!BII', MSG_TYPE_CONTROL, request_size, response_size)
+        control_message = CONTROL_MESSAGE.pack(MSG_TYPE_CONTROL, request_size, response_size)
         
         # Send control message
         sock.sendto(control_message, server_address)
@@ -132,19 +232,178 @@ def send_control_message(sock, server_address, request_size, response_size):
         print(f"Error in control message: {e}")
         return False
 
+def make_sockaddr_in(address):
+    """
+    Pack an (ip, port) tuple into a struct sockaddr_in for sendmmsg
+    
+    Args:
+        address: IPv4 address tuple (ip, port)
+    
+    Returns:
+        ctypes buffer holding the sockaddr_in
+    """
+    ip, port = address
+    sockaddr = struct.pack('=H', socket.AF_INET) + struct.pack('!H', port) + socket.inet_aton(ip) + bytes(8)
+    return ctypes.create_string_buffer(sockaddr, len(sockaddr))
+
+def prepare_chunks(server_address, chunks):
+    """
+    Build the sendmmsg() message vector for a list of chunks ahead of sending
+    
+    Args:
+        server_address: Server address tuple (ip, port), or None for a connected socket
+        chunks: List of (header, payload_len) tuples; header is a memoryview slice of a
+                bytearray and the payload is a prefix of FILLER
+    
+    Returns:
+        tuple: (msgs, iovecs, sockaddr); iovecs and sockaddr keep the pointed-to memory alive
+    """
+    # A connected socket takes no destination (msg_name NULL)
+    sockaddr = make_sockaddr_in(server_address) if server_address else None
+    count = len(chunks)
+    
+    # Two iovecs per chunk: its header, then a prefix of the shared filler
+    iovecs = (Iovec * (2 * count))()
+    msgs = (Mmsghdr * count)()
+    for i, (chunk_header, payload_len) in enumerate(chunks):
+        iovecs[2 * i].iov_base = ctypes.addressof(ctypes.c_char.from_buffer(chunk_header))
+        iovecs[2 * i].iov_len = len(chunk_header)
+        iovecs[2 * i + 1].iov_base = FILLER_ADDRESS
+        iovecs[2 * i + 1].iov_len = payload_len
+        if sockaddr is not None:
+            msgs[i].msg_hdr.msg_name = ctypes.cast(sockaddr, ctypes.c_void_p)
+            msgs[i].msg_hdr.msg_namelen = len(sockaddr)
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[2 * i])
+        msgs[i].msg_hdr.msg_iovlen = 2 if payload_len else 1
+    return msgs, iovecs, sockaddr
+
+def send_chunks(sock, server_address, chunks, prepared=None):
+    """
+    Send a list of datagrams to the server, batched into sendmmsg() calls on Linux
+    
+    Args:
+        sock: UDP socket
+        server_address: Server address tuple (ip, port), or None for a connected socket
+        chunks: List of (header, payload_len) tuples; header is a memoryview slice of a
+                bytearray and the payload is a prefix of FILLER
+        prepared: Optional prepare_chunks() result for these chunks, to skip building it here
+    """
+    if libc_sendmmsg is None:
+        # Fallback: one gathered sendmsg per chunk; the bound method and filler
+        # view are looked up once, not per chunk
+        sendmsg = sock.sendmsg
+        filler = FILLER_VIEW
+        destination = (server_address,) if server_address else ()
+        for chunk_header, payload_len in chunks:
+            sendmsg([chunk_header, filler[:payload_len]], (), 0, *destination)
+        return
+    
+    if prepared is None:
+        prepared = prepare_chunks(server_address, chunks)
+    msgs = prepared[0]
+    count = len(msgs)
+    
+    # At most SENDMMSG_BATCH per call, and sendmmsg may send fewer messages than
+    # requested; resume from where it stopped
+    fd = sock.fileno()
+    sendmmsg = libc_sendmmsg
+    msgs_address = ctypes.addressof(msgs)
+    msg_size = ctypes.sizeof(Mmsghdr)
+    sent = 0
+    while sent < count:
+        result = sendmmsg(fd, msgs_address + sent * msg_size, min(count - sent, SENDMMSG_BATCH), 0)
+        if result < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        sent += result
+
+def probe_udp_gso(sock):
+    """
+    Check whether the kernel supports UDP_SEGMENT on this socket and the route
+    MTU can carry MAX_UDP_PACKET segments unfragmented
+    
+    Args:
+        sock: Connected UDP socket (IP_MTU is only known after connect())
+    
+    Returns:
+        bool: True if GSO sends can be used
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        sock.getsockopt(socket.IPPROTO_UDP, UDP_SEGMENT)
+        mtu = sock.getsockopt(socket.IPPROTO_IP, IP_MTU)
+    except OSError:
+        return False
+    return MAX_UDP_PACKET + UDP_IP_HEADER_SIZE <= mtu
+
+def prepare_gso_groups(chunks):
+    """
+    Build the sendmsg() gather lists for send_chunks_gso() ahead of sending
+    
+    Args:
+        chunks: List of (header, payload_len) tuples, as for send_chunks()
+    
+    Returns:
+        list: One gather list per GSO_MAX_SEGMENTS chunks, alternating headers and
+              filler prefixes
+    """
+    groups = []
+    for group_start in range(0, len(chunks), GSO_MAX_SEGMENTS):
+        group = []
+        for chunk_header, payload_len in chunks[group_start:group_start + GSO_MAX_SEGMENTS]:
+            group.append(chunk_header)
+            group.append(FILLER_VIEW[:payload_len])
+        groups.append(group)
+    return groups
+
+def send_chunks_gso(sock, server_address, chunks, groups=None):
+    """
+    Send chunks of MAX_UDP_PACKET bytes (only the last may be shorter) with UDP GSO.
+    Each sendmsg() gathers up to GSO_MAX_SEGMENTS chunks and the kernel splits them back
+    into datagrams. Falls back to send_chunks() if the route rejects GSO.
+    
+    Args:
+        sock: UDP socket
+        server_address: Server address tuple (ip, port), or None for a connected socket
+        chunks: List of (header, payload_len) tuples, as for send_chunks()
+        groups: Optional prepare_gso_groups() result for these chunks
+    """
+    global udp_gso_enabled
+    
+    if groups is None:
+        groups = prepare_gso_groups(chunks)
+    gso_cmsg = [(socket.IPPROTO_UDP, UDP_SEGMENT, GSO_SIZE_CMSG)]
+    sendmsg = sock.sendmsg
+    destination = (server_address,) if server_address else ()
+    for group_index, group in enumerate(groups):
+        try:
+            sendmsg(group, gso_cmsg, 0, *destination)
+        except OSError as e:
+            # EINVAL: segment larger than the route MTU; EIO: device without
+            # checksum offload; EOPNOTSUPP: GSO unsupported
+            if e.errno not in (errno.EIO, errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            # The setup probe should have caught this; don't print inside the timed window
+            if CLIENT_DEBUG:
+                log.debug(f"UDP GSO not usable ({e}), falling back to sendmmsg")
+            udp_gso_enabled = False
+            send_chunks(sock, server_address, chunks[group_index * GSO_MAX_SEGMENTS:])
+            break
+
 def send_request(sock, server_address, request_size):
     """
     Send request data to server
     
     Args:
         sock: UDP socket
-        server_address: Server address tuple (ip, port)
+        server_address: Server address tuple (ip, port), or None for a connected socket
         request_size: Size of request data to send
     
     Returns:
         tuple: (request_id, send_time) if sent successfully, (None, None) otherwise
     """
-    global request_counter
+    global request_counter, request_batch
     try:
         # Generate a request ID
         request_id = request_counter
@@ -166,27 +425,51 @@ def send_request(sock, server_address, request_size):
         
         print(f"Total request data length: {request_size} bytes, splitting into {total_chunks} chunks")
         
-        # Record start time just before sending first chunk
-        send_time = time.time()
-        
-        # Split data into chunks and send
-        remaining_payload = payload_size
-        for chunk_id in range(total_chunks):
-            # Calculate this chunk's payload size
-            this_chunk_payload = min(max_chunk_payload, remaining_payload)
-            
-            # Pack the header: type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-            chunk_header = struct.pack('!BIHH', MSG_TYPE_REQUEST, request_id, chunk_id, total_chunks)
-            
-            # Create chunk data with header and payload
-            chunk_data = chunk_header + b'0' * this_chunk_payload
-            
-            # Send the chunk
-            sock.sendto(chunk_data, server_address)
-            print(f"Sent chunk {chunk_id+1}/{total_chunks} of request {request_id}: {len(chunk_data)} bytes")
+        # Chunk headers and send vectors depend only on the destination and request
+        # size, so they are built once per run
+        batch_key = (server_address, request_size)
+        if request_batch is None or request_batch[0] != batch_key:
+            chunks = []
+            headers = bytearray(header_size * total_chunks)
+            headers_view = memoryview(headers)
+            remaining_payload = payload_size
+            for chunk_id in range(total_chunks):
+                # Calculate this chunk's payload size
+                this_chunk_payload = min(max_chunk_payload, remaining_payload)
+                
+                # Pack the header in place; request_id is rewritten per request
+                offset = chunk_id * header_size
+                REQUEST_HEADER.pack_into(headers, offset, MSG_TYPE_REQUEST, 0, chunk_id, total_chunks)
+                
+                # The payload is sent from the shared filler, not built per chunk
+                chunks.append((headers_view[offset:offset + header_size], this_chunk_payload))
+                
+                # Update remaining payload
+                remaining_payload -= this_chunk_payload
             
-            # Update remaining payload
-            remaining_payload -= this_chunk_payload
+            prepared = prepare_chunks(server_address, chunks) if libc_sendmmsg else None
+            groups = prepare_gso_groups(chunks) if total_chunks > 1 else None
+            request_batch = (batch_key, headers, chunks, prepared, groups)
+        
+        _, headers, chunks, prepared, groups = request_batch
+        
+        # Only the request ID differs between requests: write each of its 4 bytes
+        # into every header with one strided slice assignment, whatever the chunk count
+        request_id_bytes = REQUEST_ID.pack(request_id)
+        for i in range(REQUEST_ID.size):
+            headers[1 + i::header_size] = request_id_bytes[i:i + 1] * total_chunks
+        
+        # Record start time just before sending first chunk; the monotonic
+        # clock keeps RTTs immune to wall-clock (NTP) adjustments
+        send_time = time.monotonic_ns()
+        
+        # Send all chunks, as GSO segments where the kernel supports it
+        if udp_gso_enabled and total_chunks > 1:
+            send_chunks_gso(sock, server_address, chunks, groups)
+        else:
+            send_chunks(sock, server_address, chunks, prepared)
+        if CLIENT_DEBUG:
+            log.debug(f"Sent {total_chunks} chunks of request {request_id}: {request_size} bytes")
         
         return request_id, send_time
         
@@ -194,6 +477,48 @@ def send_request(sock, server_address, request_size):
         print(f"Error sending request: {e}")
         return None, None
 
+def make_recv_batch(count, bufsize):
+    """
+    Allocate reusable recvmmsg() headers over one bytearray of count * bufsize bytes
+    
+    Args:
+        count: Number of datagrams per recvmmsg() call
+        bufsize: Maximum size of each datagram
+    
+    Returns:
+        tuple: (msgs, iovecs, buffer, bufsize)
+    """
+    buffer = bytearray(count * bufsize)
+    base = ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+    iovecs = (Iovec * count)()
+    msgs = (Mmsghdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = base + i * bufsize
+        iovecs[i].iov_len = bufsize
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+        msgs[i].msg_hdr.msg_iovlen = 1
+    return msgs, iovecs, buffer, bufsize
+
+def recv_queued(sock, batch):
+    """
+    Take the datagrams already queued on the socket with one non-blocking recvmmsg()
+    
+    Args:
+        sock: UDP socket
+        batch: Buffers from make_recv_batch()
+    
+    Returns:
+        list: (buffer, offset, length) per datagram, valid until the next call
+    """
+    msgs, _, buffer, bufsize = batch
+    received = libc_recvmmsg(sock.fileno(), ctypes.addressof(msgs), len(msgs), socket.MSG_DONTWAIT, None)
+    if received < 0:
+        err = ctypes.get_errno()
+        if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+            return []
+        raise OSError(err, os.strerror(err))
+    return [(buffer, i * bufsize, msgs[i].msg_len) for i in range(received)]
+
 def receive_response(sock, request_id, send_time, timeout_ms=5000):
     """
     Wait for and process response chunks for a specific request
@@ -201,82 +526,177 @@ def receive_response(sock, request_id, send_time, timeout_ms=5000):
     Args:
         sock: UDP socket
         request_id: Request ID to wait for response
-        send_time: Time when the request was sent
+        send_time: time.monotonic_ns() stamp taken when the request was sent
         timeout_ms: Socket timeout in milliseconds
     
     Returns:
         tuple: (bool, float) - success status and RTT in ms
     """
-    # Set timeout for receiving response
-    original_timeout = sock.gettimeout()
-    sock.settimeout(timeout_ms / 1000)  # Convert ms to seconds
-    
     response_complete = False
-    start_time = time.time()
-    received_chunks = {}  # {chunk_id: True}
+    deadline_ns = time.monotonic_ns() + timeout_ms * 1_000_000
+    received_mask = 0     # Bit n set once chunk n has arrived
+    complete_mask = None  # All total_chunks bits set, known after the first chunk
     total_chunks = None
     
     try:
-        while time.time() - start_time < timeout_ms / 1000:  # Convert ms to seconds
+        while True:
+            # Wait for data until the overall deadline, without touching the socket timeout
+            remaining_ms = (deadline_ns - time.monotonic_ns()) // 1_000_000
+            if remaining_ms <= 0 or not response_poller.poll(remaining_ms):
+                break
+            
             try:
-                # Receive response data
-                data, _ = sock.recvfrom(MAX_UDP_PACKET)
-                
-                # Ensure we have at least the header
-                if len(data) < 9:  # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
-                    print("Received too small response chunk")
-                    continue
-                
-                # Unpack header to get type, request ID, chunk ID and total chunks
-                msg_type, resp_request_id, chunk_id, chunks_count = struct.unpack('!BIHH', data[:9])
+                # Read the chunk that woke us, then take any others already queued
+                # behind it in one recvmmsg() call
+                nbytes = sock.recv_into(receive_buffer, 0, socket.MSG_DONTWAIT)
+                datagrams = [(receive_buffer, 0, nbytes)]
+                if receive_batch is not None:
+                    datagrams.extend(recv_queued(sock, receive_batch))
                 
-                if msg_type != MSG_TYPE_REQUEST:
-                    print(f"Received unexpected message type: {msg_type}")
-                    continue
-                
-                # Check if this response matches our request
-                if resp_request_id == request_id:
-                    # Record this chunk and update total chunks if needed
-                    received_chunks[chunk_id] = True
-                    if total_chunks is None:
-                        total_chunks = chunks_count
-                    print(f"Received response chunk {chunk_id+1}/{chunks_count} for request {request_id}")
+                for buffer, offset, nbytes in datagrams:
+                    # Ensure we have at least the header
+                    if nbytes < REQUEST_HEADER.size:  # type(1) + request_id(4) + chunk_id(2) + total_chunks(2)
+                        print("Received too small response chunk")
+                        continue
                     
-                    # Check if we have all chunks
-                    if len(received_chunks) == total_chunks:
-                        # Calculate RTT when all response chunks received
-                        receive_complete_time = time.time()
-                        rtt_ms = (receive_complete_time - send_time) * 1000  # Convert to ms
-                        print(f"Received all {total_chunks} response chunks for request {request_id}")
-                        response_complete = True
-                        break
-                else:
-                    print(f"Received response for different request: {resp_request_id}")
+                    # Unpack header to get type, request ID, chunk ID and total chunks.
+                    # unpack_from on the precompiled Struct reads the buffer in place; slicing
+                    # out the fields for int.from_bytes measures several times slower
+                    msg_type, resp_request_id, chunk_id, chunks_count = REQUEST_HEADER.unpack_from(buffer, offset)
+                    
+                    if msg_type != MSG_TYPE_REQUEST:
+                        print(f"Received unexpected message type: {msg_type}")
+                        continue
+                    
+                    # Check if this response matches our request
+                    if resp_request_id == request_id:
+                        # Record this chunk and update total chunks if needed
+                        received_mask |= 1 << chunk_id
+                        if total_chunks is None:
+                            total_chunks = chunks_count
+                            complete_mask = (1 << total_chunks) - 1
+                        if CLIENT_DEBUG:
+                            log.debug(f"Received response chunk {chunk_id+1}/{chunks_count} for request {request_id}")
+                        
+                        # Check if we have all chunks
+                        if received_mask == complete_mask:
+                            # Calculate RTT when all response chunks received
+                            receive_complete_time = time.monotonic_ns()
+                            rtt_ms = (receive_complete_time - send_time) / 1_000_000  # Convert to ms
+                            if CLIENT_DEBUG:
+                                log.debug(f"Received all {total_chunks} response chunks for request {request_id}")
+                            response_complete = True
+                            break
+                    else:
+                        print(f"Received response for different request: {resp_request_id}")
+                
+                if response_complete:
+                    break
             
-            except socket.timeout:
-                # Timeout on this receive, try again if within overall timeout
+            except BlockingIOError:
+                # Poll reported data that was gone (e.g. bad checksum), wait again
                 pass
     
     except Exception as e:
         print(f"Error receiving response: {e}")
     
-    finally:
-        # Restore original timeout
-        sock.settimeout(original_timeout)
-    
     # Calculate RTT if response is complete
     if response_complete:
         return True, rtt_ms
     else:
         return False, None
 
+def set_socket_buffers(sock, name):
+    """
+    Enlarge the socket buffers so bursts of request or response chunks are not dropped
+    
+    Args:
+        sock: UDP socket
+        name: Socket description for the log message
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+    except OSError as e:
+        print(f"Failed to set {name} socket buffers: {e}")
+    
+    # Linux reports double the usable size and silently caps at rmem_max/wmem_max
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+    print(f"{name} socket buffers - RCVBUF: {rcvbuf} bytes, SNDBUF: {sndbuf} bytes")
+    if rcvbuf < SOCKET_RCVBUF:
+        print(f"  (raise net.core.rmem_max to at least {SOCKET_RCVBUF} for the full receive buffer)")
+    if sndbuf < SOCKET_SNDBUF:
+        print(f"  (raise net.core.wmem_max to at least {SOCKET_SNDBUF} for the full send buffer)")
+
+def enable_busy_poll(sock):
+    """
+    Let receives on the socket spin briefly in the kernel instead of sleeping until the softirq wakeup
+    
+    Args:
+        sock: UDP socket
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_USEC)
+    except OSError as e:
+        # Raising the budget above net.core.busy_read needs CAP_NET_ADMIN
+        print(f"Busy polling not enabled: {e}")
+
+def pin_measurement_thread(cpu=MEASUREMENT_CPU):
+    """
+    Pin the calling thread to one CPU and, if permitted, give it real-time priority
+    
+    Args:
+        cpu: CPU number to bind the thread to
+    
+    Returns:
+        tuple: Previous (affinity, policy, param) for unpin_measurement_thread, or None if not pinned
+    """
+    if not hasattr(os, 'sched_setaffinity') or cpu not in os.sched_getaffinity(0):
+        return None
+    
+    saved = (os.sched_getaffinity(0), os.sched_getscheduler(0), os.sched_getparam(0))
+    try:
+        os.sched_setaffinity(0, {cpu})  # 0 = the calling thread on Linux
+    except OSError as e:
+        print(f"Could not pin measurement thread to CPU {cpu}: {e}")
+        return None
+    
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(MEASUREMENT_PRIORITY))
+        print(f"Measurement thread pinned to CPU {cpu} with SCHED_FIFO priority {MEASUREMENT_PRIORITY}")
+    except (AttributeError, OSError):
+        # No CAP_SYS_NICE: keep the default policy, affinity still applies
+        print(f"Measurement thread pinned to CPU {cpu}")
+    
+    return saved
+
+def unpin_measurement_thread(saved):
+    """
+    Restore the scheduling policy and affinity saved by pin_measurement_thread
+    
+    Args:
+        saved: Value returned by pin_measurement_thread
+    """
+    if saved is None:
+        return
+    affinity, policy, param = saved
+    try:
+        os.sched_setscheduler(0, policy, param)
+        os.sched_setaffinity(0, affinity)
+    except OSError as e:
+        print(f"Could not restore measurement thread scheduling: {e}")
+
 def main():
     """
     Main function to start the client
     """
-    global local_server_socket
+    global local_server_socket, udp_gso_enabled, receive_batch, response_poller
     
     args = parse_arguments()
+    logging.basicConfig(level=logging.DEBUG if CLIENT_DEBUG else logging.INFO, format='%(message)s')
     
     # Connect to local server if requested
     if not args.no_local_server:
@@ -285,8 +705,19 @@ def main():
     # Create UDP socket
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     client_socket.settimeout(args.timeout / 1000)  # Convert ms to seconds
+    set_socket_buffers(client_socket, "UDP")
+    enable_busy_poll(client_socket)
+    
+    # Responses are waited for with poll() against a deadline
+    response_poller = select.poll()
+    response_poller.register(client_socket, select.POLLIN)
+    
+    # Drain queued response chunks in batches where recvmmsg is available
+    if libc_recvmmsg:
+        receive_batch = make_recv_batch(RECVMMSG_BATCH, MAX_UDP_PACKET)
     
     server_address = (args.server_ip, args.server_port)
+    pinned = None
     
     try:
         # Send control message and wait for ACK
@@ -296,11 +727,25 @@ def main():
             
         print("Connection established with server")
         
+        # Connect to the server so requests skip the per-packet destination lookup
+        # (sendmmsg()/sendmsg() without an address); server_address is not needed below
+        client_socket.connect(server_address)
+        
+        # Multi-chunk requests use UDP GSO where the kernel supports it and the
+        # route MTU fits a whole segment; decided here, before any measured request
+        udp_gso_enabled = probe_udp_gso(client_socket)
+        print(f"UDP GSO {'enabled' if udp_gso_enabled else 'not available, using sendmmsg'}")
+        
+        # Keep generational GC pauses and CPU migrations out of the measured
+        # RTTs; the loop allocates little, so garbage is collected once at shutdown
+        gc.disable()
+        pinned = pin_measurement_thread()
+        
         # Send requests and wait for responses
         successful_requests = 0
         for i in range(args.count):
             print(f"\nSending request {i+1}/{args.count}")
-            request_id, send_time = send_request(client_socket, server_address, args.request_size)
+            request_id, send_time = send_request(client_socket, None, args.request_size)
             
             if request_id is None:
                 print(f"Failed to send request {i+1}")
@@ -308,7 +753,8 @@ def main():
                 
             # Wait for response if expected
             if args.response_size > 0:
-                print(f"Waiting for response to request {request_id}...")
+                if CLIENT_DEBUG:
+                    log.debug(f"Waiting for response to request {request_id}...")
                 response_received, rtt = receive_response(client_socket, request_id, send_time, args.timeout)
                 
                 if response_received:
@@ -335,6 +781,10 @@ def main():
     except KeyboardInterrupt:
         print("\nClient shutting down...")
     finally:
+        unpin_measurement_thread(pinned)
+        gc.collect()
+        gc.enable()
+        
         # Close sockets
         if local_server_socket:
             local_server_socket.close()
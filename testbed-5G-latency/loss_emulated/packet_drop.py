@@ -25,50 +25,61 @@ prog = """
 #include <linux/if_ether.h>
 #include <linux/ip.h>
 
-BPF_ARRAY(drop_state, u32, 1);
-BPF_ARRAY(stats, u64, 2);  // 0: total, 1: dropped
+// Burst state is per CPU as well: a burst drops the packets arriving on the
+// CPU that triggered it, and the countdown never leaves that CPU's cache
+BPF_PERCPU_ARRAY(drop_state, u32, 1);
+// Counters are per CPU so every RX queue increments its own copy without
+// bouncing a shared cacheline; userspace sums them when printing. Both share
+// one slot so a packet costs a single lookup
+struct pkt_stats {
+    u64 total;
+    u64 dropped;
+};
+BPF_PERCPU_ARRAY(stats, struct pkt_stats, 1);
 
 int xdp_drop(struct xdp_md *ctx) {
     u32 key = 0;
-    u32 stats_key;  // Changed from u64 to u32 to match BPF_ARRAY index type
     
     // Update total packet count
-    stats_key = 0;
-    u64 *total = stats.lookup(&stats_key);
-    if (total) (*total)++;
+    struct pkt_stats *s = stats.lookup(&key);
+    if (s) s->total++;
     
     u32 *drops = drop_state.lookup(&key);
     if (!drops) return XDP_PASS;
     
-    // Currently in drop burst phase
     if (*drops > 0) {
+        // Currently in drop burst phase
         (*drops)--;
-        
-        // Update drop statistics
-        stats_key = 1;
-        u64 *dropped = stats.lookup(&stats_key);
-        if (dropped) (*dropped)++;
-        
-        return XDP_DROP;
+    } else if ((bpf_get_prandom_u32() & 0x3FFF) == 0) {
+        // 1/16384 probability to trigger burst drop; power-of-two sizes let the
+        // random numbers be masked instead of divided. The countdown is written
+        // through the per-CPU pointer, so no map update is needed
+        *drops = 64 + (bpf_get_prandom_u32() & 0x3F);  // 64-127 packets
+    } else {
+        // Common path: no burst in progress and none triggered
+        return XDP_PASS;
     }
     
-    // 1% probability to trigger burst drop
-    if (bpf_get_prandom_u32() % 20000 == 0) {
-        u32 count = 50 + (bpf_get_prandom_u32() % 50);  // 50-100 packets
-        drop_state.update(&key, &count);
-        
-        // Update drop statistics
-        stats_key = 1;
-        u64 *dropped = stats.lookup(&stats_key);
-        if (dropped) (*dropped)++;
-        
-        return XDP_DROP;
-    }
+    // Update drop statistics
+    if (s) s->dropped++;
     
-    return XDP_PASS;
+    return XDP_DROP;
 }
 """
 
+def read_stats(stats):
+    """Read the (total, dropped) counters summed over all CPUs
+
+    Args:
+        stats: BCC per-CPU stats table
+
+    Returns:
+        Tuple of (total, dropped) packet counts
+    """
+    # Both counters live in one slot, so a single lookup returns them for every CPU
+    per_cpu = stats[0]
+    return sum(s.total for s in per_cpu), sum(s.dropped for s in per_cpu)
+
 try:
     print("Loading XDP program...")
     b = BPF(text=prog, cflags=["-w"])  # Suppress compiler warnings
@@ -79,8 +90,8 @@ try:
     
     print(f"✓ XDP burst drop program loaded on {device}")
     print("  - Direction: Receive (RX)")
-    print("  - Trigger probability: 0.1%")
-    print("  - Drop count: 50-100 packets/burst")
+    print("  - Trigger probability: 1/16384 (~0.006%)")
+    print("  - Drop count: 64-127 packets/burst")
     print(f"\nPress Ctrl+C to stop the program...\n")
     
     # Statistics
@@ -94,9 +105,10 @@ try:
         time.sleep(2)
         
         try:
-            total = stats[0].value if 0 in stats else 0
-            dropped = stats[1].value if 1 in stats else 0
-            current_drops = drop_state[0].value if 0 in drop_state else 0
+            # Sum the per-CPU counters
+            total, dropped = read_stats(stats)
+            # Bursts remaining across all CPUs
+            current_drops = drop_state.sum(0).value
             
             total_diff = total - last_total
             dropped_diff = dropped - last_dropped